@@ -5,14 +5,20 @@ Handles OpenAI API integration for various AI features
 
 import os
 import json
+import math
+import hashlib
 import logging
 import base64
 import requests
-from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import openai
-from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from dotenv import load_dotenv
+import geocoding
+import landmask
+import chat_memory
+from caching import CACHE_DIR, DiskCache, SingleFlight
 
 # Load environment variables
 load_dotenv()
@@ -38,12 +44,233 @@ OPENAI_API_URL = os.getenv('AI_API_URL', 'https://api.openai.com/v1/chat/complet
 # Initialize OpenAI client
 openai.api_key = OPENAI_API_KEY
 
-# User agent for geocoding
-USER_AGENT = "SpaceData-App/1.0"
+# Version of the analysis prompts; bump it whenever they change so cached analyses are not reused
+PROMPT_VERSION = '1'
+
+# Analysis cache configuration
+ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', os.path.join(CACHE_DIR, 'analysis.sqlite3'))
+ANALYSIS_CACHE_TTL = float(os.getenv('ANALYSIS_CACHE_TTL', str(7 * 86400)))  # seconds
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', '10000'))
+ANALYSIS_CACHE_PRECISION = int(os.getenv('ANALYSIS_CACHE_PRECISION', '4'))  # decimal places of polygon vertices
+
+try:
+    _analysis_cache = DiskCache(ANALYSIS_CACHE_PATH, ttl=ANALYSIS_CACHE_TTL, max_entries=ANALYSIS_CACHE_MAX_ENTRIES)
+except Exception as e:
+    logger.warning(f"Analysis cache unavailable, analyses are not cached: {str(e)}")
+    _analysis_cache = None
+
+# Identical analyses running at the same time share one completion
+_analysis_flight = SingleFlight()
+
+
+def parse_polygon(coordinates: Optional[str]) -> Optional[List[Tuple[float, float]]]:
+    """
+    Parse a coordinates JSON string into a polygon ring
+    Returns:
+        [(lat, lng)] vertices without a closing vertex, or None unless the
+        string is a list of at least 3 distinct [lat, lng] pairs of finite numbers
+    """
+    try:
+        coords_list = json.loads(coordinates) if coordinates else None
+        if not isinstance(coords_list, list):
+            return None
+        ring = []
+        for point in coords_list:
+            if not isinstance(point, (list, tuple)) or len(point) < 2 or isinstance(point[0], bool) or isinstance(point[1], bool):
+                return None
+            lat, lng = float(point[0]), float(point[1])
+            if not (math.isfinite(lat) and math.isfinite(lng)):
+                return None
+            ring.append((lat, lng))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring = ring[:-1]
+    return ring if len(set(ring)) >= 3 else None
+
+
+def _polygon_hash(ring: List[Tuple[float, float]]) -> str:
+    """
+    Hash of a polygon (see parse_polygon) quantized to ANALYSIS_CACHE_PRECISION decimal places
+    The ring is normalized (smallest vertex first, one orientation) so the
+    same area drawn differently shares a hash
+    """
+    ring = [(round(lat, ANALYSIS_CACHE_PRECISION), round(lng, ANALYSIS_CACHE_PRECISION)) for lat, lng in ring]
+
+    start = ring.index(min(ring))
+    forward = ring[start:] + ring[:start]
+    backward = [forward[0]] + forward[:0:-1]
+    return hashlib.sha256(json.dumps(min(forward, backward)).encode('utf-8')).hexdigest()
+
+
+def _image_ids(image_urls: Optional[List[str]]) -> List[str]:
+    """Sorted, de-duplicated product ids (last path segment) of image URLs"""
+    ids = set()
+    for url in image_urls or []:
+        path = urlparse(url).path.rstrip('/')
+        if path:
+            ids.add(path.rsplit('/', 1)[-1])
+    return sorted(ids)
+
+
+def analysis_cache_key(
+    data_type: str,
+    start_date: str,
+    end_date: str,
+    image_urls: Optional[List[str]],
+    coordinates: Optional[str]
+) -> Optional[str]:
+    """
+    Cache key of an analysis
+    Combines the data type, the quantized polygon, the date range, the set of
+    images and the prompt version
+    Returns:
+        The key, or None if the coordinates do not describe a valid polygon (such analyses are not cached)
+    """
+    ring = parse_polygon(coordinates)
+    if ring is None:
+        return None
+
+    parts = [PROMPT_VERSION, data_type, _polygon_hash(ring), str(start_date), str(end_date),
+             ','.join(_image_ids(image_urls))]
+    return 'analysis:' + hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_analysis_cache_stats() -> Dict[str, Any]:
+    """
+    Get analysis cache counters
+    Returns:
+        dict: Disk cache and coalescing statistics
+    """
+    return {
+        'disk_cache': _analysis_cache.stats() if _analysis_cache else None,
+        'coalesced': _analysis_flight.stats()
+    }
+
 
 class AIService:
     """Service for AI-related functionality"""
     
+    @staticmethod
+    def _build_chat_messages(
+        query: str,
+        data_type: str,
+        location_name: str,
+        start_date: str,
+        end_date: str,
+        coordinates: Optional[str] = None,
+        image_urls: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build the messages of a chat completion for the data results screen
+        
+        Args:
+            query: The user's query
+            data_type: The type of satellite data
+            location_name: The name of the location
+            start_date: The start date of the data
+            end_date: The end date of the data
+            coordinates: Optional coordinates string in JSON format
+            image_urls: Optional list of URLs to satellite images
+            conversation_id: Optional id of the conversation whose earlier turns are included
+            
+        Returns:
+            The system prompt, the conversation so far and the user's query as chat messages
+        """
+        # Map data type codes to human-readable names
+        data_type_names = {
+            'S2MSI2A': 'Sentinel-2 Level 2A (multispectral imagery)',
+            'S1GRD': 'Sentinel-1 SAR (radar imagery)',
+            'S3OLCI': 'Sentinel-3 OLCI (ocean and land color)'
+        }
+        
+        # Get human-readable data type
+        data_type_name = data_type_names.get(data_type, data_type)
+        
+        # Process coordinates if provided
+        polygon_info = ""
+        if coordinates:
+            try:
+                # Parse the coordinates JSON string
+                coords_list = json.loads(coordinates)
+                
+                if coords_list and len(coords_list) >= 3:
+                    # Calculate center of polygon
+                    lats = [point[0] for point in coords_list]
+                    lngs = [point[1] for point in coords_list]
+                    
+                    center_lat = sum(lats) / len(lats)
+                    center_lng = sum(lngs) / len(lngs)
+                    
+                    # Format polygon for prompt
+                    polygon_str = ", ".join([f"[{lat}, {lng}]" for lat, lng in coords_list])
+                    polygon_info = f"""
+                    The area being analyzed is defined by the following polygon coordinates:
+                    {polygon_str}
+                    
+                    The center of this area is approximately at coordinates [{center_lat:.4f}, {center_lng:.4f}].
+                    """
+                    
+                    # Land/water share from the offline mask (None when no mask is installed)
+                    land_fraction = landmask.land_fraction(coords_list)
+                    if land_fraction is not None:
+                        polygon_info += f"\n{landmask.describe_land_fraction(land_fraction)}"
+                    
+                    # Try to get nearby cities/locations for context
+                    try:
+                        address = geocoding.reverse(center_lat, center_lng)
+                        
+                        if address:
+                            polygon_info += f"\nThis area is located near or within: {address}"
+                    except Exception as geo_error:
+                        logger.warning(f"Geocoding error: {str(geo_error)}")
+            except Exception as coord_error:
+                logger.warning(f"Error processing coordinates: {str(coord_error)}")
+        
+        # Process image URLs if provided
+        image_info = ""
+        if image_urls and len(image_urls) > 0:
+            image_info = f"You have access to {len(image_urls)} satellite images for this area."
+        
+        # Create system prompt for chat assistant
+        system_prompt = f"""
+        You are an AI assistant for SpaceData, a platform that provides satellite imagery and analysis.
+        You are currently helping a user analyze {data_type_name} satellite data for {location_name} from {start_date} to {end_date}.
+        
+        {polygon_info}
+        {image_info}
+        
+        Your role is to provide expert insights and answer questions about the satellite data and the geographic area.
+        Be concise, informative, and scientifically accurate. Focus on providing valuable information about:
+        - Land cover and land use in the area
+        - Environmental changes and trends
+        - Geographic and ecological context
+        - Potential applications of this satellite data
+        
+        If you don't know the answer to a specific question, acknowledge that and suggest what information might be helpful.
+        
+        Keep responses under 200 words unless the user specifically asks for more detailed information.
+        """
+        
+        # Earlier turns of the conversation (summary and recent messages, within the token budget)
+        history = chat_memory.conversations.history(conversation_id) if conversation_id else []
+        
+        # Create messages for the API call
+        messages = [
+            {"role": "system", "content": system_prompt},
+            *history,
+            {"role": "user", "content": query}
+        ]
+        
+        return messages
+    
+    @staticmethod
+    def _chat_fallback_response(location_name: str) -> str:
+        """Response shown when the chat completion fails"""
+        return f"I'm sorry, I encountered an issue while analyzing the satellite data for {location_name}. The system is still processing your request. Please try again in a moment, or ask a different question about the data or the region."
+    
     @staticmethod
     def generate_chat_response(
         query: str,
@@ -52,7 +279,8 @@ class AIService:
         start_date: str,
         end_date: str,
         coordinates: Optional[str] = None,
-        image_urls: Optional[List[str]] = None
+        image_urls: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
     ) -> str:
         """
         Generate a response for the chat assistant in the data results screen
@@ -65,103 +293,97 @@ class AIService:
             end_date: The end date of the data
             coordinates: Optional coordinates string in JSON format
             image_urls: Optional list of URLs to satellite images
+            conversation_id: Optional conversation id; earlier turns are sent along and this one is remembered
             
         Returns:
             The AI-generated response
         """
         try:
-            # Map data type codes to human-readable names
-            data_type_names = {
-                'S2MSI2A': 'Sentinel-2 Level 2A (multispectral imagery)',
-                'S1GRD': 'Sentinel-1 SAR (radar imagery)',
-                'S3OLCI': 'Sentinel-3 OLCI (ocean and land color)'
-            }
-            
-            # Get human-readable data type
-            data_type_name = data_type_names.get(data_type, data_type)
-            
-            # Process coordinates if provided
-            polygon_info = ""
-            if coordinates:
-                try:
-                    # Parse the coordinates JSON string
-                    coords_list = json.loads(coordinates)
-                    
-                    if coords_list and len(coords_list) >= 3:
-                        # Calculate center of polygon
-                        lats = [point[0] for point in coords_list]
-                        lngs = [point[1] for point in coords_list]
-                        
-                        center_lat = sum(lats) / len(lats)
-                        center_lng = sum(lngs) / len(lngs)
-                        
-                        # Format polygon for prompt
-                        polygon_str = ", ".join([f"[{lat}, {lng}]" for lat, lng in coords_list])
-                        polygon_info = f"""
-                        The area being analyzed is defined by the following polygon coordinates:
-                        {polygon_str}
-                        
-                        The center of this area is approximately at coordinates [{center_lat:.4f}, {center_lng:.4f}].
-                        """
-                        
-                        # Try to get nearby cities/locations for context
-                        try:
-                            geolocator = Nominatim(user_agent=USER_AGENT)
-                            location = geolocator.reverse(f"{center_lat}, {center_lng}", language='en')
-                            
-                            if location and location.address:
-                                polygon_info += f"\nThis area is located near or within: {location.address}"
-                        except Exception as geo_error:
-                            logger.warning(f"Geocoding error: {str(geo_error)}")
-                except Exception as coord_error:
-                    logger.warning(f"Error processing coordinates: {str(coord_error)}")
-            
-            # Process image URLs if provided
-            image_info = ""
-            if image_urls and len(image_urls) > 0:
-                image_info = f"You have access to {len(image_urls)} satellite images for this area."
+            messages = AIService._build_chat_messages(
+                query, data_type, location_name, start_date, end_date, coordinates, image_urls, conversation_id
+            )
             
-            # Create system prompt for chat assistant
-            system_prompt = f"""
-            You are an AI assistant for SpaceData, a platform that provides satellite imagery and analysis.
-            You are currently helping a user analyze {data_type_name} satellite data for {location_name} from {start_date} to {end_date}.
+            # Call OpenAI API
+            response = openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                max_tokens=300,
+                temperature=0.7
+            )
             
-            {polygon_info}
-            {image_info}
+            # Extract the response text
+            answer = response.choices[0].message.content.strip()
             
-            Your role is to provide expert insights and answer questions about the satellite data and the geographic area.
-            Be concise, informative, and scientifically accurate. Focus on providing valuable information about:
-            - Land cover and land use in the area
-            - Environmental changes and trends
-            - Geographic and ecological context
-            - Potential applications of this satellite data
+            if conversation_id:
+                chat_memory.conversations.record(conversation_id, query, answer)
             
-            If you don't know the answer to a specific question, acknowledge that and suggest what information might be helpful.
+            return answer
             
-            Keep responses under 200 words unless the user specifically asks for more detailed information.
-            """
+        except Exception as e:
+            logger.error(f"Error generating chat response: {str(e)}")
+            # Fallback response
+            return AIService._chat_fallback_response(location_name)
+    
+    @staticmethod
+    def stream_chat_response(
+        query: str,
+        data_type: str,
+        location_name: str,
+        start_date: str,
+        end_date: str,
+        coordinates: Optional[str] = None,
+        image_urls: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Stream a response for the chat assistant in the data results screen
+        Tokens are yielded as the completion generates them. Closing the
+        generator (e.g. when the client disconnects) closes the upstream
+        stream, which stops the generation
+        
+        Args:
+            Same as generate_chat_response
             
-            # Create messages for the API call
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query}
-            ]
+        Yields:
+            Pieces of the AI-generated response (the fallback response if the
+            completion fails before producing any text); complete responses are
+            remembered in the conversation
+        """
+        stream = None
+        parts = []
+        try:
+            messages = AIService._build_chat_messages(
+                query, data_type, location_name, start_date, end_date, coordinates, image_urls, conversation_id
+            )
             
-            # Call OpenAI API
-            response = openai.chat.completions.create(
+            # Call OpenAI API in streaming mode
+            stream = openai.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=messages,
                 max_tokens=300,
-                temperature=0.7
+                temperature=0.7,
+                stream=True
             )
             
-            # Extract and return the response text
-            return response.choices[0].message.content.strip()
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
             
+            if conversation_id and parts:
+                chat_memory.conversations.record(conversation_id, query, ''.join(parts).strip())
+                    
+        except GeneratorExit:
+            logger.info("Chat stream closed by the client, cancelling the completion")
+            raise
         except Exception as e:
-            logger.error(f"Error generating chat response: {str(e)}")
-            # Fallback response
-            return f"I'm sorry, I encountered an issue while analyzing the satellite data for {location_name}. The system is still processing your request. Please try again in a moment, or ask a different question about the data or the region."
+            logger.error(f"Error streaming chat response: {str(e)}")
+            if not parts:
+                yield AIService._chat_fallback_response(location_name)
+        finally:
+            if stream is not None:
+                stream.close()
     
     @staticmethod
     def generate_home_assistant_response(query: str) -> str:
@@ -229,28 +451,25 @@ class AIService:
             - The formatted location name, or None if geocoding failed
         """
         try:
-            # Initialize geocoder
-            geolocator = Nominatim(user_agent=USER_AGENT)
-            
-            # Geocode the location
-            location = geolocator.geocode(location_query, exactly_one=True)
+            # Geocode the location (cached, through the shared rate-limited client)
+            location = geocoding.geocode(location_query)
             
             if not location:
                 logger.warning(f"Location not found: {location_query}")
                 return None, None
             
             # Get the coordinates
-            lat, lng = location.latitude, location.longitude
+            lat, lng = location['lat'], location['lng']
             
             # Create a bounding box around the location
             # Size depends on the type of location (city, country, etc.)
             # This is a simple implementation - could be improved with more context
             
             # Check if we have a bounding box in the raw data
-            if hasattr(location, 'raw') and 'boundingbox' in location.raw:
+            if location.get('boundingbox'):
                 try:
                     # Extract bounding box from raw data
-                    bbox = location.raw['boundingbox']
+                    bbox = location['boundingbox']
                     min_lat, max_lat, min_lng, max_lng = map(float, bbox)
                     
                     # Create polygon from bounding box
@@ -261,14 +480,14 @@ class AIService:
                         [max_lat, min_lng]
                     ]
                     
-                    return polygon, location.address
+                    return polygon, location['address']
                 except (KeyError, ValueError) as e:
                     logger.warning(f"Error extracting bounding box: {str(e)}")
                     # Fall through to default polygon creation
             
             # Default polygon creation - create a box around the point
             # Size depends on the type of location (approximated by address length)
-            address_length = len(location.address) if hasattr(location, 'address') else 20
+            address_length = len(location['address']) if location.get('address') else 20
             
             # Smaller delta for longer addresses (likely more specific locations)
             delta = max(0.01, min(0.2, 0.5 / (address_length / 20)))
@@ -281,7 +500,7 @@ class AIService:
                 [lat + delta, lng - delta]
             ]
             
-            return polygon, location.address
+            return polygon, location['address']
             
         except (GeocoderTimedOut, GeocoderServiceError) as e:
             logger.error(f"Geocoding service error: {str(e)}")
@@ -300,7 +519,8 @@ class AIService:
         coordinates: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Analyze satellite data and generate insights
+        Analyze satellite data and generate insights, falling back to default results
+        See run_analysis; default results are never cached
         
         Args:
             data_type: The type of satellite data (e.g., 'S2MSI2A')
@@ -313,18 +533,56 @@ class AIService:
         Returns:
             A dictionary containing analysis results
         """
-        # Map data type codes to human-readable names
-        data_type_names = {
-            'S2MSI2A': 'Sentinel-2 Level 2A (multispectral imagery)',
-            'S1GRD': 'Sentinel-1 SAR (radar imagery)',
-            'S3OLCI': 'Sentinel-3 OLCI (ocean and land color)'
-        }
+        results = AIService.run_analysis(data_type, start_date, end_date, image_urls, coordinates)
+        if results is None:
+            # Return default results if all approaches fail
+            logger.warning("All analysis approaches failed, returning default results")
+            return AIService.default_analysis(location_name, start_date, end_date)
+        return results
+    
+    @staticmethod
+    def run_analysis(
+        data_type: str,
+        start_date: str,
+        end_date: str,
+        image_urls: List[str],
+        coordinates: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate the analysis of an order without any fallback
+        Results are cached on disk (see analysis_cache_key), so repeating the
+        analysis of the same order costs no completion
         
-        # Get human-readable data type
-        data_type_name = data_type_names.get(data_type, data_type)
+        Args:
+            data_type: The type of satellite data (e.g., 'S2MSI2A')
+            start_date: The start date of the data
+            end_date: The end date of the data
+            image_urls: List of URLs to satellite images
+            coordinates: Optional coordinates string in JSON format
+            
+        Returns:
+            The analysis results, or None if the analysis failed
+        """
+        key = analysis_cache_key(data_type, start_date, end_date, image_urls, coordinates)
+        
+        if key and _analysis_cache:
+            cached = _analysis_cache.get(key)
+            if cached is not None:
+                logger.info("Returning cached analysis")
+                return cached
+        
+        def run():
+            results = AIService._generate_analysis(start_date, end_date, coordinates)
+            if results is not None and key and _analysis_cache:
+                _analysis_cache.set(key, results)
+            return results
         
-        # Default analysis results in case all approaches fail
-        default_results = {
+        return _analysis_flight.do(key, run) if key else run()
+    
+    @staticmethod
+    def default_analysis(location_name: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Default analysis results in case all approaches fail"""
+        return {
             "land_cover": {
                 "forest": 33.3,
                 "urban": 33.3,
@@ -341,7 +599,15 @@ class AIService:
                 "The system is still processing your request."
             ]
         }
+    
+    @staticmethod
+    def _generate_analysis(start_date: str, end_date: str, coordinates: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Generate an analysis with a completion based on the geographic context of the polygon
         
+        Returns:
+            The analysis results, or None if no analysis could be generated
+        """
         # Parse coordinates if provided
         polygon_info = ""
         nearest_cities = []
@@ -373,48 +639,58 @@ class AIService:
                     # Log the polygon information for debugging
                     logger.info(f"Generated polygon information for coordinates: {polygon_info}")
                     
+                    # Detect water bodies with the offline land/water mask
+                    land_fraction = landmask.land_fraction(coords_list)
+                    if land_fraction is not None:
+                        polygon_info += f"\n{landmask.describe_land_fraction(land_fraction)}"
+                        is_water_body = 1 - land_fraction >= landmask.WATER_BODY_FRACTION
+                        if is_water_body:
+                            logger.info(f"Land mask: {(1 - land_fraction) * 100:.0f}% of the area is water")
+                    
                     # Try to get nearby cities/locations for context
                     try:
-                        geolocator = Nominatim(user_agent=USER_AGENT)
-                        location = geolocator.reverse(f"{center_lat}, {center_lng}", language='en')
+                        if land_fraction is not None:
+                            # The mask already answered the water question, so only the center needs a name
+                            addresses = [geocoding.reverse(center_lat, center_lng)]
+                        else:
+                            # No mask installed: reverse geocode the center and the vertices in one batch
+                            # and guess water bodies from the addresses
+                            addresses = geocoding.reverse_many([(center_lat, center_lng)] + [point[:2] for point in coords_list])
+                        address = addresses[0]
+                        water_body_keywords = ['sea', 'ocean', 'gulf', 'bay', 'strait', 'channel', 'mediterranean', 'atlantic', 'pacific', 'indian ocean', 'arctic']
                         
-                        # Check if this is a water body (sea, ocean, etc.)
-                        if location and location.address:
-                            address_lower = location.address.lower()
-                            water_body_keywords = ['sea', 'ocean', 'gulf', 'bay', 'strait', 'channel', 'mediterranean', 'atlantic', 'pacific', 'indian ocean', 'arctic']
-                            
-                            # Check if any water body keyword is in the address
-                            for keyword in water_body_keywords:
-                                if keyword in address_lower:
-                                    is_water_body = True
-                                    water_body_name = location.address
-                                    logger.info(f"Detected water body: {water_body_name}")
-                                    break
+                        if address:
+                            if is_water_body:
+                                water_body_name = address
+                            elif land_fraction is None:
+                                # Check if any water body keyword is in the address
+                                address_lower = address.lower()
+                                for keyword in water_body_keywords:
+                                    if keyword in address_lower:
+                                        is_water_body = True
+                                        water_body_name = address
+                                        logger.info(f"Detected water body: {water_body_name}")
+                                        break
                             
-                            polygon_info += f"\nThis area is located near or within: {location.address}"
+                            polygon_info += f"\nThis area is located near or within: {address}"
                             
-                            # Try to get additional nearby locations for more context
+                            # Use the vertices for more context
                             water_body_count = 0
                             land_count = 0
                             
-                            for i, point in enumerate(coords_list):
-                                if i % 2 == 0:  # Only check every other point to avoid too many API calls
-                                    try:
-                                        loc = geolocator.reverse(f"{point[0]}, {point[1]}", language='en')
-                                        if loc and loc.address:
-                                            # Check if this point is also a water body
-                                            loc_address_lower = loc.address.lower()
-                                            is_point_water = any(keyword in loc_address_lower for keyword in water_body_keywords)
-                                            
-                                            if is_point_water:
-                                                water_body_count += 1
-                                            else:
-                                                land_count += 1
-                                                
-                                            if loc.address != location.address:
-                                                nearest_cities.append(loc.address)
-                                    except Exception:
-                                        pass
+                            for loc_address in addresses[1:]:
+                                if loc_address:
+                                    # Check if this point is also a water body
+                                    loc_address_lower = loc_address.lower()
+                                    is_point_water = any(keyword in loc_address_lower for keyword in water_body_keywords)
+                                    
+                                    if is_point_water:
+                                        water_body_count += 1
+                                    else:
+                                        land_count += 1
+                                        
+                                    if loc_address != address and loc_address not in nearest_cities:
+                                        nearest_cities.append(loc_address)
                             
                             # If most points are water, mark as water body
                             if water_body_count > land_count and water_body_count > 0:
@@ -423,12 +699,12 @@ class AIService:
                             
                             if nearest_cities:
                                 polygon_info += f"\nNearby areas include: {', '.join(nearest_cities[:3])}"
-                                
-                            # Add water body information to polygon info if detected
-                            if is_water_body:
-                                polygon_info += f"\n\nIMPORTANT: This area appears to be primarily a water body ({water_body_name if water_body_name else 'sea or ocean'})."
                     except Exception as geo_error:
                         logger.warning(f"Geocoding error: {str(geo_error)}")
+                    
+                    # Add water body information to polygon info if detected
+                    if is_water_body:
+                        polygon_info += f"\n\nIMPORTANT: This area appears to be primarily a water body ({water_body_name if water_body_name else 'sea or ocean'})."
         except Exception as coord_error:
             logger.warning(f"Error processing coordinates: {str(coord_error)}")
         
@@ -524,6 +800,4 @@ class AIService:
         except Exception as analysis_error:
             logger.error(f"Error in fallback analysis: {str(analysis_error)}")
         
-        # Return default results if all approaches fail
-        logger.warning("All analysis approaches failed, returning default results")
-        return default_results
+        return None
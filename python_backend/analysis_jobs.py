@@ -0,0 +1,273 @@
+"""
+Analysis jobs for SpaceData application
+Runs AIService.run_analysis in a bounded background thread pool so web
+requests never wait for the completion. Jobs are keyed by a hash of the
+order's parameters (see job_id); the results page polls their status until the
+analysis is done. Failed jobs (no result) are retried with an exponential
+cooldown; the results page renders default results for them
+"""
+
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+import copernicus_api
+from ai_service import AIService, analysis_cache_key, parse_polygon
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Analysis job configuration
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', '100'))  # jobs waiting or running before new ones are refused
+ANALYSIS_JOB_TTL = float(os.getenv('ANALYSIS_JOB_TTL', '86400'))  # seconds a finished job is kept
+ANALYSIS_MAX_JOBS = int(os.getenv('ANALYSIS_MAX_JOBS', '1000'))  # jobs kept in memory
+ANALYSIS_RETRY_DELAY = float(os.getenv('ANALYSIS_RETRY_DELAY', '60'))  # seconds before a failed job may run again
+ANALYSIS_RETRY_MAX_DELAY = float(os.getenv('ANALYSIS_RETRY_MAX_DELAY', '3600'))  # cap of the doubling delay
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class AnalysisJobQueue:
+    """In-memory job store in front of a lazily started thread pool"""
+
+    def __init__(
+        self,
+        max_workers: int = ANALYSIS_WORKERS,
+        queue_size: int = ANALYSIS_QUEUE_SIZE,
+        job_ttl: float = ANALYSIS_JOB_TTL,
+        max_jobs: int = ANALYSIS_MAX_JOBS,
+        retry_delay: float = ANALYSIS_RETRY_DELAY,
+        retry_max_delay: float = ANALYSIS_RETRY_MAX_DELAY
+    ):
+        """
+        Args:
+            max_workers: Number of analyses run at the same time
+            queue_size: Maximum number of pending and running jobs
+            job_ttl: Seconds a finished job is kept
+            max_jobs: Maximum number of jobs kept; the oldest finished ones are dropped first
+            retry_delay: Seconds after a failure before the job may be queued again, doubled per failed attempt
+            retry_max_delay: Maximum retry delay in seconds
+        """
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self._jobs = {}  # job id -> job
+        self._lock = threading.Lock()
+        self._executor = None
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.refused = 0
+        self.retried = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Start the thread pool on first use (called with the lock held)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis')
+        return self._executor
+
+    def _prune(self, now: float) -> None:
+        """Drop expired finished jobs, then the oldest finished ones over max_jobs (called with the lock held)"""
+        finished = [job for job in self._jobs.values() if job['status'] in (DONE, FAILED)]
+        for job in finished:
+            if now - job['finished_at'] > self.job_ttl:
+                del self._jobs[job['id']]
+
+        excess = len(self._jobs) - self.max_jobs
+        if excess > 0:
+            finished = sorted(
+                (job for job in self._jobs.values() if job['status'] in (DONE, FAILED)),
+                key=lambda job: job['finished_at']
+            )
+            for job in finished[:excess]:
+                del self._jobs[job['id']]
+
+    def submit(self, job_id: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Queue an analysis unless a job with this id is already queued, running or done
+        A failed job is queued again only once its retry_at time has passed
+        Args:
+            job_id: Job id (see job_id)
+            params: data_type, location_name, start_date, end_date and coordinates (JSON string)
+        Returns:
+            Snapshot of the job, or None if the queue is full
+        """
+        with self._lock:
+            now = time.time()
+            job = self._jobs.get(job_id)
+            if job is not None and (job['status'] != FAILED or now < job['retry_at']):
+                return self._snapshot(job)
+
+            attempts = job['attempts'] if job is not None else 0
+            if attempts:
+                self.retried += 1
+
+            self._prune(now)
+            active = sum(1 for job in self._jobs.values() if job['status'] in (PENDING, RUNNING))
+            if active >= self.queue_size:
+                self.refused += 1
+                logger.warning(f'Analysis queue full ({active} jobs), refusing job {job_id}')
+                return None
+
+            job = self._jobs[job_id] = {
+                'id': job_id,
+                'status': PENDING,
+                'params': dict(params),
+                'result': None,
+                'error': None,
+                'attempts': attempts,
+                'retry_at': None,
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None
+            }
+            self.submitted += 1
+            self._pool().submit(self._run, job)
+            return self._snapshot(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        """Run one analysis in a worker thread"""
+        with self._lock:
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            job['attempts'] += 1
+
+        params = job['params']
+        try:
+            result = AIService.run_analysis(
+                data_type=params.get('data_type', 'S2MSI2A'),
+                start_date=params.get('start_date', ''),
+                end_date=params.get('end_date', ''),
+                image_urls=_preview_ids(params),
+                coordinates=params.get('coordinates') or None
+            )
+            if result is None:
+                raise RuntimeError('The analysis returned no result')
+            with self._lock:
+                job.update(status=DONE, result=result, finished_at=time.time())
+                self.completed += 1
+            logger.info(f"Analysis job {job['id']} done in {job['finished_at'] - job['started_at']:.1f}s")
+        except Exception as e:
+            logger.error(f"Analysis job {job['id']} failed: {str(e)}")
+            with self._lock:
+                finished_at = time.time()
+                delay = min(self.retry_max_delay, self.retry_delay * 2 ** (job['attempts'] - 1))
+                job.update(status=FAILED, error=str(e), finished_at=finished_at, retry_at=finished_at + delay)
+                self.failed += 1
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job"""
+        return {key: value for key, value in job.items() if key != 'params'}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job
+        Returns:
+            Snapshot with id, status, result (when done), error (when failed) and
+            timestamps, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job counts per state and totals"""
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job['status']] = states.get(job['status'], 0) + 1
+        return {
+            'jobs': states,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'refused': self.refused,
+            'retried': self.retried,
+            'workers': self.max_workers
+        }
+
+
+def job_id(params: Dict[str, Any]) -> Optional[str]:
+    """
+    Id of the analysis job of an order
+    A hash of the data type, the area (quantized and normalized like the
+    analysis cache key) and the dates, so the same order shares one job
+    whatever its transaction hash and different areas never do
+    Args:
+        params: data_type, start_date, end_date and coordinates (JSON string)
+    Returns:
+        Hex job id, or None if the coordinates are given but are not a valid
+        polygon (such orders get no analysis)
+    """
+    data_type = str(params.get('data_type', 'S2MSI2A'))
+    start_date, end_date = str(params.get('start_date', '')), str(params.get('end_date', ''))
+    coordinates = params.get('coordinates') or ''
+
+    if coordinates:
+        if parse_polygon(coordinates) is None:
+            return None
+        key = analysis_cache_key(data_type, start_date, end_date, None, coordinates)
+    else:  # No area: the data type and dates identify the order
+        key = '|'.join([data_type, start_date, end_date])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _preview_ids(params: Dict[str, Any]) -> List[str]:
+    """
+    Ids of the products previewed on the results page, which are part of the analysis cache key
+    Runs the same (cached) search as the results page
+    """
+    try:
+        coordinates = json.loads(params['coordinates']) if params.get('coordinates') else None
+        results = copernicus_api.search_satellite_data(
+            data_type=params.get('data_type', 'S2MSI2A'),
+            coordinates=coordinates,
+            start_date=params.get('start_date'),
+            end_date=params.get('end_date'),
+            cloud_cover_max=100,
+            limit=5,
+            fields=copernicus_api.RESULT_FIELDS
+        )
+        return [item['id'] for item in results if item.get('thumbnail_url')]
+    except Exception as e:
+        logger.warning(f'Could not list the products of the analysis: {str(e)}')
+        return []
+
+
+# Shared queue used by the web workers
+jobs = AnalysisJobQueue()
+
+
+def submit(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Queue the analysis of an order on the shared queue under its job_id (see AnalysisJobQueue.submit)
+    Returns None without queueing anything if the order has no valid job id
+    """
+    order_job_id = job_id(params)
+    if order_job_id is None:
+        return None
+    return jobs.submit(order_job_id, params)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a job of the shared queue (see AnalysisJobQueue.get)"""
+    return jobs.get(job_id)
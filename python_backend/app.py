@@ -5,10 +5,12 @@ Handles API requests for Copernicus satellite data and AI features
 
 import os
 import json
+import hashlib
 import logging
 import uuid
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, session, stream_with_context
+from werkzeug.utils import secure_filename
 from flask_cors import CORS
 import requests
 from dotenv import load_dotenv
@@ -17,9 +19,27 @@ import math
 # Import blockchain bridge
 from blockchain_bridge import blockchain_bp
 
+# Import Copernicus bridge
+from copernicus_bridge import copernicus_bp
+
 # Import AI service
 from ai_service import AIService
 
+# Import geometry engine
+from geometry import footprint_points, polygon_area_km2
+
+# Import pricing engine
+import pricing
+
+# Import cache warmer
+import cache_warmer
+
+# Import analysis job queue
+import analysis_jobs
+
+# Import chat memory
+import chat_memory
+
 # Load environment variables
 load_dotenv()
 
@@ -30,6 +50,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of orders priced by one quote request
+PRICING_MAX_ORDERS = int(os.getenv('PRICING_MAX_ORDERS', '10000'))
+
+# Size of the chunks relayed by streaming downloads
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(256 * 1024)))
+
 # Initialize Flask app
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)  # Enable CORS for all routes
@@ -37,6 +63,12 @@ CORS(app)  # Enable CORS for all routes
 # Register blockchain blueprint
 app.register_blueprint(blockchain_bp, url_prefix='/api/blockchain')
 
+# Register Copernicus blueprint
+app.register_blueprint(copernicus_bp, url_prefix='/api/copernicus')
+
+# Keep popular searches and their previews warm in the background
+cache_warmer.start()
+
 @app.route('/')
 def index():
     """Render the home page"""
@@ -72,6 +104,16 @@ def process_selection():
     if not tx_hash:
         tx_hash = f"0x{uuid.uuid4().hex[:16]}"
     
+    # Start the analysis now; the results page picks up the job by its order parameters
+    if ai_analysis:
+        analysis_jobs.submit({
+            'data_type': data_type,
+            'location_name': 'Selected Area',
+            'start_date': start_date,
+            'end_date': end_date,
+            'coordinates': coordinates
+        })
+    
     # Redirect to results page with parameters
     return redirect(url_for('data_results', 
                            data_type=data_type,
@@ -117,40 +159,42 @@ def data_results():
             start_date=start_date,
             end_date=end_date,
             cloud_cover_max=100,
-            limit=5
+            limit=5,
+            fields=copernicus_api.RESULT_FIELDS
         )
         
         # Extract image URLs and metadata
         satellite_image_urls = []
+        mosaic_url = None
         cloud_cover = 0
         area_size = 100  # Default value
         location_name = "Selected Area"
         
+        # Geodesic area of the selected polygon
+        polygon = copernicus_api.coordinates_to_polygon(coords)
+        if polygon:
+            area_size = round(polygon_area_km2(polygon['coordinates'][0]))
+        
         if satellite_data:
-            # Get thumbnail URLs
+            # Get thumbnail URLs, served through our preview store rather than hotlinked from CDSE
             for item in satellite_data:
                 if item.get('thumbnail_url'):
-                    satellite_image_urls.append(item['thumbnail_url'])
+                    satellite_image_urls.append(url_for('copernicus.product_preview', product_id=item['id']))
+            
+            # Contact sheet of all previews as an overview; the per-date previews load when expanded
+            preview_ids = [item['id'] for item in satellite_data if item.get('thumbnail_url')]
+            if len(preview_ids) > 1:
+                mosaic_url = url_for('copernicus.products_mosaic', ids=','.join(preview_ids))
             
             # Get cloud cover from first item
             if satellite_data[0].get('cloud_cover') is not None:
                 cloud_cover = satellite_data[0]['cloud_cover']
             
-            # Calculate area size from bounding box if available
-            if satellite_data[0].get('bbox'):
-                bbox = satellite_data[0]['bbox']
-                # Simple approximation of area in square kilometers
-                # This is a rough estimate and not accurate for all projections
-                import math
-                earth_radius = 6371  # km
-                lat_diff = abs(bbox[3] - bbox[1])
-                lng_diff = abs(bbox[2] - bbox[0])
-                avg_lat = (bbox[1] + bbox[3]) / 2
-                area_size = (
-                    (math.pi / 180) * earth_radius**2 * 
-                    lat_diff * lng_diff * math.cos(math.radians(avg_lat))
-                )
-                area_size = round(area_size)
+            # Without a selected polygon, report the footprint of the best scene
+            if not polygon:
+                footprint = footprint_points(satellite_data[0].get('geometry'), satellite_data[0].get('bbox'))
+                if footprint:
+                    area_size = round(polygon_area_km2(footprint))
         
         # If no satellite images found, use placeholder
         if not satellite_image_urls:
@@ -160,34 +204,45 @@ def data_results():
         logger.error(f"Error fetching satellite data: {str(e)}")
         # Fallback to placeholder
         satellite_image_urls = ['/static/placeholder.jpg']
+        mosaic_url = None
         cloud_cover = 10
         area_size = 100
         location_name = "Test Area"
     
-    # Mock analysis results
-    analysis_results = {
-        'land_cover': {
-            'forest': 45.2,
-            'urban': 30.1,
-            'water': 24.7
-        },
-        'change': {
-            'forest_change': -1.2,
-            'urban_change': 3.5,
-            'water_change': -0.3
-        },
-        'health': {
-            'vegetationIndex': 0.75,
-            'waterQuality': 'Good',
-            'urbanDensity': 'Medium'
-        },
-        'insights': [
-            'Urban expansion is primarily occurring in the eastern region.',
-            'Forest cover has slightly decreased in the northwest area.',
-            'Water quality remains stable with minor seasonal variations.'
-        ]
+    # Analysis results from the background job (queued here too if the page is opened directly)
+    analysis_results = None
+    analysis_pending = False
+    analysis_job_id = None
+    analysis_params = {
+        'data_type': data_type,
+        'location_name': location_name,
+        'start_date': start_date,
+        'end_date': end_date,
+        'coordinates': coordinates_str
     }
     
+    # The chat conversation is kept per order: the analysis job id, or a hash
+    # of the raw parameters for orders that get no analysis job
+    order_id = analysis_jobs.job_id(analysis_params)
+    chat_key = order_id or hashlib.sha256(
+        '|'.join([data_type, start_date, end_date, coordinates_str]).encode('utf-8')).hexdigest()[:32]
+    
+    if ai_analysis:
+        analysis_job_id = order_id
+        job = analysis_jobs.submit(analysis_params)
+        if job and job['status'] == analysis_jobs.DONE:
+            analysis_results = dict(job['result'])
+        elif job and job['status'] in (analysis_jobs.PENDING, analysis_jobs.RUNNING):
+            analysis_pending = True
+    
+    # Fill in anything the analysis left out so the charts always render
+    defaults = AIService.default_analysis(location_name, start_date, end_date)
+    if analysis_results is None:
+        analysis_results = defaults
+    else:
+        for section in ('land_cover', 'change'):
+            analysis_results[section] = {**defaults[section], **(analysis_results.get(section) or {})}
+    
     # Mock chat messages
     chat_messages = [
         {
@@ -196,7 +251,7 @@ def data_results():
         },
         {
             'type': 'ai',
-            'content': f"The urban areas cover approximately {analysis_results['land_cover']['urban']}% of the region and have expanded by {analysis_results['change']['urban_change']}% since last year. The growth appears concentrated along transportation corridors with {analysis_results['health']['urbanDensity']} density in the central area."
+            'content': f"The urban areas cover approximately {analysis_results['land_cover']['urban']}% of the region and have expanded by {analysis_results['change']['urban_change']}% since last year. The growth appears concentrated along transportation corridors with {analysis_results.get('health', {}).get('urbanDensity', 'Medium')} density in the central area."
         }
     ]
     
@@ -218,46 +273,47 @@ def data_results():
                           end_date=end_date,
                           coordinates=coordinates_str,
                           satellite_image_urls=satellite_image_urls,
+                          mosaic_url=mosaic_url,
                           cloud_cover=cloud_cover,
                           area_size=area_size,
                           location_name=location_name,
                           analysis_results=analysis_results,
+                          analysis_pending=analysis_pending,
+                          analysis_job_id=analysis_job_id,
+                          conversation_id=uuid.uuid4().hex,
+                          chat_key=chat_key,
                           chat_messages=chat_messages,
                           tx_hash=tx_hash,
                           request_id=request_id,
                           view=view,
                           request_params=request_params)
 
+def _chat_request_params():
+    """Chat parameters posted by the data results page"""
+    # Get image URLs if available
+    image_urls = request.form.getlist('image_urls[]')
+    
+    return {
+        'query': request.form.get('message', ''),
+        'data_type': request.form.get('data_type', 'S2MSI2A'),
+        'start_date': request.form.get('start_date', '2023-04-15'),
+        'end_date': request.form.get('end_date', '2023-04-22'),
+        'coordinates': request.form.get('coordinates', ''),
+        'location_name': request.form.get('location_name', 'Selected Area'),
+        'image_urls': image_urls or None,
+        'conversation_id': chat_memory.valid_conversation_id(request.form.get('conversation_id'))
+    }
+
 @app.route('/chat-message', methods=['POST'])
 def chat_message():
     """Handle chat messages"""
-    message = request.form.get('message', '')
-    
-    # Get parameters from the request
-    data_type = request.form.get('data_type', 'S2MSI2A')
-    start_date = request.form.get('start_date', '2023-04-15')
-    end_date = request.form.get('end_date', '2023-04-22')
-    coordinates_str = request.form.get('coordinates', '')
-    location_name = request.form.get('location_name', 'Selected Area')
-    
-    # Get image URLs if available
-    image_urls = request.form.getlist('image_urls[]')
-    if not image_urls:
-        image_urls = None
+    params = _chat_request_params()
     
     try:
         # Use the AI service to generate a response
-        ai_response = AIService.generate_chat_response(
-            query=message,
-            data_type=data_type,
-            location_name=location_name,
-            start_date=start_date,
-            end_date=end_date,
-            coordinates=coordinates_str,
-            image_urls=image_urls
-        )
+        ai_response = AIService.generate_chat_response(**params)
         
-        logger.info(f"Generated AI response for query: {message}")
+        logger.info(f"Generated AI response for query: {params['query']}")
     except Exception as e:
         logger.error(f"Error generating AI response: {str(e)}")
         ai_response = f"I'm sorry, I encountered an issue while analyzing the data. Please try again in a moment."
@@ -269,6 +325,91 @@ def chat_message():
     # Otherwise redirect back to results page
     return redirect(url_for('data_results'))
 
+@app.route('/chat-message/stream', methods=['POST'])
+def chat_message_stream():
+    """
+    Stream the answer to a chat message as Server-Sent Events
+    
+    Each piece of the answer is sent as a `data: {"delta": "..."}` event, followed
+    by a final `done` event. When the client disconnects the completion is cancelled
+    """
+    params = _chat_request_params()
+    logger.info(f"Streaming AI response for query: {params['query']}")
+    
+    def generate():
+        tokens = AIService.stream_chat_response(**params)
+        try:
+            for delta in tokens:
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            # Closes the upstream completion if the client went away mid-stream
+            tokens.close()
+    
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Keep reverse proxies from buffering the events
+    }
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
+
+@app.route('/api/analysis/<job_id>', methods=['GET'])
+def analysis_status(job_id):
+    """
+    Get the status of an analysis job
+
+    Path Parameters:
+        job_id: Job id of the order (hash of its parameters, see analysis_jobs.job_id)
+
+    Returns:
+        JSON with id, status (pending, running, done or failed), result when done,
+        error and retry_at (earliest time it is queued again) when failed, attempts and timestamps
+    """
+    job = analysis_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Job not found',
+            'details': f'No analysis job for {job_id}'
+        }), 404
+    
+    return jsonify(job)
+
+@app.route('/api/pricing/quote', methods=['POST'])
+def pricing_quote():
+    """
+    Quote prices for one or many orders
+
+    Request body:
+        orders: List of orders, each with dataType (code or display name),
+                coordinates ([lat, lng] polygon), startDate, endDate and aiAnalysis;
+                a single order object is also accepted
+
+    Returns:
+        JSON with one quote per order, in the order given
+    """
+    data = request.get_json(silent=True)
+    orders = data.get('orders', [data]) if isinstance(data, dict) else None
+    
+    if not isinstance(orders, list) or not all(isinstance(order, dict) for order in orders):
+        return jsonify({
+            'error': 'Invalid request',
+            'details': 'Expected an order object or {"orders": [...]}'
+        }), 400
+    
+    if len(orders) > PRICING_MAX_ORDERS:
+        return jsonify({
+            'error': 'Too many orders',
+            'details': f'At most {PRICING_MAX_ORDERS} orders can be quoted per request'
+        }), 413
+    
+    try:
+        return jsonify({'quotes': pricing.quote_orders(orders)})
+    except (TypeError, ValueError, IndexError) as e:
+        logger.error(f"Error quoting orders: {str(e)}")
+        return jsonify({
+            'error': 'Invalid order',
+            'details': str(e)
+        }), 400
+
 @app.route('/download-report')
 def download_report():
     """Download a report of the data"""
@@ -285,17 +426,81 @@ def download_report():
 
 @app.route('/download-image')
 def download_image():
-    """Download an image of the data"""
+    """
+    Stream a product asset from CDSE to the client
+    Supports HTTP Range requests so large downloads can resume; the body is
+    relayed in chunks and never buffered in full
+    """
     # Get query parameters
     data_type = request.args.get('data_type', 'S2MSI2A')
     start_date = request.args.get('start_date', '2023-04-15')
     end_date = request.args.get('end_date', '2023-04-22')
     coordinates_str = request.args.get('coordinates', '')
     tx_hash = request.args.get('tx_hash', '')
+    product_id = request.args.get('product_id', '')
+    asset_key = request.args.get('asset') or None
     
-    # In a real implementation, this would download the satellite image
-    # For now, just return a placeholder message
-    return f"This would download an image for {data_type} data from {start_date} to {end_date} with transaction hash {tx_hash}"
+    # Import the Copernicus API module
+    import copernicus_api
+    
+    # Without an explicit product, download the first result of the search
+    if not product_id:
+        coords = None
+        if coordinates_str:
+            try:
+                coords = json.loads(coordinates_str)
+            except json.JSONDecodeError:
+                logger.warning(f"Invalid coordinates format: {coordinates_str}")
+        
+        results = copernicus_api.search_satellite_data(
+            data_type=data_type,
+            coordinates=coords,
+            start_date=start_date,
+            end_date=end_date,
+            limit=1,
+            fields=copernicus_api.RESULT_FIELDS
+        )
+        
+        if not results:
+            return jsonify({
+                'error': 'No product found',
+                'details': f"No {data_type} data from {start_date} to {end_date}"
+            }), 404
+        
+        product_id = results[0]['id']
+    
+    upstream = copernicus_api.open_product_stream(
+        product_id,
+        asset_key=asset_key,
+        range_header=request.headers.get('Range')
+    )
+    
+    if upstream is None:
+        return jsonify({
+            'error': 'Failed to download product',
+            'details': f"Product {product_id} is not available for download"
+        }), 502
+    
+    logger.info(f"Streaming product {product_id} for transaction {tx_hash}")
+    
+    # Relay the headers that describe the body and its byte range (range support is only
+    # advertised when the upstream advertises it)
+    headers = {
+        name: upstream.headers[name]
+        for name in ('Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified')
+        if name in upstream.headers
+    }
+    headers['Content-Disposition'] = f'attachment; filename="{secure_filename(product_id) or "product"}"'
+    
+    def generate():
+        try:
+            for chunk in upstream.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if chunk:
+                    yield chunk
+        finally:
+            upstream.close()
+    
+    return Response(stream_with_context(generate()), status=upstream.status_code, headers=headers)
 
 # Run the app if executed directly
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+"""
+Benchmark for the geometry engine of the SpaceData application
+Measures batched geodesic area/perimeter/centroid and overlap throughput on
+synthetic scene footprints
+
+Usage:
+    python benchmark_geometry.py [--footprints 10000] [--vertices 5] [--repeat 20]
+"""
+
+import time
+import argparse
+import numpy as np
+from geometry import measure_polygons, overlap_fractions, pad_rings
+
+
+def synthetic_footprints(count, vertices, seed=0, around=None):
+    """Random convex footprints (~1 degree scenes) around Europe, or all around one [lng, lat] point"""
+    rng = np.random.default_rng(seed)
+    if around is None:
+        centers = np.column_stack([rng.uniform(-10, 30, count), rng.uniform(35, 60, count)])
+    else:
+        centers = np.asarray(around, dtype=np.float64) + rng.uniform(-0.2, 0.2, (count, 2))
+    angles = np.sort(rng.uniform(0, 2 * np.pi, (count, vertices)), axis=1)
+    radii = rng.uniform(0.4, 0.6, (count, 1))
+    lng = centers[:, :1] + radii * np.cos(angles) / np.cos(np.radians(centers[:, 1:]))
+    lat = centers[:, 1:] + radii * np.sin(angles)
+    return np.stack([lng, lat], axis=2)
+
+
+def best_of(func, repeat):
+    """Best wall time of several runs in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--footprints', type=int, default=10000)
+    parser.add_argument('--vertices', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    footprints = synthetic_footprints(args.footprints, args.vertices)
+    rings = pad_rings(footprints)
+    aoi = [[2.0, 41.2], [2.4, 41.2], [2.4, 41.6], [2.0, 41.6]]
+
+    # Worst case for overlap: every footprint intersects the area of interest.
+    # Scenes around a small area mostly contain it, which needs no clipping
+    overlapping = synthetic_footprints(args.footprints, args.vertices, around=[2.2, 41.4])
+    small_aoi = [[2.17, 41.37], [2.23, 41.37], [2.23, 41.43], [2.17, 41.43]]
+
+    timings = {
+        'area/perimeter/centroid': best_of(lambda: measure_polygons(rings), args.repeat),
+        'overlap, scattered': best_of(lambda: overlap_fractions(aoi, footprints), args.repeat),
+        'overlap, all intersecting': best_of(lambda: overlap_fractions(aoi, overlapping), args.repeat),
+        'overlap, small area': best_of(lambda: overlap_fractions(small_aoi, overlapping), args.repeat)
+    }
+
+    print(f'{args.footprints} footprints x {args.vertices} vertices')
+    for name, seconds in timings.items():
+        print(f'{name:26} {seconds * 1000:8.2f} ms  ({args.footprints / (seconds * 1000):8.0f} footprints/ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Build the land/water mask used by landmask.py
+Rasterizes land polygons from a GeoJSON file (for example Natural Earth's
+ne_10m_land.geojson) into a global uint8 raster (1 = land) saved as .npy.
+Rings are filled with the even-odd rule, so holes (lakes) stay water.
+A finer global raster (.npy or .npz) can be downsampled instead; a cell is
+land when at least half of it is land
+
+Usage:
+    python build_landmask.py ne_10m_land.geojson [--output data/landmask.npy] [--resolution 0.05] [--packed]
+    python build_landmask.py globe_combined_mask_compressed.npz --array mask --invert --resolution 0.25 --packed
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+from landmask import LANDMASK_PATH
+
+EDGE_CHUNK = 500000  # edges rasterized per pass, bounds memory use
+
+
+def iter_rings(geometry):
+    """All rings (outer boundaries and holes) of a GeoJSON geometry as [lng, lat] arrays"""
+    if not geometry:
+        return
+    kind = geometry.get('type')
+    if kind == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif kind == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    elif kind == 'GeometryCollection':
+        for part in geometry.get('geometries', []):
+            yield from iter_rings(part)
+        return
+    else:
+        return
+
+    for polygon in polygons:
+        for ring in polygon:
+            if len(ring) >= 3:
+                yield np.asarray(ring, dtype=np.float64)[:, :2]
+
+
+def load_edges(path):
+    """Edges (x0, y0, x1, y1) of every ring in a GeoJSON file"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    if data.get('type') == 'FeatureCollection':
+        geometries = [feature.get('geometry') for feature in data.get('features', [])]
+    elif data.get('type') == 'Feature':
+        geometries = [data.get('geometry')]
+    else:
+        geometries = [data]
+
+    edges = []
+    for geometry in geometries:
+        for ring in iter_rings(geometry):
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            edges.append(np.hstack([ring[:-1], ring[1:]]))
+    return np.vstack(edges) if edges else np.zeros((0, 4))
+
+
+def rasterize(edges, resolution):
+    """
+    Even-odd scanline fill of all edges at once
+    Every edge toggles the first cell whose centre lies right of its crossing
+    with each row's centre line; a running parity along the row then marks
+    the cells inside an odd number of rings
+    """
+    rows = int(round(180 / resolution))
+    cols = 2 * rows
+    toggles = np.zeros((rows, cols + 1), dtype=np.uint8)  # uint8 wraps mod 256, parity is kept
+
+    for start in range(0, len(edges), EDGE_CHUNK):
+        x0, y0, x1, y1 = edges[start:start + EDGE_CHUNK].T
+        low, high = np.minimum(y0, y1), np.maximum(y0, y1)
+
+        # Rows whose centre line y satisfies low <= y < high
+        first = np.maximum(np.floor((90 - high) / resolution - 0.5).astype(np.int64) + 1, 0)
+        last = np.minimum(np.floor((90 - low) / resolution - 0.5).astype(np.int64), rows - 1)
+        counts = np.maximum(last - first + 1, 0)
+        if not counts.sum():
+            continue
+
+        edge = np.repeat(np.arange(len(counts)), counts)
+        row = first[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        y = 90 - (row + 0.5) * resolution
+        x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+        col = np.clip(np.ceil((x + 180) / resolution - 0.5).astype(np.int64), 0, cols)
+        np.add.at(toggles, (row, col), 1)
+
+    return (np.cumsum(toggles[:, :cols], axis=1, dtype=np.uint8) & 1).astype(np.uint8)
+
+
+def downsample(raster, resolution):
+    """
+    Majority downsampling of a global raster (rows, 2 * rows), row 0 at 90N and column 0 at 180W
+    The input rows must be a multiple of the output rows
+    """
+    rows = int(round(180 / resolution))
+    factor, remainder = divmod(raster.shape[0], rows)
+    if remainder or factor < 1 or raster.shape[1] != 2 * raster.shape[0]:
+        raise ValueError(f'cannot downsample a {raster.shape} raster to {rows} rows')
+
+    cols = 2 * rows
+    mask = np.zeros((rows, cols), dtype=np.uint8)
+    for row in range(rows):  # One band at a time bounds memory use
+        band = np.asarray(raster[row * factor:(row + 1) * factor], dtype=np.uint8)
+        land = band.reshape(factor, cols, factor).sum(axis=(0, 2), dtype=np.int64)
+        mask[row] = 2 * land >= factor * factor
+    return mask
+
+
+def load_raster(path, array=None):
+    """Load a raster from .npy, or one array of a .npz (the first one by default)"""
+    data = np.load(path)
+    if isinstance(data, np.lib.npyio.NpzFile):
+        with data:
+            return data[array or data.files[0]]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='GeoJSON file of land polygons, or a global .npy/.npz raster (non-zero = land)')
+    parser.add_argument('--output', default=LANDMASK_PATH)
+    parser.add_argument('--resolution', type=float, default=0.05, help='cell size in degrees (180 must be a multiple)')
+    parser.add_argument('--array', help='array of a .npz raster to use (defaults to the first one)')
+    parser.add_argument('--invert', action='store_true', help='the raster marks water rather than land')
+    parser.add_argument('--packed', action='store_true', help='save one bit per cell (8 times smaller)')
+    args = parser.parse_args()
+
+    if args.source.endswith(('.npy', '.npz')):
+        raster = load_raster(args.source, args.array)
+        if args.invert:
+            raster = ~raster.astype(bool)
+        source = f'{raster.shape[0]}x{raster.shape[1]} raster'
+        mask = downsample(raster, args.resolution)
+    else:
+        edges = load_edges(args.source)
+        source = f'{len(edges)} edges'
+        mask = rasterize(edges, args.resolution)
+
+    # Write next to the target and rename, so a running server never maps a partial file
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    temporary = f'{args.output}.tmp.npy'
+    np.save(temporary, np.packbits(mask, axis=1) if args.packed else mask)
+    os.replace(temporary, args.output)
+
+    print(f'{source} -> {mask.shape[0]}x{mask.shape[1]} cells, '
+          f'{mask.mean() * 100:.1f}% land, saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Cache warmer for SpaceData application
+Tracks how often each search is requested and re-runs the popular ones (and
+fetches their previews) in a background thread before their cache entries
+expire, within a configurable budget of upstream requests
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Hashable, List
+from dotenv import load_dotenv
+import copernicus_api
+from cdse_transport import transport
+from rate_limit import TokenBucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Cache warmer configuration
+WARMER_ENABLED = os.getenv('CACHE_WARMER_ENABLED', 'true').lower() == 'true'
+WARMER_INTERVAL = float(os.getenv('CACHE_WARMER_INTERVAL', '30'))  # seconds between passes
+WARMER_TOP_N = int(os.getenv('CACHE_WARMER_TOP_N', '20'))  # searches kept warm
+WARMER_MIN_SCORE = float(os.getenv('CACHE_WARMER_MIN_SCORE', '2'))  # decayed request count to count as popular
+WARMER_HALF_LIFE = float(os.getenv('CACHE_WARMER_HALF_LIFE', '3600'))  # seconds for a request to count half
+WARMER_LEAD = float(os.getenv('CACHE_WARMER_LEAD', '120'))  # refresh this long before expiry
+WARMER_MAX_TRACKED = int(os.getenv('CACHE_WARMER_MAX_TRACKED', '1000'))
+WARMER_BUDGET = float(os.getenv('CACHE_WARMER_BUDGET', '30'))  # upstream requests per minute
+WARMER_PREVIEWS = int(os.getenv('CACHE_WARMER_PREVIEWS', '5'))  # previews warmed per search
+
+
+class CacheWarmer:
+    """Background thread keeping popular searches and their previews cached"""
+
+    def __init__(
+        self,
+        interval: float = WARMER_INTERVAL,
+        top_n: int = WARMER_TOP_N,
+        min_score: float = WARMER_MIN_SCORE,
+        half_life: float = WARMER_HALF_LIFE,
+        lead: float = WARMER_LEAD,
+        budget_per_minute: float = WARMER_BUDGET,
+        previews_per_search: int = WARMER_PREVIEWS,
+        max_tracked: int = WARMER_MAX_TRACKED
+    ):
+        """
+        Args:
+            interval: Seconds between warming passes
+            top_n: Number of most popular searches kept warm
+            min_score: Minimum decayed request count for a search to be warmed
+            half_life: Seconds after which a request counts half as much
+            lead: Seconds before expiry at which a search is refreshed
+            budget_per_minute: Upstream requests the warmer may send per minute
+            previews_per_search: Previews fetched for each refreshed search
+            max_tracked: Maximum number of distinct searches tracked
+        """
+        self.interval = interval
+        self.top_n = top_n
+        self.min_score = min_score
+        self.half_life = half_life
+        self.lead = lead
+        self.previews_per_search = previews_per_search
+        self.max_tracked = max_tracked
+        self.budget = TokenBucket(budget_per_minute / 60, capacity=max(1.0, budget_per_minute))
+
+        self._queries = {}  # cache key -> {'args', 'score', 'updated'}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.passes = 0
+        self.searches_refreshed = 0
+        self.previews_warmed = 0
+        self.over_budget = 0
+
+    def _decayed(self, entry: Dict[str, Any], now: float) -> float:
+        """Score of a tracked search decayed to now"""
+        return entry['score'] * 0.5 ** ((now - entry['updated']) / self.half_life)
+
+    def record(self, key: Hashable, args: Dict[str, Any]) -> None:
+        """Count a search request (registered as a copernicus_api search listener)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                if len(self._queries) >= self.max_tracked:
+                    # Forget the least popular search
+                    coldest = min(self._queries, key=lambda k: self._decayed(self._queries[k], now))
+                    del self._queries[coldest]
+                entry = self._queries[key] = {'args': args, 'score': 0.0, 'updated': now}
+            entry['score'] = self._decayed(entry, now) + 1
+            entry['updated'] = now
+
+    def hot_searches(self) -> List[Dict[str, Any]]:
+        """
+        Get the most popular searches
+        Returns:
+            Search arguments with their decayed score, most popular first
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = [
+                (self._decayed(entry, now), entry['args'])
+                for entry in self._queries.values()
+            ]
+        scored = [item for item in scored if item[0] >= self.min_score]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [dict(args, score=score) for score, args in scored[:self.top_n]]
+
+    def _within_budget(self) -> bool:
+        """Whether another refresh or preview may start (its requests are charged as they are sent)"""
+        if self.budget.available() >= 1:
+            return True
+        self.over_budget += 1
+        return False
+
+    def warm_once(self) -> int:
+        """
+        Refresh the popular searches that are missing or about to expire
+        Every upstream attempt made while warming (search pages, read-ahead,
+        token refreshes, preview sources and retries) is charged to the budget
+        through the CDSE transport, so a pass may overdraw it by the requests of
+        one refresh or preview; the next passes wait until that debt is repaid
+        Returns:
+            Number of searches refreshed
+        """
+        refreshed = 0
+        with transport.metered(self.budget.charge):
+            for search in self.hot_searches():
+                args = {key: value for key, value in search.items() if key != 'score'}
+                remaining = copernicus_api.get_search_cache_ttl(**args)
+                if remaining is not None and remaining > self.lead:
+                    continue
+
+                if not self._within_budget():
+                    logger.info('Cache warmer budget exhausted; remaining searches wait for the next pass')
+                    break
+
+                results = copernicus_api.search_satellite_data(**args, refresh=True)
+                self.searches_refreshed += 1
+                refreshed += 1
+
+                for result in results[:self.previews_per_search]:
+                    if not result.get('thumbnail_url') or copernicus_api.get_stored_image(result['id'], 'preview'):
+                        continue
+                    if not self._within_budget():
+                        break
+                    if copernicus_api.get_product_preview(result['id']):
+                        self.previews_warmed += 1
+
+        self.passes += 1
+        return refreshed
+
+    def _run(self) -> None:
+        """Background loop warming the caches every interval"""
+        while not self._stop.wait(self.interval):
+            try:
+                refreshed = self.warm_once()
+                if refreshed:
+                    logger.info(f'Cache warmer refreshed {refreshed} popular searches')
+            except Exception as e:
+                logger.error(f'Error warming caches: {str(e)}')
+
+    def start(self) -> None:
+        """Start tracking searches and warming caches in a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            copernicus_api.add_search_listener(self.record)
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+        logger.info('Cache warmer started')
+
+    def stop(self) -> None:
+        """Stop the warming thread after its current pass"""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get warming metrics"""
+        with self._lock:
+            tracked = len(self._queries)
+        return {
+            'tracked_searches': tracked,
+            'passes': self.passes,
+            'searches_refreshed': self.searches_refreshed,
+            'previews_warmed': self.previews_warmed,
+            'over_budget': self.over_budget,
+            'budget': self.budget.stats()
+        }
+
+
+# Shared warmer started by the Flask app
+warmer = CacheWarmer()
+
+
+def start() -> None:
+    """Start the shared cache warmer unless disabled with CACHE_WARMER_ENABLED=false"""
+    if WARMER_ENABLED:
+        warmer.start()
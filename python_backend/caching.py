@@ -0,0 +1,295 @@
+"""
+Caching utilities for SpaceData application
+In-process and disk caches shared by the Copernicus and AI service modules
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory of the disk caches
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_size: int = 256, ttl: float = 600):
+        """
+        Args:
+            max_size: Maximum number of entries before the least recently used one is evicted
+            ttl: Time to live of an entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, refreshing its LRU position, or default if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries if the cache is full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """Seconds until an entry expires, or None if missing (does not count as a hit or miss)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            remaining = entry[0] - time.monotonic()
+            return remaining if remaining > 0 else None
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution
+    The first caller runs the function; callers arriving while it is in flight
+    wait on its future and share the result (or exception)
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the call in flight
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) unless a call with the same key is already in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Get execution/coalesced-waiter counters"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced
+            }
+
+
+class DiskCache:
+    """
+    Persistent key/value cache in SQLite with per-entry TTL and a size bound
+    Values are stored as JSON; the cache survives restarts and is shared by
+    all threads and processes using the same file
+    """
+
+    # Writes between two size/expiry prunes
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 100000):
+        """
+        Args:
+            path: Path of the SQLite database file
+            ttl: Default time to live of an entry in seconds
+            max_entries: Maximum number of entries before the least recently written ones are dropped
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._connection().execute('CREATE INDEX IF NOT EXISTS idx_entries_updated ON entries (updated_at)')
+        self._connection().commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value, or default if missing or expired"""
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM entries WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f'Error reading disk cache: {str(e)}')
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: list) -> Dict[str, Any]:
+        """Get the values of several keys in one query (missing and expired keys are omitted)"""
+        found = {}
+        keys = list(keys)
+        try:
+            connection = self._connection()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = connection.execute(
+                    f'SELECT key, value FROM entries WHERE expires_at > ? AND key IN ({",".join("?" * len(chunk))})',
+                    [time.time()] + chunk
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        except sqlite3.Error as e:
+            logger.warning(f'Error reading disk cache: {str(e)}')
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._write_lock:
+                connection = self._connection()
+                with connection:
+                    connection.execute(
+                        'INSERT OR REPLACE INTO entries (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)',
+                        (key, json.dumps(value), expires_at, now)
+                    )
+                    self._writes += 1
+                    if self._writes % self.PRUNE_EVERY == 0:
+                        self._prune(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f'Error writing disk cache: {str(e)}')
+
+    def delete(self, key: str) -> None:
+        """Remove an entry"""
+        try:
+            with self._write_lock:
+                connection = self._connection()
+                with connection:
+                    connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logger.warning(f'Error writing disk cache: {str(e)}')
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries and the oldest ones beyond max_entries"""
+        connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        connection.execute(
+            'DELETE FROM entries WHERE key IN ('
+            'SELECT key FROM entries ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Get size and hit/miss counters"""
+        try:
+            size = self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {
+            'size': size,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
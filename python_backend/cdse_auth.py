@@ -0,0 +1,223 @@
+"""
+CDSE authentication for SpaceData application
+Thread-safe access token manager with single-flight refresh, proactive
+background renewal before expiry and backoff after failed refreshes
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from cdse_transport import transport
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Token refresh configuration (seconds)
+REFRESH_MARGIN = float(os.getenv('CDSE_TOKEN_REFRESH_MARGIN', '60'))  # Renew this long before expiry
+MIN_BACKOFF = float(os.getenv('CDSE_TOKEN_MIN_BACKOFF', '1'))
+MAX_BACKOFF = float(os.getenv('CDSE_TOKEN_MAX_BACKOFF', '60'))
+REFRESH_WAIT_TIMEOUT = float(os.getenv('CDSE_TOKEN_WAIT_TIMEOUT', '30'))  # Longest a caller waits on a refresh in flight
+
+
+class TokenManager:
+    """Manages the CDSE access token shared by all request threads"""
+
+    def __init__(
+        self,
+        token_url: str,
+        refresh_margin: float = REFRESH_MARGIN,
+        min_backoff: float = MIN_BACKOFF,
+        max_backoff: float = MAX_BACKOFF
+    ):
+        """
+        Args:
+            token_url: OpenID Connect token endpoint
+            refresh_margin: Seconds before expiry at which the token is renewed
+            min_backoff: Initial delay after a failed refresh
+            max_backoff: Maximum delay after repeated failed refreshes
+        """
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._token = None
+        self._expiry = 0.0  # time.monotonic() at which the token expires
+        self._refresh_at = 0.0  # time.monotonic() at which the token is renewed
+        self._obtained_at = None
+        self._refreshing = False
+        self._failures = 0
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_refresh_latency = None
+
+    @staticmethod
+    def _credentials():
+        """Get client credentials from environment variables"""
+        return os.getenv('CDSE_CLIENT_ID'), os.getenv('CDSE_CLIENT_SECRET')
+
+    def get_token(self) -> Optional[str]:
+        """
+        Get a valid access token
+        Request threads only block on the identity server when no usable
+        token exists; concurrent callers share a single refresh
+        Returns:
+            Access token or None if authentication is skipped or failed
+        """
+        client_id, client_secret = self._credentials()
+        if not client_id or not client_secret:
+            logger.info('No CDSE credentials provided. Skipping authentication.')
+            return None
+
+        self._ensure_background_refresh()
+
+        now = time.monotonic()
+        with self._lock:
+            if self._token and now < self._expiry:
+                # Still valid; the background thread renews it before expiry
+                if now >= self._refresh_at:
+                    self._wakeup.set()
+                return self._token
+
+            if now < self._next_attempt:
+                # Backing off after a failed refresh
+                return None
+
+        return self._refresh()
+
+    def _refresh(self) -> Optional[str]:
+        """Refresh the token, or wait for the refresh already in flight"""
+        with self._lock:
+            if self._refreshing:
+                self._refreshed.wait_for(lambda: not self._refreshing, timeout=REFRESH_WAIT_TIMEOUT)
+                return self._token if time.monotonic() < self._expiry else None
+            self._refreshing = True
+
+        token = None
+        expires_in = 0
+        started = time.monotonic()
+        try:
+            token, expires_in = self._request_token()
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.last_refresh_latency = finished - started
+                if token:
+                    self._token = token
+                    self._expiry = finished + expires_in
+                    self._obtained_at = finished
+                    # Renew ahead of expiry (never more than half the lifetime
+                    # early), with jitter so processes do not renew in lockstep
+                    lead = min(self.refresh_margin, expires_in / 2)
+                    self._refresh_at = self._expiry - lead - random.uniform(0, lead / 4)
+                    self._failures = 0
+                    self._next_attempt = 0.0
+                    self.refresh_count += 1
+                    # Let the background thread schedule the next renewal
+                    self._wakeup.set()
+                else:
+                    self._failures += 1
+                    self.failure_count += 1
+                    backoff = min(self.max_backoff, self.min_backoff * (2 ** (self._failures - 1)))
+                    self._next_attempt = finished + random.uniform(backoff / 2, backoff)
+                self._refreshing = False
+                self._refreshed.notify_all()
+
+        return token
+
+    def _request_token(self):
+        """
+        Request a new token from the identity server
+        Returns:
+            tuple: (access token or None, lifetime in seconds)
+        """
+        client_id, client_secret = self._credentials()
+        try:
+            logger.info('Getting new CDSE access token...')
+
+            response = transport.post(
+                self.token_url,
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": client_id,
+                    "client_secret": client_secret
+                }
+            )
+
+            if response.status_code != 200:
+                logger.error(f"Failed to get access token: {response.text}")
+                return None, 0
+
+            token_data = response.json()
+
+            logger.info('Successfully obtained CDSE access token')
+            return token_data["access_token"], float(token_data["expires_in"])
+        except Exception as e:
+            logger.error(f'Error getting CDSE access token: {str(e)}')
+            logger.info('Proceeding without authentication (some features may be limited)')
+            return None, 0
+
+    def _ensure_background_refresh(self) -> None:
+        """Start the background refresh thread on first use"""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cdse-token-refresh', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Background loop renewing the token before it expires"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._next_attempt > now:
+                    delay = self._next_attempt - now
+                elif self._token:
+                    delay = self._refresh_at - now
+                else:
+                    delay = None  # Nothing to renew until a caller needs a token
+
+            if delay is None or delay > 0:
+                self._wakeup.wait(timeout=delay)
+                self._wakeup.clear()
+                with self._lock:
+                    due = self._token and time.monotonic() >= self._refresh_at
+                    backing_off = time.monotonic() < self._next_attempt
+                if not due or backing_off:
+                    continue
+
+            self._refresh()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get token metrics
+        Returns:
+            Dictionary with token age, remaining lifetime and refresh latency in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'valid': self._token is not None and now < self._expiry,
+                'token_age': None if self._obtained_at is None else now - self._obtained_at,
+                'expires_in': max(0.0, self._expiry - now) if self._token else None,
+                'last_refresh_latency': self.last_refresh_latency,
+                'refresh_count': self.refresh_count,
+                'failure_count': self.failure_count,
+                'consecutive_failures': self._failures
+            }
@@ -0,0 +1,181 @@
+"""
+CDSE HTTP transport for SpaceData application
+Shared keep-alive connection pool, per-host concurrency caps, bounded timeouts
+and jittered exponential retry for every call to the Copernicus Data Space Ecosystem
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool configuration
+POOL_CONNECTIONS = int(os.getenv('CDSE_POOL_CONNECTIONS', '10'))  # Number of hosts kept in the pool
+POOL_MAXSIZE = int(os.getenv('CDSE_POOL_MAXSIZE', '20'))  # Keep-alive connections per host
+MAX_CONCURRENCY_PER_HOST = int(os.getenv('CDSE_MAX_CONCURRENCY_PER_HOST', '8'))
+
+# Timeouts in seconds (connect, read)
+CONNECT_TIMEOUT = float(os.getenv('CDSE_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('CDSE_READ_TIMEOUT', '30'))
+
+# Retry configuration
+MAX_RETRIES = int(os.getenv('CDSE_MAX_RETRIES', '3'))
+BACKOFF_BASE = float(os.getenv('CDSE_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX = float(os.getenv('CDSE_BACKOFF_MAX', '10'))
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Callback charged once per upstream attempt made in the current context (see CDSETransport.metered)
+_request_meter: contextvars.ContextVar[Optional[Callable[[int], None]]] = contextvars.ContextVar(
+    'cdse_request_meter', default=None)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """Thread pool running each task in a copy of the submitter's context, so metered requests stay metered"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class CDSETransport:
+    """Pooled HTTP session shared by all CDSE API calls"""
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        max_concurrency_per_host: int = MAX_CONCURRENCY_PER_HOST,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency_per_host = max_concurrency_per_host
+
+        # Retries are handled here so that they share the jittered backoff,
+        # so the adapter itself must not retry
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore_for(self, url: str) -> threading.BoundedSemaphore:
+        """Get the concurrency cap for the host of a URL"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency_per_host)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _backoff_delay(self, attempt: int, response=None) -> float:
+        """
+        Compute the delay before the next attempt
+        Honours a numeric Retry-After header, otherwise uses full-jitter exponential backoff
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, max(0.0, float(retry_after)))
+                except ValueError:
+                    pass
+
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @contextmanager
+    def metered(self, charge: Callable[[int], None]) -> Iterator[None]:
+        """
+        Charge every upstream attempt made in this context, retries included
+        Work handed to a ContextThreadPoolExecutor is charged as well
+        Args:
+            charge: Called with 1 before each attempt
+        """
+        token = _request_meter.set(charge)
+        try:
+            yield
+        finally:
+            _request_meter.reset(token)
+
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared pool
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            retry (bool): Whether to retry on 429/5xx responses and connection errors
+            **kwargs: Passed through to requests.Session.request
+        Returns:
+            requests.Response: The final response (which may still be a 429/5xx once retries are exhausted)
+        Raises:
+            requests.RequestException: If the last attempt failed without a response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        attempts = self.max_retries + 1 if retry else 1
+        semaphore = self._semaphore_for(url)
+
+        meter = _request_meter.get()
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            if meter is not None:
+                meter(1)
+            try:
+                # With stream=True only the request and response headers are
+                # covered by the concurrency cap; the body is read by the caller
+                with semaphore:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f'{method} {url} failed ({str(e)}), retrying in {delay:.2f}s')
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = self._backoff_delay(attempt, response)
+            logger.warning(f'{method} {url} returned {response.status_code}, retrying in {delay:.2f}s')
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request through the shared pool"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request through the shared pool"""
+        return self.request('POST', url, **kwargs)
+
+
+# Shared transport used by every CDSE call
+transport = CDSETransport()
@@ -0,0 +1,227 @@
+"""
+Chat memory for SpaceData application
+Per-conversation history for the results page chat. At most
+CHAT_MEMORY_MAX_SESSIONS conversations are kept (the least recently used is
+evicted, idle ones expire) and each has a token budget: once it is exceeded,
+older turns are folded into a rolling summary in the background, so the
+prompt stays the same size however long the chat runs
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import openai
+from dotenv import load_dotenv
+from caching import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Chat memory configuration
+CHAT_MEMORY_MAX_SESSIONS = int(os.getenv('CHAT_MEMORY_MAX_SESSIONS', '1000'))
+CHAT_MEMORY_IDLE_TTL = float(os.getenv('CHAT_MEMORY_IDLE_TTL', '3600'))  # seconds before an idle conversation is dropped
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_TOKEN_BUDGET', '1500'))  # history tokens sent with each message
+CHAT_MEMORY_KEEP_MESSAGES = int(os.getenv('CHAT_MEMORY_KEEP_MESSAGES', '4'))  # recent messages never summarized
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', '200'))
+CHAT_SUMMARY_MODEL = os.getenv('CHAT_SUMMARY_MODEL', 'gpt-4o-mini')
+MAX_CONVERSATION_ID_LENGTH = 128
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut a text to at most `tokens` estimated tokens, marking the cut with an ellipsis"""
+    if estimate_tokens(text) <= tokens:
+        return text
+    if tokens < 1:
+        return ''
+    return text[:(tokens - 1) * 4 + 2] + '…'
+
+
+class Conversation:
+    """Rolling summary and recent messages of one conversation"""
+
+    __slots__ = ('summary', 'messages', 'compacting', 'lock')
+
+    def __init__(self):
+        self.summary = ''
+        self.messages = []  # {'role': 'user' | 'assistant', 'content': str}, oldest first
+        self.compacting = False
+        self.lock = threading.Lock()
+
+    def tokens(self) -> int:
+        """Estimated tokens of the summary and the messages"""
+        return estimate_tokens(self.summary) + sum(estimate_tokens(message['content']) for message in self.messages)
+
+
+class ConversationStore:
+    """Bounded store of conversations with background summarization"""
+
+    def __init__(
+        self,
+        max_sessions: int = CHAT_MEMORY_MAX_SESSIONS,
+        idle_ttl: float = CHAT_MEMORY_IDLE_TTL,
+        token_budget: int = CHAT_MEMORY_TOKEN_BUDGET,
+        keep_messages: int = CHAT_MEMORY_KEEP_MESSAGES
+    ):
+        """
+        Args:
+            max_sessions: Maximum number of conversations kept; the least recently used one is evicted
+            idle_ttl: Seconds after the last message at which a conversation is dropped
+            token_budget: Estimated tokens of history (summary and messages) sent with each message
+            keep_messages: Number of most recent messages kept verbatim when summarizing
+        """
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self._sessions = TTLCache(max_size=max_sessions, ttl=idle_ttl)
+        self._lock = threading.Lock()
+        self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary')
+
+        # Metrics
+        self.summaries = 0
+        self.summary_failures = 0
+
+    def _get(self, conversation_id: str, create: bool) -> Optional[Conversation]:
+        """Get a conversation, refreshing its idle timer and LRU position"""
+        with self._lock:
+            conversation = self._sessions.get(conversation_id)
+            if conversation is None and create:
+                conversation = Conversation()
+            if conversation is not None:
+                self._sessions.set(conversation_id, conversation)
+            return conversation
+
+    def history(self, conversation_id: str) -> List[Dict[str, str]]:
+        """
+        Messages to send before a new user message
+        Returns:
+            A system message with the summary of earlier turns (if any) followed by
+            the recent messages, trimmed from the oldest to fit the token budget
+            (a newest message longer than the whole budget is cut to fit)
+        """
+        conversation = self._get(conversation_id, create=False)
+        if conversation is None:
+            return []
+
+        with conversation.lock:
+            summary = conversation.summary
+            messages = list(conversation.messages)
+
+        budget = self.token_budget
+        history = []
+        if summary:
+            history.append({'role': 'system', 'content': f'Summary of the earlier conversation: {summary}'})
+            budget -= estimate_tokens(history[0]['content'])
+
+        # Newest messages first until the budget is spent (summarization may still be pending)
+        recent = []
+        for message in reversed(messages):
+            tokens = estimate_tokens(message['content'])
+            if tokens > budget:
+                if not recent and budget >= 1:
+                    recent.append(dict(message, content=truncate_to_tokens(message['content'], budget)))
+                break
+            budget -= tokens
+            recent.append(message)
+        return history + recent[::-1]
+
+    def record(self, conversation_id: str, user_message: str, assistant_message: str) -> None:
+        """Add a user message and the answer to a conversation, summarizing older turns if over budget"""
+        conversation = self._get(conversation_id, create=True)
+        with conversation.lock:
+            conversation.messages.append({'role': 'user', 'content': user_message})
+            conversation.messages.append({'role': 'assistant', 'content': assistant_message})
+            if (conversation.tokens() <= self.token_budget or conversation.compacting
+                    or len(conversation.messages) <= self.keep_messages):
+                return
+            conversation.compacting = True
+
+        self._summarizer.submit(self._compact, conversation_id, conversation)
+
+    def _compact(self, conversation_id: str, conversation: Conversation) -> None:
+        """Fold all but the most recent messages into the summary (runs on the summarizer thread)"""
+        try:
+            with conversation.lock:
+                summary = conversation.summary
+                count = len(conversation.messages) - self.keep_messages
+                older = conversation.messages[:count]
+
+            try:
+                new_summary = summarize(summary, older)
+                self.summaries += 1
+            except Exception as e:
+                # Keep the prompt bounded anyway: older turns are dropped without a summary
+                logger.warning(f'Could not summarize conversation {conversation_id}, dropping older turns: {str(e)}')
+                new_summary = summary
+                self.summary_failures += 1
+
+            with conversation.lock:
+                conversation.summary = new_summary
+                # Messages recorded meanwhile were appended after the summarized ones
+                del conversation.messages[:count]
+        finally:
+            with conversation.lock:
+                conversation.compacting = False
+
+    def clear(self, conversation_id: str) -> None:
+        """Forget a conversation"""
+        with self._lock:
+            self._sessions.pop(conversation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get conversation and summarization counters"""
+        return {
+            'sessions': self._sessions.stats(),
+            'summaries': self.summaries,
+            'summary_failures': self.summary_failures
+        }
+
+
+def summarize(summary: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Fold messages into a rolling conversation summary with a small completion
+    Args:
+        summary: Summary of the turns before these messages (may be empty)
+        messages: Messages to add to the summary, oldest first
+    Returns:
+        The new summary
+    """
+    transcript = '\n'.join(f"{message['role']}: {message['content']}" for message in messages)
+    prompt = f"""
+    Update the summary of a conversation between a user and the SpaceData satellite data assistant.
+    Keep the facts, figures, places and open questions the assistant needs to answer follow-up questions.
+    Write at most {CHAT_SUMMARY_MAX_TOKENS // 2} words.
+
+    Current summary:
+    {summary or '(none)'}
+
+    New messages:
+    {transcript}
+    """
+
+    response = openai.chat.completions.create(
+        model=CHAT_SUMMARY_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        temperature=0.2
+    )
+    return response.choices[0].message.content.strip()
+
+
+def valid_conversation_id(conversation_id: Optional[str]) -> Optional[str]:
+    """The conversation id if it is usable as a key, else None"""
+    if conversation_id and len(conversation_id) <= MAX_CONVERSATION_ID_LENGTH:
+        return conversation_id
+    return None
+
+
+# Shared store used by the chat endpoints
+conversations = ConversationStore()
@@ -5,9 +5,18 @@ Handles API calls to the Copernicus Data Space Ecosystem using STAC API
 
 import os
 import json
+import time
 import logging
-import requests
+import threading
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import FIRST_COMPLETED, wait
 from dotenv import load_dotenv
+from cdse_transport import ContextThreadPoolExecutor, transport
+from cdse_auth import TokenManager
+from caching import SingleFlight, TTLCache
+from stac_catalog import STACCatalog
+from preview_store import PreviewStore
+from geometry import footprint_parts, part_overlap_fractions
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,10 +28,96 @@ load_dotenv()
 TOKEN_URL = "https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token"
 STAC_URL = "https://stac.dataspace.copernicus.eu/v1"
 ODATA_URL = "https://catalogue.dataspace.copernicus.eu/odata/v1/Products"
+DOWNLOAD_URL = "https://download.dataspace.copernicus.eu/odata/v1/Products"
+CDSE_DOMAIN = "dataspace.copernicus.eu"  # hosts trusted with the access token
+MAX_DOWNLOAD_REDIRECTS = 5
 
-# Token management
-access_token = None
-token_expiry = 0
+# Map OData data types to STAC collections
+COLLECTION_MAP = {
+    'S2MSI2A': 'sentinel-2-l2a',
+    'S1GRD': 'sentinel-1-grd',
+    'S3OLCI': 'sentinel-3-olci',
+    # Add more mappings as needed
+}
+
+# STAC fields needed to build a SearchResult, for use as a fields projection
+RESULT_FIELDS = [
+    'id',
+    'bbox',
+    'geometry',
+    'properties.datetime',
+    'properties.eo:cloud_cover',
+    'assets.thumbnail',
+    'assets.preview',
+    'assets.overview',
+    'assets.browse'
+]
+
+# Pagination configuration
+DEFAULT_PAGE_SIZE = int(os.getenv('CDSE_STAC_PAGE_SIZE', '50'))
+PAGE_PREFETCH_WORKERS = int(os.getenv('CDSE_STAC_PREFETCH_WORKERS', '4'))
+
+# Background threads reading the next STAC page ahead
+_page_executor = ContextThreadPoolExecutor(max_workers=PAGE_PREFETCH_WORKERS, thread_name_prefix='stac-prefetch')
+
+# Metadata lookup configuration
+METADATA_BATCH_SIZE = int(os.getenv('CDSE_METADATA_BATCH_SIZE', '50'))
+ODATA_WORKERS = int(os.getenv('CDSE_ODATA_WORKERS', '8'))
+
+# Threads resolving STAC misses against the OData API
+_metadata_executor = ContextThreadPoolExecutor(max_workers=ODATA_WORKERS, thread_name_prefix='odata-metadata')
+
+# Preview fetching configuration
+PREVIEW_HEDGING = os.getenv('CDSE_PREVIEW_HEDGING', 'true').lower() == 'true'
+PREVIEW_HEDGE_DELAY = float(os.getenv('CDSE_PREVIEW_HEDGE_DELAY', '0.8'))  # seconds before fallbacks start
+PREVIEW_WORKERS = int(os.getenv('CDSE_PREVIEW_WORKERS', '16'))
+
+# Threads racing preview sources against each other
+_preview_executor = ContextThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix='preview-hedge')
+
+# Scenes covering less than this fraction of the search polygon are dropped
+MIN_OVERLAP = float(os.getenv('CDSE_MIN_OVERLAP', '0'))
+
+# A limited polygon search ranks this many times `limit` scenes by overlap before truncating
+POLYGON_CANDIDATE_FACTOR = int(os.getenv('CDSE_POLYGON_CANDIDATE_FACTOR', '3'))
+
+# Item cache configuration
+ITEM_CACHE_SIZE = int(os.getenv('CDSE_ITEM_CACHE_SIZE', '2048'))
+ITEM_CACHE_TTL = float(os.getenv('CDSE_ITEM_CACHE_TTL', '3600'))  # seconds
+
+# STAC items by product ID, filled by searches, metadata and preview lookups
+_item_cache = TTLCache(max_size=ITEM_CACHE_SIZE, ttl=ITEM_CACHE_TTL)
+
+# Search cache configuration
+SEARCH_CACHE_SIZE = int(os.getenv('CDSE_SEARCH_CACHE_SIZE', '256'))
+SEARCH_CACHE_TTL = float(os.getenv('CDSE_SEARCH_CACHE_TTL', '600'))  # seconds
+BBOX_PRECISION = int(os.getenv('CDSE_BBOX_PRECISION', '4'))  # decimal places used in cache keys
+
+# In-process cache of search results keyed by normalized query
+_search_cache = TTLCache(max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Identical searches in flight at the same time share one upstream call
+_search_flight = SingleFlight()
+
+# Callbacks notified of every user search (e.g. the cache warmer)
+_search_listeners = []
+
+# Persistent local catalog of fetched STAC features
+try:
+    _catalog = STACCatalog()
+except Exception as e:
+    logger.warning(f'STAC catalog unavailable, searches will not be answered locally: {str(e)}')
+    _catalog = None
+
+# Disk-backed store of fetched preview images
+try:
+    _preview_store = PreviewStore()
+except Exception as e:
+    logger.warning(f'Preview store unavailable, previews will not be stored: {str(e)}')
+    _preview_store = None
+
+# Token management shared by all request threads
+_token_manager = TokenManager(TOKEN_URL)
 
 def get_access_token():
     """
@@ -30,53 +125,15 @@ def get_access_token():
     Returns:
         str|None: Access token or None if authentication is skipped
     """
-    global access_token, token_expiry
-    
-    import time
-    now = int(time.time() * 1000)
-    
-    # Return cached token if still valid
-    if access_token and now < token_expiry - 60000:  # 1 minute buffer
-        return access_token
-    
-    # Get credentials from environment variables
-    client_id = os.getenv('CDSE_CLIENT_ID')
-    client_secret = os.getenv('CDSE_CLIENT_SECRET')
-    
-    # Check if credentials are provided
-    if not client_id or not client_secret:
-        logger.info('No CDSE credentials provided. Skipping authentication.')
-        return None
-    
-    try:
-        logger.info('Getting new CDSE access token...')
-        
-        # Request new token
-        response = requests.post(
-            TOKEN_URL,
-            data={
-                "grant_type": "client_credentials",
-                "client_id": client_id,
-                "client_secret": client_secret
-            }
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to get access token: {response.text}")
-            return None
-        
-        token_data = response.json()
-        
-        # Store token and expiry
-        access_token = token_data["access_token"]
-        token_expiry = now + (token_data["expires_in"] * 1000)
-        
-        logger.info('Successfully obtained CDSE access token')
-        return access_token
-    except Exception as e:
-        logger.error(f'Error getting CDSE access token: {str(e)}')
-        logger.info('Proceeding without authentication (some features may be limited)')
-        return None
+    return _token_manager.get_token()
+
+def get_token_stats():
+    """
+    Get token age and refresh latency metrics
+    Returns:
+        dict: Token statistics
+    """
+    return _token_manager.stats()
 
 def coordinates_to_bbox(coords):
     """
@@ -112,7 +169,461 @@ def coordinates_to_bbox(coords):
     
     return [west, south, east, north]
 
-def search_satellite_data(data_type, coordinates, start_date, end_date, cloud_cover_max=100, limit=10):
+def coordinates_to_polygon(coords):
+    """
+    Convert coordinates array to a GeoJSON polygon for STAC intersects searches
+    Args:
+        coords (list): Array of [lat, lng] coordinates or string representation
+    Returns:
+        dict: GeoJSON Polygon with a closed [lng, lat] ring, or None if the
+              coordinates do not describe a polygon
+    """
+    if isinstance(coords, str):
+        try:
+            coords = json.loads(coords)
+        except json.JSONDecodeError:
+            return None
+    
+    if not coords or not isinstance(coords, list) or len(coords) < 3:
+        return None
+    
+    try:
+        ring = [[float(point[1]), float(point[0])] for point in coords]
+    except (TypeError, ValueError, IndexError):
+        logger.warning(f"Invalid coordinates format: {coords}")
+        return None
+    
+    if ring[0] != ring[-1]:
+        ring.append(list(ring[0]))
+    
+    if len(ring) < 4:
+        return None
+    
+    return {"type": "Polygon", "coordinates": [ring]}
+
+def _collection_for(data_type):
+    """
+    Map an OData data type to its STAC collection
+    Args:
+        data_type (str): Data type ID (e.g., 'S2MSI2A')
+    Returns:
+        str: STAC collection name
+    """
+    return COLLECTION_MAP.get(data_type, 'sentinel-2-l2a')
+
+def search_cache_key(collection, bbox, date_range, cloud_cover_max, limit, precision=None, fields=None, polygon=None):
+    """
+    Build the canonical cache key of a STAC search
+    Args:
+        collection (str): STAC collection name
+        bbox (list): Bounding box [west, south, east, north]
+        date_range (str): STAC datetime range
+        cloud_cover_max (int): Maximum cloud cover percentage
+        limit (int): Maximum number of results, or None for all
+        precision (int): Decimal places the bbox is rounded to (defaults to CDSE_BBOX_PRECISION)
+        fields (list): STAC fields projection
+        polygon (dict): GeoJSON Polygon searched with intersects, rounded like the bbox
+    Returns:
+        tuple: Hashable cache key
+    """
+    if precision is None:
+        precision = BBOX_PRECISION
+    
+    return (
+        collection,
+        tuple(round(float(value), precision) for value in bbox),
+        date_range,
+        float(cloud_cover_max),
+        None if limit is None else int(limit),
+        _normalize_fields(fields),
+        None if polygon is None else tuple(
+            (round(float(lng), precision), round(float(lat), precision))
+            for lng, lat in polygon['coordinates'][0]
+        )
+    )
+
+def get_search_cache_stats():
+    """
+    Get hit/miss/eviction counters of the search cache
+    Returns:
+        dict: Cache statistics
+    """
+    return _search_cache.stats()
+
+def add_search_listener(listener):
+    """
+    Register a callback notified of every search that is not a refresh
+    Args:
+        listener (callable): Called as listener(cache_key, search_args) where
+            search_args are the keyword arguments of search_satellite_data
+    """
+    _search_listeners.append(listener)
+
+def get_search_cache_ttl(data_type, coordinates, start_date, end_date, cloud_cover_max=100, limit=10, fields=None):
+    """
+    Get the seconds until a cached search expires
+    Returns:
+        float: Remaining time to live, or None if the search is not cached
+    """
+    bbox = coordinates_to_bbox(coordinates)
+    polygon = coordinates_to_polygon(coordinates)
+    date_range = _search_date_range(start_date, end_date)[2]
+    cache_key = search_cache_key(_collection_for(data_type), bbox, date_range, cloud_cover_max, limit,
+                                 fields=fields, polygon=polygon)
+    return _search_cache.ttl_remaining(cache_key)
+
+def get_search_flight_stats():
+    """
+    Get counters of coalesced concurrent searches
+    Returns:
+        dict: Number of upstream executions and of callers that waited on one in flight
+    """
+    return _search_flight.stats()
+
+class SearchResult:
+    """
+    Compact search result holding only the projected fields (RESULT_FIELDS)
+    Assets and properties are rebuilt from the stored subset on access, so the
+    rest of the STAC feature is not kept alive. Supports dict-style access
+    (result['id'], result.get('bbox')) for existing callers
+    """
+    
+    __slots__ = ('id', 'datetime', 'cloud_cover', 'thumbnail_url', 'bbox', 'geometry', 'overlap', '_assets')
+    
+    FIELDS = ('id', 'name', 'datetime', 'cloud_cover', 'thumbnail_url', 'assets', 'properties', 'bbox', 'geometry',
+              'overlap')
+    
+    # Image assets kept from the feature, in order of preference for the thumbnail
+    ASSETS = tuple(path.split('.', 1)[1] for path in RESULT_FIELDS if path.startswith('assets.'))
+    
+    def __init__(self, feature):
+        """
+        Args:
+            feature (dict): STAC feature (full or projected with RESULT_FIELDS)
+        """
+        properties = feature.get('properties') or {}
+        assets = feature.get('assets') or {}
+        
+        self.id = feature['id']
+        self.datetime = properties.get('datetime')
+        self.cloud_cover = properties.get('eo:cloud_cover', 0)
+        self.bbox = feature.get('bbox')
+        self.geometry = feature.get('geometry')
+        self.overlap = None  # Fraction of the search polygon covered, set by polygon searches
+        self._assets = {
+            asset_type: assets[asset_type]['href']
+            for asset_type in self.ASSETS
+            if isinstance(assets.get(asset_type), dict) and 'href' in assets[asset_type]
+        }
+        
+        # Find thumbnail or preview image
+        self.thumbnail_url = next(iter(self._assets.values()), None)
+    
+    @property
+    def name(self):
+        return self.id
+    
+    @property
+    def assets(self):
+        return {asset_type: {'href': href} for asset_type, href in self._assets.items()}
+    
+    @property
+    def properties(self):
+        return {'datetime': self.datetime, 'eo:cloud_cover': self.cloud_cover}
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.FIELDS else None
+        return default if value is None else value
+    
+    def keys(self):
+        return list(self.FIELDS)
+    
+    def to_dict(self):
+        """Convert to the plain dictionary format"""
+        return {key: getattr(self, key) for key in self.FIELDS}
+    
+    def __repr__(self):
+        return f"SearchResult(id={self.id!r}, datetime={self.datetime!r}, cloud_cover={self.cloud_cover!r})"
+
+def _feature_to_result(feature):
+    """
+    Convert a STAC feature to a search result
+    Args:
+        feature (dict): STAC feature
+    Returns:
+        SearchResult: Search result
+    """
+    return SearchResult(feature)
+
+def _normalize_fields(fields):
+    """
+    Normalize a fields projection, always keeping the id
+    Args:
+        fields (list|None): STAC fields extension include paths (e.g., 'properties.datetime')
+    Returns:
+        tuple|None: Sorted include paths or None for full features
+    """
+    if not fields:
+        return None
+    return tuple(sorted(set(fields) | {'id'}))
+
+# Normalized RESULT_FIELDS projection; its cached features are enough for preview lookups
+RESULT_PROJECTION = _normalize_fields(RESULT_FIELDS)
+
+def _cache_item(feature, fields):
+    """
+    Keep a listed feature in the item cache
+    Projected features are partial and are cached under (id, projection), so
+    lookups needing full features never see them
+    Args:
+        feature (dict): STAC feature
+        fields (tuple|None): Normalized projection of the feature, None for full features
+    """
+    _item_cache.set((feature['id'], fields) if fields else feature['id'], feature)
+
+def _project_feature(feature, fields):
+    """
+    Apply a fields projection to a locally stored STAC feature
+    Args:
+        feature (dict): STAC feature
+        fields (tuple): Include paths
+    Returns:
+        dict: Projected feature
+    """
+    projected = {}
+    for path in fields:
+        source, target = feature, projected
+        keys = path.split('.')
+        for key in keys[:-1]:
+            if not isinstance(source, dict) or key not in source:
+                source = None
+                break
+            source = source[key]
+            target = target.setdefault(key, {})
+        if isinstance(source, dict) and keys[-1] in source:
+            target[keys[-1]] = source[keys[-1]]
+    return projected
+
+def _search_date_range(start_date, end_date):
+    """
+    Format a date window as STAC datetime bounds
+    Args:
+        start_date (str): Start date (YYYY-MM-DD)
+        end_date (str): End date (YYYY-MM-DD)
+    Returns:
+        tuple: (start datetime, end datetime, STAC datetime range)
+    """
+    formatted_start_date = f"{start_date}T00:00:00Z"
+    formatted_end_date = f"{end_date}T23:59:59Z"
+    return formatted_start_date, formatted_end_date, f"{formatted_start_date}/{formatted_end_date}"
+
+def _next_page_request(page, payload):
+    """
+    Build the request for the next page from the STAC 'next' link
+    Args:
+        page (dict): STAC FeatureCollection response
+        payload (dict): Payload of the request that returned the page
+    Returns:
+        tuple|None: (method, url, payload) or None if this is the last page
+    """
+    for link in page.get('links', []):
+        if link.get('rel') != 'next' or not link.get('href'):
+            continue
+        
+        if link.get('method', 'GET').upper() == 'POST':
+            body = link.get('body') or {}
+            next_payload = {**payload, **body} if link.get('merge') else (body or payload)
+            return 'POST', link['href'], next_payload
+        
+        return 'GET', link['href'], None
+    
+    return None
+
+def _fetch_stac_page(method, url, payload):
+    """
+    Fetch one page of STAC search results
+    Args:
+        method (str): HTTP method
+        url (str): Page URL
+        payload (dict): JSON payload for POST requests
+    Returns:
+        dict: STAC FeatureCollection response
+    Raises:
+        requests.HTTPError: If the STAC API returns an error status
+    """
+    token = get_access_token()
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+    
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    
+    if method == 'POST':
+        response = transport.post(url, headers=headers, json=payload)
+    else:
+        response = transport.get(url, headers=headers)
+    
+    if response.status_code != 200:
+        logger.error(f"Failed to search for satellite data: {response.text}")
+        response.raise_for_status()
+    
+    return response.json()
+
+def iter_satellite_data(data_type, coordinates, start_date, end_date, cloud_cover_max=100,
+                        page_size=DEFAULT_PAGE_SIZE, max_items=None, prefetch=True, fields=None, use_catalog=True):
+    """
+    Lazily iterate over all satellite data matching the criteria, following STAC pagination
+    While the caller consumes a page the next one is fetched on a background thread.
+    Polygons are searched with STAC intersects; the local catalog may answer them
+    from a containing bbox query, so callers still filter by the polygon
+    Args:
+        data_type (str): Data type ID (e.g., 'S2MSI2A')
+        coordinates (list): Array of [lat, lng] coordinates
+        start_date (str): Start date (YYYY-MM-DD)
+        end_date (str): End date (YYYY-MM-DD)
+        cloud_cover_max (int): Maximum cloud cover percentage
+        page_size (int): Number of results requested per page
+        max_items (int): Maximum number of results to yield, or None for all
+        prefetch (bool): Whether to read the next page ahead
+        fields (list): STAC fields extension include paths to request, or None for full features
+        use_catalog (bool): Whether the local STAC catalog may answer the search
+    Yields:
+        SearchResult: Search result
+    Raises:
+        requests.RequestException: If a page cannot be fetched
+    """
+    if max_items is not None and max_items <= 0:
+        return
+    
+    # Convert coordinates to bounding box for STAC API
+    bbox = coordinates_to_bbox(coordinates)
+    polygon = coordinates_to_polygon(coordinates)
+    
+    # Format dates for STAC API
+    formatted_start_date, formatted_end_date, date_range = _search_date_range(start_date, end_date)
+    
+    # Get the STAC collection name
+    collection = _collection_for(data_type)
+    
+    fields = _normalize_fields(fields)
+    
+    # Answer searches contained in a fresh, already-fetched query locally
+    if _catalog and use_catalog:
+        features = _catalog.lookup(collection, bbox, formatted_start_date, formatted_end_date,
+                                   cloud_cover_max, max_items, fields)
+        if features is not None:
+            for feature in features:
+                if fields:
+                    feature = _project_feature(feature, fields)
+                _cache_item(feature, fields)
+                yield _feature_to_result(feature)
+            return
+    
+    logger.info(f'Searching for satellite data with params: {data_type}, {bbox}, {date_range}')
+    
+    if max_items is not None:
+        page_size = min(page_size, max_items)
+    
+    # Build STAC API search payload
+    search_payload = {
+        "collections": [collection],
+        "datetime": date_range,
+        "filter": {
+            "op": "and",
+            "args": [
+                {
+                    "op": "<=",
+                    "args": [
+                        {"property": "eo:cloud_cover"},
+                        cloud_cover_max
+                    ]
+                }
+            ]
+        },
+        "limit": page_size
+    }
+    
+    # Search the real polygon rather than its bbox, so scenes that only touch
+    # the bbox corners are not returned
+    if polygon:
+        search_payload["intersects"] = polygon
+    else:
+        search_payload["bbox"] = bbox
+    
+    # Only request the fields the caller needs (STAC fields extension)
+    if fields:
+        search_payload["fields"] = {"include": list(fields)}
+    
+    # Build URL for STAC API search
+    url = f"{STAC_URL}/search"
+    
+    logger.info(f'STAC API URL: {url}')
+    logger.debug(f'STAC API payload: {json.dumps(search_payload, indent=2)}')
+    
+    started_at = time.time()
+    yielded = 0
+    payload = search_payload
+    future = _page_executor.submit(_fetch_stac_page, 'POST', url, payload)
+    
+    try:
+        while future is not None:
+            page = future.result()
+            features = page.get('features', [])
+            next_request = _next_page_request(page, payload) if features else None
+            
+            # Read the next page ahead while this one is consumed
+            future = None
+            if next_request and prefetch:
+                future = _page_executor.submit(_fetch_stac_page, *next_request)
+            
+            logger.info(f'Found {len(features)} results on page')
+            
+            # Keep every fetched page in the local catalog; the query can answer
+            # contained searches once its last page has been stored. Polygon
+            # results do not cover their whole bbox, so only bbox queries are
+            # recorded. Projected features are kept with their projection
+            if _catalog:
+                _catalog.store(collection, bbox, formatted_start_date, formatted_end_date,
+                               cloud_cover_max, features, complete=next_request is None and not polygon,
+                               fetched_at=started_at, fields=fields)
+            
+            for feature in features:
+                _cache_item(feature, fields)
+                yield _feature_to_result(feature)
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+            
+            if next_request:
+                payload = next_request[2] or payload
+                if future is None:
+                    future = _page_executor.submit(_fetch_stac_page, *next_request)
+    finally:
+        # Drop the read-ahead page if the caller stopped early
+        if future is not None:
+            future.cancel()
+
+def get_item_cache_stats():
+    """
+    Get hit/miss/eviction counters of the item cache
+    Returns:
+        dict: Cache statistics
+    """
+    return _item_cache.stats()
+
+def search_satellite_data(data_type, coordinates, start_date, end_date, cloud_cover_max=100, limit=10, fields=None,
+                          refresh=False):
     """
     Search for satellite data based on criteria using STAC API
     Args:
@@ -121,119 +632,309 @@ def search_satellite_data(data_type, coordinates, start_date, end_date, cloud_co
         start_date (str): Start date (YYYY-MM-DD)
         end_date (str): End date (YYYY-MM-DD)
         cloud_cover_max (int): Maximum cloud cover percentage
-        limit (int): Maximum number of results to return
+        limit (int): Maximum number of results to return, or None for the full result set
+        fields (list): STAC fields extension include paths to request upstream (e.g., RESULT_FIELDS), or None
+            to request full features; results keep only the RESULT_FIELDS subset either way
+        refresh (bool): Bypass the search cache and local catalog and re-run the search upstream
     Returns:
-        list: Array of search results
+        list: Array of SearchResult objects
     """
     try:
-        # Get access token
-        token = get_access_token()
-        
-        # Convert coordinates to bounding box for STAC API
+        # Serve repeat searches from the in-process cache
         bbox = coordinates_to_bbox(coordinates)
+        polygon = coordinates_to_polygon(coordinates)
+        date_range = _search_date_range(start_date, end_date)[2]
+        cache_key = search_cache_key(_collection_for(data_type), bbox, date_range, cloud_cover_max, limit,
+                                     fields=fields, polygon=polygon)
+        if not refresh:
+            for listener in _search_listeners:
+                try:
+                    listener(cache_key, dict(
+                        data_type=data_type, coordinates=coordinates, start_date=start_date, end_date=end_date,
+                        cloud_cover_max=cloud_cover_max, limit=limit, fields=fields
+                    ))
+                except Exception as e:
+                    logger.warning(f'Error notifying search listener: {str(e)}')
+            
+            cached_results = _search_cache.get(cache_key)
+            if cached_results is not None:
+                logger.info(f'Search cache hit for: {data_type}, {bbox}, {date_range}')
+                return list(cached_results)
         
-        # Format dates for STAC API
-        formatted_start_date = f"{start_date}T00:00:00Z"
-        formatted_end_date = f"{end_date}T23:59:59Z"
-        date_range = f"{formatted_start_date}/{formatted_end_date}"
-        
-        logger.info(f'Searching for satellite data with params: {data_type}, {bbox}, {date_range}')
-        
-        # Map OData data types to STAC collections
-        collection_map = {
-            'S2MSI2A': 'sentinel-2-l2a',
-            'S1GRD': 'sentinel-1-grd',
-            'S3OLCI': 'sentinel-3-olci',
-            # Add more mappings as needed
-        }
-        
-        # Get the STAC collection name
-        collection = collection_map.get(data_type, 'sentinel-2-l2a')
-        
-        # Build STAC API search payload
-        search_payload = {
-            "collections": [collection],
-            "bbox": bbox,
-            "datetime": date_range,
-            "filter": {
-                "op": "and",
-                "args": [
-                    {
-                        "op": "<=",
-                        "args": [
-                            {"property": "eo:cloud_cover"},
-                            cloud_cover_max
-                        ]
-                    }
-                ]
-            },
-            "limit": limit
-        }
-        
-        # Build URL for STAC API search
-        url = f"{STAC_URL}/search"
-        
-        logger.info(f'STAC API URL: {url}')
-        logger.debug(f'STAC API payload: {json.dumps(search_payload, indent=2)}')
-        
-        # Prepare headers
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+        # Concurrent identical searches wait on the one already in flight
+        results = _search_flight.do(cache_key, _run_search, cache_key, data_type, coordinates, start_date, end_date,
+                                    cloud_cover_max, limit, fields, polygon, not refresh)
         
-        # Add authorization header if token is available
-        if token:
-            headers['Authorization'] = f"Bearer {token}"
+        return list(results)
+    except Exception as e:
+        logger.error(f'Error searching for satellite data: {str(e)}')
+        return []
+
+def _rank_by_overlap(results, polygon, min_overlap=None):
+    """
+    Drop results that do not overlap the search polygon and sort the rest by
+    the fraction of the polygon they cover (ties keep their upstream order)
+    Args:
+        results (list): SearchResult objects
+        polygon (dict): GeoJSON Polygon searched
+        min_overlap (float): Minimum covered fraction kept (defaults to CDSE_MIN_OVERLAP)
+    Returns:
+        list: Filtered and ranked SearchResult objects
+    """
+    if not results:
+        return results
+    
+    min_overlap = MIN_OVERLAP if min_overlap is None else min_overlap
+    
+    # Results without geometry or bbox cannot be ranked and are kept as is
+    footprints = [footprint_parts(result.geometry, result.bbox) for result in results]
+    fractions = part_overlap_fractions(polygon['coordinates'][0], footprints)
+    
+    ranked = []
+    for result, result_parts, fraction in zip(results, footprints, fractions):
+        if result_parts:
+            result.overlap = round(float(fraction), 4)
+            if fraction <= 0 or fraction < min_overlap:
+                continue
+        ranked.append(result)
+    
+    ranked.sort(key=lambda result: -(result.overlap or 0))
+    return ranked
+
+def _run_search(cache_key, data_type, coordinates, start_date, end_date, cloud_cover_max, limit, fields, polygon=None,
+                use_catalog=True):
+    """
+    Run a search upstream, rank it by polygon overlap and cache its results
+    A limited polygon search fetches one page of POLYGON_CANDIDATE_FACTOR times
+    `limit` scenes intersecting the polygon, then keeps the best `limit`
+    """
+    max_items = limit
+    if polygon and limit is not None:
+        max_items = limit * max(1, POLYGON_CANDIDATE_FACTOR)
+    
+    results = list(iter_satellite_data(
+        data_type, coordinates, start_date, end_date,
+        cloud_cover_max=cloud_cover_max,
+        page_size=DEFAULT_PAGE_SIZE if max_items is None else max_items,
+        max_items=max_items,
+        fields=fields,
+        use_catalog=use_catalog
+    ))
+    
+    if polygon:
+        results = _rank_by_overlap(results, polygon)[:limit]
+    
+    # Only successful searches are cached
+    _search_cache.set(cache_key, results)
+    
+    return results
+
+def get_product_preview(product_id, asset_type=None):
+    """
+    Get preview image for a product
+    Args:
+        product_id (str): Product ID
+        asset_type (str): Preferred STAC asset type (e.g., 'thumbnail'); defaults to the first available
+    Returns:
+        dict: Preview image data with content type and etag
+    """
+    try:
+        # Serve from the local preview store if already fetched
+        store_key = asset_type or 'preview'
+        if _preview_store:
+            stored = _preview_store.get(product_id, store_key)
+            if stored:
+                stored['source'] = 'preview_store'
+                return stored
         
-        # Make the API request
-        response = requests.post(url, headers=headers, json=search_payload)
+        preview = _fetch_product_preview(product_id, asset_type)
         
-        if response.status_code != 200:
-            logger.error(f"Failed to search for satellite data: {response.text}")
-            return []
+        if preview and _preview_store:
+            preview['etag'] = _preview_store.put(product_id, store_key, preview['data'], preview['content_type'])
         
-        # Extract features from STAC response
-        features = response.json().get('features', [])
+        return preview
+    except Exception as e:
+        logger.error(f'Error getting product preview: {str(e)}')
+        return None
+
+def get_stored_image(key, asset_type):
+    """
+    Get an image from the local preview store
+    Args:
+        key (str): Product ID or other image key
+        asset_type (str): Image kind (e.g., 'preview', 'mosaic')
+    Returns:
+        dict: Image data with content type and etag, or None
+    """
+    if not _preview_store:
+        return None
+    try:
+        return _preview_store.get(key, asset_type)
+    except Exception as e:
+        logger.warning(f'Error reading preview store: {str(e)}')
+        return None
+
+def store_image(key, asset_type, data, content_type):
+    """
+    Put an image in the local preview store
+    Returns:
+        str: ETag of the stored image, or None if the store is unavailable
+    """
+    if not _preview_store:
+        return None
+    try:
+        return _preview_store.put(key, asset_type, data, content_type)
+    except Exception as e:
+        logger.warning(f'Error writing preview store: {str(e)}')
+        return None
+
+class PreviewSourceStats:
+    """Per-source win and latency statistics used to order preview sources"""
+    
+    def __init__(self, alpha=0.2, min_samples=3, prior_latency=1.0):
+        """
+        Args:
+            alpha (float): Weight of the latest sample in the latency moving average
+            min_samples (int): Attempts needed before observed stats replace the default order
+            prior_latency (float): Assumed latency in seconds of the first default source
+        """
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.prior_latency = prior_latency
+        self._stats = {}
+        self._lock = threading.Lock()
+    
+    def record(self, source, latency, success):
+        """Record the outcome of one fetch attempt"""
+        with self._lock:
+            stats = self._stats.setdefault(source, {
+                'attempts': 0, 'successes': 0, 'wins': 0, 'latency': None
+            })
+            stats['attempts'] += 1
+            if success:
+                stats['successes'] += 1
+                previous = stats['latency']
+                stats['latency'] = latency if previous is None else (1 - self.alpha) * previous + self.alpha * latency
+    
+    def record_win(self, source):
+        """Record that a source delivered the image that was used"""
+        with self._lock:
+            if source in self._stats:
+                self._stats[source]['wins'] += 1
+    
+    def order(self, sources):
+        """
+        Order (source, url) pairs by expected time to a valid image
+        Sources without enough samples keep their default position
+        """
+        def expected_cost(indexed):
+            index, (source, _) = indexed
+            with self._lock:
+                stats = self._stats.get(source)
+                if not stats or stats['attempts'] < self.min_samples or stats['latency'] is None:
+                    return self.prior_latency * (index + 1)
+                success_rate = stats['successes'] / stats['attempts']
+                return stats['latency'] / max(success_rate, 0.05)
         
-        logger.info(f'Found {len(features)} results')
+        return [pair for _, pair in sorted(enumerate(sources), key=expected_cost)]
+    
+    def snapshot(self):
+        """Get a copy of the statistics"""
+        with self._lock:
+            return {source: dict(stats) for source, stats in self._stats.items()}
+
+# Preview source statistics used to adapt the fetch order
+_preview_stats = PreviewSourceStats()
+
+def get_preview_source_stats():
+    """
+    Get per-source preview win/latency statistics
+    Returns:
+        dict: Statistics keyed by source name
+    """
+    return _preview_stats.snapshot()
+
+def _preview_sources(product_id, asset_type, token):
+    """
+    List the candidate preview sources of a product in default order
+    Args:
+        product_id (str): Product ID
+        asset_type (str): Preferred STAC asset type
+        token (str|None): Access token
+    Returns:
+        list: (source name, url) pairs
+    """
+    sources = []
+    
+    # Try to get the product metadata to find the thumbnail URL
+    try:
+        # Look the product up by ID, from the item cache if already listed
+        feature = _get_stac_items([product_id], token, fields=RESULT_PROJECTION).get(product_id)
         
-        # Convert STAC features to a simplified format
-        results = []
-        for feature in features:
-            # Find thumbnail or preview image
-            thumbnail_url = None
-            if 'assets' in feature:
-                for asset_type in ['thumbnail', 'preview', 'overview', 'browse']:
-                    if asset_type in feature['assets'] and 'href' in feature['assets'][asset_type]:
-                        thumbnail_url = feature['assets'][asset_type]['href']
-                        break
+        if feature and 'assets' in feature:
+            # Try to get thumbnail or preview image, preferred asset first
+            asset_types = ['thumbnail', 'preview', 'overview', 'browse']
+            if asset_type in asset_types:
+                asset_types.remove(asset_type)
+                asset_types.insert(0, asset_type)
             
-            # Create result object
-            result = {
-                'id': feature['id'],
-                'name': feature['id'],
-                'datetime': feature['properties'].get('datetime'),
-                'cloud_cover': feature['properties'].get('eo:cloud_cover', 0),
-                'thumbnail_url': thumbnail_url,
-                'assets': feature.get('assets', {}),
-                'properties': feature.get('properties', {}),
-                'bbox': feature.get('bbox'),
-                'geometry': feature.get('geometry')
-            }
-            
-            results.append(result)
-        
-        return results
+            for candidate in asset_types:
+                if candidate in feature['assets'] and 'href' in feature['assets'][candidate]:
+                    sources.append((f'stac_{candidate}', feature['assets'][candidate]['href']))
     except Exception as e:
-        logger.error(f'Error searching for satellite data: {str(e)}')
-        return []
+        logger.warning(f'Error getting product metadata from STAC API: {str(e)}')
+    
+    # Fallback to OData API for thumbnails if STAC doesn't provide them
+    sources.append(('odata_quicklook', f"{ODATA_URL}('{product_id}')/Products('Quicklook')/$value"))
+    sources.append(('odata_thumbnail', f"{ODATA_URL}('{product_id}')/Products('Thumbnail')/$value"))
+    
+    return sources
 
-def get_product_preview(product_id):
+def _fetch_preview_source(source, url, headers, cancelled):
     """
-    Get preview image for a product
+    Fetch a preview image from one source
+    Args:
+        source (str): Source name
+        url (str): Image URL
+        headers (dict): Request headers
+        cancelled (threading.Event): Set once another source has won
+    Returns:
+        dict: Preview image data or None if the source did not return an image
+    """
+    started = time.monotonic()
+    result = None
+    try:
+        logger.info(f'Trying preview source {source}: {url}')
+        response = transport.get(url, headers=headers, stream=True)
+        try:
+            content_type = response.headers.get('content-type', 'image/jpeg')
+            # Skip the body of losing or invalid responses
+            if response.status_code == 200 and not cancelled.is_set() and \
+                    not content_type.startswith(('text/', 'application/json')):
+                result = {
+                    'data': response.content,
+                    'content_type': content_type,
+                    'source': source
+                }
+        finally:
+            response.close()
+    except Exception as e:
+        logger.warning(f'Error getting preview from {source}: {str(e)}')
+    
+    # Sources that lost a race count as unsuccessful attempts
+    _preview_stats.record(source, time.monotonic() - started, result is not None)
+    return result
+
+def _fetch_product_preview(product_id, asset_type=None, hedge=None):
+    """
+    Fetch preview image for a product from CDSE
+    In hedged mode the fallback sources are started in parallel once the primary
+    source is slower than CDSE_PREVIEW_HEDGE_DELAY (or has failed), and the first
+    valid image wins
     Args:
         product_id (str): Product ID
+        asset_type (str): Preferred STAC asset type
+        hedge (bool): Whether to hedge across sources (defaults to CDSE_PREVIEW_HEDGING)
     Returns:
         dict: Preview image data with content type
     """
@@ -253,82 +954,26 @@ def get_product_preview(product_id):
         if token:
             headers['Authorization'] = f"Bearer {token}"
         
-        # Try to get the product metadata to find the thumbnail URL
-        try:
-            # Search for the product by ID
-            search_payload = {
-                "ids": [product_id],
-                "limit": 1
-            }
-            
-            search_url = f"{STAC_URL}/search"
-            search_headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            if token:
-                search_headers['Authorization'] = f"Bearer {token}"
-            
-            search_response = requests.post(search_url, headers=search_headers, json=search_payload)
-            
-            if search_response.status_code == 200:
-                features = search_response.json().get('features', [])
-                
-                if features:
-                    feature = features[0]
-                    
-                    # Check if we have assets with thumbnails
-                    if 'assets' in feature:
-                        # Try to get thumbnail or preview image
-                        for asset_type in ['thumbnail', 'preview', 'overview', 'browse']:
-                            if asset_type in feature['assets'] and 'href' in feature['assets'][asset_type]:
-                                thumbnail_url = feature['assets'][asset_type]['href']
-                                logger.info(f'Found thumbnail URL: {thumbnail_url}')
-                                
-                                # Get the thumbnail
-                                response = requests.get(thumbnail_url, headers=headers)
-                                
-                                if response.status_code == 200:
-                                    return {
-                                        'data': response.content,
-                                        'content_type': response.headers.get('content-type', 'image/jpeg'),
-                                        'source': f'stac_{asset_type}'
-                                    }
-        except Exception as e:
-            logger.warning(f'Error getting product metadata from STAC API: {str(e)}')
+        sources = _preview_sources(product_id, asset_type, token)
+        if asset_type:
+            # An explicitly requested asset stays the primary source
+            sources = sources[:1] + _preview_stats.order(sources[1:])
+        else:
+            sources = _preview_stats.order(sources)
         
-        # Fallback to OData API for thumbnails if STAC doesn't provide them
-        try:
-            preview_url = f"{ODATA_URL}('{product_id}')/Products('Quicklook')/$value"
-            logger.info(f'Falling back to OData quicklook URL: {preview_url}')
-            
-            response = requests.get(preview_url, headers=headers)
-            
-            if response.status_code == 200:
-                return {
-                    'data': response.content,
-                    'content_type': response.headers.get('content-type', 'image/jpeg'),
-                    'source': 'odata_quicklook'
-                }
-        except Exception as e:
-            logger.warning(f'Error getting quicklook from OData API: {str(e)}')
-            
-            # If quicklook fails, try thumbnail
-            try:
-                thumbnail_url = f"{ODATA_URL}('{product_id}')/Products('Thumbnail')/$value"
-                logger.info(f'Trying OData thumbnail URL: {thumbnail_url}')
-                
-                response = requests.get(thumbnail_url, headers=headers)
-                
-                if response.status_code == 200:
-                    return {
-                        'data': response.content,
-                        'content_type': response.headers.get('content-type', 'image/jpeg'),
-                        'source': 'odata_thumbnail'
-                    }
-            except Exception as e:
-                logger.warning(f'Error getting thumbnail from OData API: {str(e)}')
+        if PREVIEW_HEDGING if hedge is None else hedge:
+            preview = _fetch_preview_hedged(sources, headers)
+        else:
+            preview = None
+            never_cancelled = threading.Event()
+            for source, url in sources:
+                preview = _fetch_preview_source(source, url, headers, never_cancelled)
+                if preview:
+                    break
+        
+        if preview:
+            _preview_stats.record_win(preview['source'])
+            return preview
         
         # If all attempts fail, return None
         logger.error('Failed to get product preview')
@@ -337,75 +982,301 @@ def get_product_preview(product_id):
         logger.error(f'Error getting product preview: {str(e)}')
         return None
 
-def get_product_metadata(product_id):
+def _fetch_preview_hedged(sources, headers):
     """
-    Get product metadata
+    Race preview sources, starting the fallbacks once the primary is slow or has failed
+    Args:
+        sources (list): (source name, url) pairs, primary first
+        headers (dict): Request headers
+    Returns:
+        dict: Preview image data of the first valid source, or None
+    """
+    cancelled = threading.Event()
+    remaining = list(sources[1:])
+    pending = {_preview_executor.submit(_fetch_preview_source, *sources[0], headers, cancelled)}
+    hedge_at = time.monotonic() + PREVIEW_HEDGE_DELAY
+    
+    try:
+        while pending or remaining:
+            timeout = max(0.0, hedge_at - time.monotonic()) if remaining else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                preview = future.result()
+                if preview:
+                    return preview
+            
+            # Primary is past the latency threshold or failed: start the fallbacks
+            if remaining and (not pending or time.monotonic() >= hedge_at):
+                logger.info(f'Hedging preview fetch across {len(remaining)} fallback sources')
+                for source, url in remaining:
+                    pending.add(_preview_executor.submit(_fetch_preview_source, source, url, headers, cancelled))
+                remaining = []
+        
+        return None
+    finally:
+        # Cancel the losers: queued fetches never start and running ones skip their body
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+def _asset_download_url(asset):
+    """
+    Get an HTTP(S) URL for a STAC asset, following the alternate https link of S3 assets
+    Args:
+        asset (dict): STAC asset
+    Returns:
+        str|None: Download URL
+    """
+    href = asset.get('href', '')
+    if href.startswith(('http://', 'https://')):
+        return href
+    
+    alternate = (asset.get('alternate') or {}).get('https') or {}
+    if alternate.get('href', '').startswith(('http://', 'https://')):
+        return alternate['href']
+    
+    return None
+
+def _product_download_url(product_id, asset_key, token):
+    """
+    Resolve the download URL of a product asset
     Args:
         product_id (str): Product ID
+        asset_key (str): STAC asset key, or None for the first data asset
+        token (str|None): Access token
     Returns:
-        dict: Product metadata
+        str: Download URL (the OData product archive if no STAC asset matches)
+    """
+    feature = _get_stac_items([product_id], token).get(product_id)
+    assets = (feature or {}).get('assets') or {}
+    
+    if asset_key:
+        candidates = [assets[asset_key]] if asset_key in assets else []
+    else:
+        candidates = [asset for asset in assets.values() if 'data' in (asset.get('roles') or [])]
+    
+    for asset in candidates:
+        url = _asset_download_url(asset)
+        if url:
+            return url
+    
+    return f"{DOWNLOAD_URL}('{product_id}')/$value"
+
+def _is_cdse_url(url):
+    """Whether a URL points to a CDSE host (HTTPS only), which may receive the access token"""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    return parts.scheme == 'https' and (host == CDSE_DOMAIN or host.endswith(f'.{CDSE_DOMAIN}'))
+
+def open_product_stream(product_id, asset_key=None, range_header=None):
+    """
+    Open a streaming download of a product asset
+    The body is not read; the caller must iterate over it and close the response
+    Args:
+        product_id (str): Product ID
+        asset_key (str): STAC asset key, or None for the first data asset
+        range_header (str): HTTP Range header to forward (e.g., 'bytes=1000-')
+    Returns:
+        requests.Response: Streaming upstream response (200, 206 or 416), or None on failure
     """
     try:
         # Get access token
         token = get_access_token()
         
-        logger.info(f'Getting metadata for product: {product_id}')
+        url = _product_download_url(product_id, asset_key, token)
+        logger.info(f'Streaming product {product_id} from: {url}')
         
-        # Try to get the item from STAC API
-        try:
-            # Search for the product by ID
-            search_payload = {
-                "ids": [product_id],
-                "limit": 1
-            }
-            
-            search_url = f"{STAC_URL}/search"
-            
-            # Prepare headers
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            # Add authorization header if token is available
-            if token:
+        # Identity encoding keeps byte ranges and Content-Length meaningful end to end
+        headers = {
+            'Accept-Encoding': 'identity'
+        }
+        
+        if range_header:
+            headers['Range'] = range_header
+        
+        # Redirects are followed here rather than by requests, which drops the
+        # Authorization header on cross-host redirects (download -> zipper)
+        for _ in range(MAX_DOWNLOAD_REDIRECTS + 1):
+            if token and _is_cdse_url(url):
                 headers['Authorization'] = f"Bearer {token}"
+            else:
+                headers.pop('Authorization', None)
             
-            search_response = requests.post(search_url, headers=headers, json=search_payload)
+            response = transport.get(url, headers=headers, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                break
             
-            if search_response.status_code == 200:
-                features = search_response.json().get('features', [])
-                
-                if features:
-                    logger.info('Found item in STAC API')
-                    return features[0]
-        except Exception as e:
-            logger.warning(f'Error getting item from STAC API: {str(e)}')
+            url = urljoin(url, response.headers['Location'])
+            response.close()
+            logger.info(f'Product {product_id} download redirected to: {url}')
+        else:
+            logger.error(f'Failed to download product {product_id}: too many redirects')
+            return None
         
-        # Fallback to OData API
+        if response.status_code not in (200, 206, 416):
+            logger.error(f'Failed to download product {product_id}: HTTP {response.status_code}')
+            response.close()
+            return None
+        
+        return response
+    except Exception as e:
+        logger.error(f'Error opening product download: {str(e)}')
+        return None
+
+def _search_stac_items(product_ids, token):
+    """
+    Look up several STAC items with a single ids search
+    Args:
+        product_ids (list): Product IDs
+        token (str|None): Access token
+    Returns:
+        dict: STAC features keyed by product ID
+    """
+    search_payload = {
+        "ids": list(product_ids),
+        "limit": len(product_ids)
+    }
+    
+    search_url = f"{STAC_URL}/search"
+    
+    # Prepare headers
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+    
+    # Add authorization header if token is available
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    
+    search_response = transport.post(search_url, headers=headers, json=search_payload)
+    
+    if search_response.status_code != 200:
+        logger.warning(f'STAC ids search failed: {search_response.text}')
+        return {}
+    
+    features = search_response.json().get('features', [])
+    return {feature['id']: feature for feature in features if feature.get('id')}
+
+def _get_stac_items(product_ids, token, batch_size=None, fields=None):
+    """
+    Get STAC items by product ID, from the item cache where possible
+    Args:
+        product_ids (list): Product IDs
+        token (str|None): Access token
+        batch_size (int): Maximum number of ids per STAC search (defaults to CDSE_METADATA_BATCH_SIZE)
+        fields (tuple): Normalized projection whose cached features are also accepted
+            (e.g., RESULT_PROJECTION for preview lookups), None to accept only full features
+    Returns:
+        dict: STAC features keyed by product ID (missing products are omitted)
+    """
+    batch_size = batch_size or METADATA_BATCH_SIZE
+    items = {}
+    misses = []
+    
+    for product_id in product_ids:
+        item = _item_cache.get(product_id)
+        if item is None and fields:
+            item = _item_cache.get((product_id, fields))
+        if item is not None:
+            items[product_id] = item
+        else:
+            misses.append(product_id)
+    
+    for i in range(0, len(misses), batch_size):
+        chunk = misses[i:i + batch_size]
         try:
-            url = f"{ODATA_URL}('{product_id}')"
-            
-            # Prepare headers
-            headers = {
-                'Accept': 'application/json'
-            }
-            
-            # Add authorization header if token is available
-            if token:
-                headers['Authorization'] = f"Bearer {token}"
-            
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                logger.info('Found item in OData API')
-                return response.json()
+            found = _search_stac_items(chunk, token)
         except Exception as e:
-            logger.warning(f'Error getting item from OData API: {str(e)}')
+            logger.warning(f'Error getting items from STAC API: {str(e)}')
+            continue
         
-        # If all attempts fail, return None
-        logger.error('Failed to get product metadata')
-        return None
+        for product_id, item in found.items():
+            _item_cache.set(product_id, item)
+        items.update(found)
+    
+    return items
+
+def _get_odata_product(product_id, token):
+    """
+    Get product metadata from the OData API
+    Args:
+        product_id (str): Product ID
+        token (str|None): Access token
+    Returns:
+        dict: Product metadata or None if not found
+    """
+    try:
+        url = f"{ODATA_URL}('{product_id}')"
+        
+        # Prepare headers
+        headers = {
+            'Accept': 'application/json'
+        }
+        
+        # Add authorization header if token is available
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        
+        response = transport.get(url, headers=headers)
+        
+        if response.status_code == 200:
+            logger.info(f'Found item {product_id} in OData API')
+            return response.json()
     except Exception as e:
-        logger.error(f'Error getting product metadata: {str(e)}')
-        return None
+        logger.warning(f'Error getting item {product_id} from OData API: {str(e)}')
+    
+    return None
+
+def get_products_metadata(product_ids, batch_size=None):
+    """
+    Get metadata for several products
+    Looks ids up in chunks with one STAC ids search per chunk, then sends only
+    the misses to the OData API concurrently
+    Args:
+        product_ids (list): Product IDs
+        batch_size (int): Maximum number of ids per STAC search (defaults to CDSE_METADATA_BATCH_SIZE)
+    Returns:
+        dict: Product metadata keyed by product ID (None for products that were not found)
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    metadata = {}
+    
+    if not product_ids:
+        return metadata
+    
+    try:
+        # Get access token
+        token = get_access_token()
+        
+        logger.info(f'Getting metadata for {len(product_ids)} products')
+        
+        # Try to get the items from the item cache and STAC API
+        metadata.update(_get_stac_items(product_ids, token, batch_size))
+        
+        logger.info(f'Found {len(metadata)} of {len(product_ids)} items in STAC API')
+        
+        # Fallback to OData API for the misses
+        misses = [product_id for product_id in product_ids if product_id not in metadata]
+        if misses:
+            odata_results = _metadata_executor.map(lambda product_id: _get_odata_product(product_id, token), misses)
+            for product_id, result in zip(misses, odata_results):
+                if result is not None:
+                    metadata[product_id] = result
+                else:
+                    logger.error(f'Failed to get product metadata for {product_id}')
+    except Exception as e:
+        logger.error(f'Error getting products metadata: {str(e)}')
+    
+    return {product_id: metadata.get(product_id) for product_id in product_ids}
+
+def get_product_metadata(product_id):
+    """
+    Get product metadata
+    Args:
+        product_id (str): Product ID
+    Returns:
+        dict: Product metadata
+    """
+    return get_products_metadata([product_id]).get(product_id)
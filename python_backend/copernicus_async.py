@@ -0,0 +1,295 @@
+"""
+Asynchronous Copernicus client for SpaceData application
+Runs CDSE searches, metadata and preview lookups concurrently on asyncio,
+bounded by a semaphore, on top of the pooled blocking client. Full result
+sets are searched as concurrent date slices (STAC pages are chained by their
+next links and cannot be requested in parallel), metadata as concurrent id
+batches. The blocking wrappers share one long-lived event loop
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+import copernicus_api
+import mosaic
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Maximum number of CDSE calls in flight per client
+MAX_CONCURRENCY = int(os.getenv('CDSE_ASYNC_CONCURRENCY', '8'))
+
+# Maximum number of thumbnails composited into one mosaic
+MOSAIC_MAX_TILES = int(os.getenv('MOSAIC_MAX_TILES', '25'))
+
+# Date slices searched concurrently when the full result set is requested
+SEARCH_SLICES = int(os.getenv('CDSE_ASYNC_SEARCH_SLICES', '4'))
+
+# Threads running the blocking calls; they share the transport's connection pool
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix='cdse-async')
+
+# Event loop shared by the blocking wrappers, running on a daemon thread
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared event loop on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='cdse-async-loop', daemon=True).start()
+        return _loop
+
+
+def run(coroutine) -> Any:
+    """Run a coroutine on the shared event loop and wait for its result (from any thread but the loop's)"""
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop()).result()
+
+
+def _date_slices(start_date: str, end_date: str, slices: int) -> List[tuple]:
+    """Split an inclusive YYYY-MM-DD range into at most `slices` consecutive, non-overlapping ranges"""
+    try:
+        start, end = date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10])
+    except (TypeError, ValueError):
+        return [(start_date, end_date)]
+    days = (end - start).days + 1
+    if days < 2 or slices < 2:
+        return [(start_date, end_date)]
+
+    slices = min(slices, days)
+    bounds = [start + timedelta(days=days * index // slices) for index in range(slices + 1)]
+    return [
+        (bounds[index].isoformat(), (bounds[index + 1] - timedelta(days=1)).isoformat())
+        for index in range(slices)
+    ]
+
+
+class AsyncCopernicusClient:
+    """Asyncio client fanning CDSE requests out across collections and products"""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        """
+        Args:
+            max_concurrency: Maximum number of concurrent CDSE calls
+        """
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    async def _run(self, func, *args, **kwargs) -> Any:
+        """Run a blocking CDSE call in the executor, bounded by the semaphore"""
+        # Created lazily so the semaphore belongs to the running event loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+
+        async with self._semaphore:
+            return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+    async def search(
+        self,
+        data_type: str,
+        coordinates: Any,
+        start_date: str,
+        end_date: str,
+        cloud_cover_max: int = 100,
+        limit: Optional[int] = 10,
+        fields: Optional[List[str]] = None
+    ) -> List[copernicus_api.SearchResult]:
+        """
+        Search one collection (see copernicus_api.search_satellite_data)
+        With limit=None the date range is split into SEARCH_SLICES slices that
+        are searched concurrently and merged (newest first, best overlap first
+        for polygon searches)
+        """
+        slices = _date_slices(start_date, end_date, SEARCH_SLICES) if limit is None else [(start_date, end_date)]
+        pages = await asyncio.gather(*[
+            self._run(
+                copernicus_api.search_satellite_data,
+                data_type, coordinates, slice_start, slice_end,
+                cloud_cover_max=cloud_cover_max,
+                limit=limit,
+                fields=fields
+            )
+            for slice_start, slice_end in slices
+        ])
+        if len(pages) == 1:
+            return pages[0]
+
+        merged = {}
+        for page in pages:
+            for result in page:
+                merged.setdefault(result['id'], result)
+        results = sorted(merged.values(), key=lambda result: result.get('datetime') or '', reverse=True)
+        results.sort(key=lambda result: -(result.get('overlap') or 0))
+        return results
+
+    async def search_many(
+        self,
+        data_types: Iterable[str],
+        coordinates: Any,
+        start_date: str,
+        end_date: str,
+        cloud_cover_max: int = 100,
+        limit: Optional[int] = 10,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, List[copernicus_api.SearchResult]]:
+        """
+        Search several collections over the same area and dates concurrently
+        Args:
+            data_types: Data type IDs (e.g., ['S1GRD', 'S2MSI2A', 'S3OLCI'])
+            coordinates: Array of [lat, lng] coordinates
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            cloud_cover_max: Maximum cloud cover percentage
+            limit: Maximum number of results per collection
+            fields: Optional STAC fields projection
+        Returns:
+            Dictionary of search results keyed by data type
+        """
+        data_types = list(dict.fromkeys(data_types))
+        results = await asyncio.gather(*[
+            self.search(data_type, coordinates, start_date, end_date, cloud_cover_max, limit, fields)
+            for data_type in data_types
+        ])
+        return dict(zip(data_types, results))
+
+    async def get_metadata(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Get product metadata (see copernicus_api.get_product_metadata)"""
+        return await self._run(copernicus_api.get_product_metadata, product_id)
+
+    async def get_metadata_many(self, product_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get metadata for several products, one batch of CDSE_METADATA_BATCH_SIZE ids
+        per concurrent request (see copernicus_api.get_products_metadata)
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        size = max(1, copernicus_api.METADATA_BATCH_SIZE)
+        batches = await asyncio.gather(*[
+            self._run(copernicus_api.get_products_metadata, product_ids[start:start + size])
+            for start in range(0, len(product_ids), size)
+        ])
+        metadata = {}
+        for batch in batches:
+            metadata.update(batch)
+        return metadata
+
+    async def get_preview(self, product_id: str, asset_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a product preview (see copernicus_api.get_product_preview)"""
+        return await self._run(copernicus_api.get_product_preview, product_id, asset_type=asset_type)
+
+    async def get_previews(
+        self,
+        product_ids: Iterable[str],
+        asset_type: Optional[str] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get previews for several products concurrently, keyed by product ID"""
+        product_ids = list(dict.fromkeys(product_ids))
+        results = await asyncio.gather(*[self.get_preview(product_id, asset_type) for product_id in product_ids])
+        return dict(zip(product_ids, results))
+
+    async def get_mosaic(self, product_ids: Iterable[str], mode: str = 'sheet') -> Optional[Dict[str, Any]]:
+        """
+        Composite the previews of several products into one image
+        Previews and footprints are fetched concurrently; decoding and blending
+        run in the mosaic process pool. Mosaics are stored by the set of product IDs
+        Args:
+            product_ids: Product IDs (order does not matter)
+            mode: 'sheet' for a contact sheet, 'geo' to place previews by footprint
+        Returns:
+            Image data with content type and etag, or None if no preview is available
+        """
+        product_ids = sorted(set(product_ids))[:MOSAIC_MAX_TILES]
+        if not product_ids:
+            return None
+
+        key = mosaic_key(product_ids, mode)
+        stored = copernicus_api.get_stored_image(key, 'mosaic')
+        if stored:
+            return stored
+
+        previews, metadata = await asyncio.gather(
+            self.get_previews(product_ids),
+            self.get_metadata_many(product_ids)
+        )
+
+        # Newest first, so a 'geo' mosaic keeps the latest scene of each footprint
+        acquired = {
+            product_id: ((metadata.get(product_id) or {}).get('properties') or {}).get('datetime') or ''
+            for product_id in product_ids
+        }
+        tiles = [
+            (previews[product_id]['data'], (metadata.get(product_id) or {}).get('bbox'))
+            for product_id in sorted(product_ids, key=acquired.get, reverse=True)
+            if previews.get(product_id)
+        ]
+        if not tiles:
+            return None
+
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(_executor, partial(mosaic.renderer.render, tiles, mode))
+        content_type = 'image/jpeg'
+
+        return {
+            'data': data,
+            'content_type': content_type,
+            'etag': copernicus_api.store_image(key, 'mosaic', data, content_type)
+        }
+
+
+# Client shared by the blocking wrappers
+client = AsyncCopernicusClient()
+
+
+def mosaic_key(product_ids: Iterable[str], mode: str = 'sheet') -> str:
+    """Build the preview store key of a mosaic from its set of product IDs"""
+    digest = hashlib.sha256('\n'.join(sorted(set(product_ids))).encode('utf-8')).hexdigest()
+    return f'{mode}:{digest}'
+
+
+def search_satellite_data_multi(
+    data_types: Iterable[str],
+    coordinates: Any,
+    start_date: str,
+    end_date: str,
+    cloud_cover_max: int = 100,
+    limit: Optional[int] = 10,
+    fields: Optional[List[str]] = None
+) -> Dict[str, List[copernicus_api.SearchResult]]:
+    """
+    Blocking wrapper searching several collections concurrently
+    Returns:
+        Dictionary of search results keyed by data type
+    """
+    return run(client.search_many(data_types, coordinates, start_date, end_date, cloud_cover_max, limit, fields))
+
+
+def get_products_previews(product_ids: Iterable[str], asset_type: Optional[str] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Blocking wrapper fetching several product previews concurrently
+    Returns:
+        Dictionary of preview image data keyed by product ID
+    """
+    return run(client.get_previews(product_ids, asset_type))
+
+
+def get_products_mosaic(product_ids: Iterable[str], mode: str = 'sheet') -> Optional[Dict[str, Any]]:
+    """
+    Blocking wrapper compositing several product previews into one image
+    Returns:
+        Image data with content type and etag, or None if no preview is available
+    """
+    return run(client.get_mosaic(product_ids, mode))
@@ -0,0 +1,172 @@
+"""
+Copernicus Bridge for SpaceData application
+Provides Flask routes to serve Copernicus data through the backend
+"""
+
+import os
+import logging
+from flask import Blueprint, Response, jsonify, request
+import copernicus_api
+import copernicus_async
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Browser cache lifetime of previews in seconds
+PREVIEW_MAX_AGE = int(os.getenv('PREVIEW_MAX_AGE', '86400'))
+
+# Results per data type of a /search request: default and upper bound
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', '10'))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+
+# Create blueprint
+copernicus_bp = Blueprint('copernicus', __name__, url_prefix='/api/copernicus')
+
+def _image_response(image):
+    """Build a cacheable image response, answering 304 when the ETag matches"""
+    response = Response(image['data'], mimetype=image['content_type'])
+    response.cache_control.public = True
+    response.cache_control.max_age = PREVIEW_MAX_AGE
+
+    if image.get('etag'):
+        response.set_etag(image['etag'])
+        # Answers with 304 Not Modified when If-None-Match matches
+        response.make_conditional(request)
+
+    return response
+
+@copernicus_bp.route('/search', methods=['POST'])
+def search():
+    """
+    Search for satellite data in one or several collections
+
+    Request body:
+        dataType: Data type ID, or dataTypes: list of data type IDs searched concurrently
+        coordinates: Array of [lat, lng] coordinates
+        startDate: Start date (YYYY-MM-DD)
+        endDate: End date (YYYY-MM-DD)
+        cloudCoverMax: Optional maximum cloud cover percentage
+        limit: Optional maximum number of results per data type (default SEARCH_DEFAULT_LIMIT,
+            at most SEARCH_MAX_LIMIT)
+        fields: Optional list of STAC fields to include (e.g., properties.datetime)
+
+    Returns:
+        JSON list of results, or results keyed by data type when dataTypes is given
+    """
+    try:
+        data = request.json
+
+        if not data or 'startDate' not in data or 'endDate' not in data:
+            return jsonify({
+                "error": "Missing required parameters",
+                "details": "startDate and endDate are required"
+            }), 400
+
+        # A missing or null limit must not turn into an unbounded search
+        limit = data.get('limit')
+        if limit is None:
+            limit = SEARCH_DEFAULT_LIMIT
+        elif isinstance(limit, bool) or not isinstance(limit, int):
+            return jsonify({
+                "error": "Invalid limit",
+                "details": "limit must be an integer"
+            }), 400
+
+        search_args = dict(
+            coordinates=data.get('coordinates'),
+            start_date=data['startDate'],
+            end_date=data['endDate'],
+            cloud_cover_max=data.get('cloudCoverMax', 100),
+            limit=max(1, min(limit, SEARCH_MAX_LIMIT)),
+            fields=data.get('fields')
+        )
+
+        if data.get('dataTypes'):
+            results = copernicus_async.search_satellite_data_multi(data['dataTypes'], **search_args)
+            return jsonify({
+                data_type: [result.to_dict() for result in data_type_results]
+                for data_type, data_type_results in results.items()
+            })
+
+        results = copernicus_api.search_satellite_data(data.get('dataType', 'S2MSI2A'), **search_args)
+        return jsonify([result.to_dict() for result in results])
+    except Exception as e:
+        logger.error(f"Error searching satellite data: {str(e)}")
+        return jsonify({
+            "error": "Failed to search satellite data",
+            "details": str(e)
+        }), 500
+
+@copernicus_bp.route('/product/<product_id>/preview', methods=['GET'])
+def product_preview(product_id):
+    """
+    Serve the preview image of a product from the preview store
+
+    Path parameters:
+        product_id: Product ID
+
+    Query parameters:
+        asset: Optional preferred STAC asset type (e.g., thumbnail)
+
+    Returns:
+        Image response with ETag and Cache-Control headers
+    """
+    try:
+        asset_type = request.args.get('asset')
+        preview = copernicus_api.get_product_preview(product_id, asset_type=asset_type)
+
+        if not preview:
+            return jsonify({
+                "error": "Preview not found",
+                "details": f"No preview image available for product {product_id}"
+            }), 404
+
+        return _image_response(preview)
+    except Exception as e:
+        logger.error(f"Error serving product preview: {str(e)}")
+        return jsonify({
+            "error": "Failed to get product preview",
+            "details": str(e)
+        }), 500
+
+@copernicus_bp.route('/mosaic', methods=['GET'])
+def products_mosaic():
+    """
+    Serve one image compositing the previews of several products
+
+    Query parameters:
+        ids: Comma-separated product IDs
+        mode: Optional layout, 'sheet' (contact sheet, default) or 'geo' (placed by footprint, newest scene per footprint)
+
+    Returns:
+        JPEG response with ETag and Cache-Control headers
+    """
+    try:
+        product_ids = [product_id for product_id in request.args.get('ids', '').split(',') if product_id]
+        mode = request.args.get('mode', 'sheet')
+
+        if not product_ids or mode not in ('geo', 'sheet'):
+            return jsonify({
+                "error": "Invalid parameters",
+                "details": "ids is required and mode must be 'geo' or 'sheet'"
+            }), 400
+
+        image = copernicus_async.get_products_mosaic(product_ids, mode=mode)
+
+        if not image:
+            return jsonify({
+                "error": "Mosaic not available",
+                "details": "No preview image available for the requested products"
+            }), 404
+
+        return _image_response(image)
+    except Exception as e:
+        logger.error(f"Error serving products mosaic: {str(e)}")
+        return jsonify({
+            "error": "Failed to get products mosaic",
+            "details": str(e)
+        }), 500
@@ -0,0 +1,235 @@
+"""
+Geocoding for SpaceData application
+All Nominatim calls go through one shared client behind a token-bucket
+queue that respects the 1 request/second usage policy. Results (including
+misses) are cached in memory and on disk
+"""
+
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderTimedOut
+from dotenv import load_dotenv
+from caching import CACHE_DIR, DiskCache, SingleFlight, TTLCache
+from rate_limit import TokenBucket
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# User agent for geocoding
+USER_AGENT = os.getenv('GEOCODER_USER_AGENT', 'SpaceData-App/1.0')
+
+# Geocoder configuration
+GEOCODER_RATE = float(os.getenv('GEOCODER_RATE', '1'))  # requests per second (Nominatim policy: at most 1)
+GEOCODER_TIMEOUT = float(os.getenv('GEOCODER_TIMEOUT', '10'))  # seconds per request
+GEOCODER_QUEUE_TIMEOUT = float(os.getenv('GEOCODER_QUEUE_TIMEOUT', '15'))  # longest wait for a request slot
+GEOCODE_CACHE_PATH = os.getenv('GEOCODE_CACHE_PATH', os.path.join(CACHE_DIR, 'geocoding.sqlite3'))
+GEOCODE_CACHE_TTL = float(os.getenv('GEOCODE_CACHE_TTL', str(30 * 86400)))  # seconds
+GEOCODE_NEGATIVE_TTL = float(os.getenv('GEOCODE_NEGATIVE_TTL', '86400'))  # seconds a miss is remembered
+GEOCODE_MEMORY_SIZE = int(os.getenv('GEOCODE_MEMORY_SIZE', '2048'))
+REVERSE_GRID = float(os.getenv('GEOCODER_REVERSE_GRID', '0.01'))  # degrees reverse lookups are snapped to
+REVERSE_MAX_LOOKUPS = int(os.getenv('GEOCODER_REVERSE_MAX_LOOKUPS', '5'))  # uncached points resolved per batch
+GEOCODER_WORKERS = int(os.getenv('GEOCODER_WORKERS', '4'))
+
+# Shared Nominatim client and request queue
+_geolocator = Nominatim(user_agent=USER_AGENT, timeout=GEOCODER_TIMEOUT)
+_rate_limiter = TokenBucket(GEOCODER_RATE, capacity=1)
+
+# Identical lookups in flight at the same time share one request
+_flight = SingleFlight()
+
+# Workers resolving uncached reverse lookups; the rate limiter still spaces their requests
+_reverse_executor = ThreadPoolExecutor(max_workers=GEOCODER_WORKERS, thread_name_prefix='reverse-geocode')
+
+# Memory cache in front of the disk cache
+_memory_cache = TTLCache(max_size=GEOCODE_MEMORY_SIZE, ttl=GEOCODE_CACHE_TTL)
+
+try:
+    _disk_cache = DiskCache(GEOCODE_CACHE_PATH, ttl=GEOCODE_CACHE_TTL)
+except Exception as e:
+    logger.warning(f'Geocoding disk cache unavailable, results are cached in memory only: {str(e)}')
+    _disk_cache = None
+
+# Cached value of lookups that found nothing
+NOT_FOUND = {'found': False}
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a place name so that trivially different spellings share a cache entry"""
+    normalized = re.sub(r'\s*,\s*', ', ', ' '.join(str(query).casefold().split()))
+    return normalized.strip(' ,.;')
+
+
+def _nominatim(method: str, *args, **kwargs) -> Any:
+    """Call the shared Nominatim client once a request slot is free"""
+    if not _rate_limiter.acquire(timeout=GEOCODER_QUEUE_TIMEOUT):
+        raise GeocoderTimedOut('Timed out waiting for a geocoding request slot')
+    return getattr(_geolocator, method)(*args, **kwargs)
+
+
+def _cached(key: str, lookup) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a key from the memory cache, the disk cache or the lookup function
+    Misses are cached for GEOCODE_NEGATIVE_TTL; errors are not cached
+    """
+    value = _memory_cache.get(key)
+    if value is None and _disk_cache:
+        value = _disk_cache.get(key)
+        if value is not None:
+            _memory_cache.set(key, value)
+
+    if value is None:
+        value = _flight.do(key, _lookup_and_store, key, lookup)
+
+    return None if value == NOT_FOUND else value
+
+
+def _lookup_and_store(key: str, lookup) -> Dict[str, Any]:
+    """Run a lookup and cache its result, or a negative entry if nothing was found"""
+    value = lookup() or NOT_FOUND
+    ttl = GEOCODE_NEGATIVE_TTL if value == NOT_FOUND else GEOCODE_CACHE_TTL
+    _memory_cache.set(key, value, ttl=ttl)
+    if _disk_cache:
+        _disk_cache.set(key, value, ttl=ttl)
+    return value
+
+
+def geocode(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Geocode a place name
+    Args:
+        query: Place name (e.g., "Paris, France")
+    Returns:
+        Dictionary with lat, lng, address and boundingbox ([min_lat, max_lat, min_lng, max_lng]
+        or None), or None if the place was not found
+    Raises:
+        GeocoderTimedOut, GeocoderServiceError: If Nominatim cannot be reached (not cached)
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return None
+
+    def lookup():
+        location = _nominatim('geocode', normalized, exactly_one=True)
+        if not location:
+            return None
+        raw = getattr(location, 'raw', None) or {}
+        return {
+            'lat': location.latitude,
+            'lng': location.longitude,
+            'address': location.address,
+            'boundingbox': raw.get('boundingbox')
+        }
+
+    return _cached(f'geocode:{normalized}', lookup)
+
+
+def snap_to_grid(lat: float, lng: float, grid: Optional[float] = None) -> Tuple[float, float]:
+    """Snap a point to the reverse geocoding grid (GEOCODER_REVERSE_GRID degrees by default)"""
+    grid = grid or REVERSE_GRID
+    return round(round(float(lat) / grid) * grid, 6), round(round(float(lng) / grid) * grid, 6)
+
+
+def _reverse_key(cell: Tuple[float, float]) -> str:
+    """Cache key of a grid cell"""
+    return f'reverse:{cell[0]:.6f},{cell[1]:.6f}'
+
+
+def _reverse_lookup(cell: Tuple[float, float]) -> Dict[str, Any]:
+    """Reverse geocode a grid cell upstream, caching the result"""
+    def lookup():
+        location = _nominatim('reverse', f"{cell[0]}, {cell[1]}", language='en')
+        if not location or not location.address:
+            return None
+        return {'address': location.address}
+
+    key = _reverse_key(cell)
+    return _flight.do(key, _lookup_and_store, key, lookup)
+
+
+def reverse_many(
+    points: Sequence[Sequence[float]],
+    grid: Optional[float] = None,
+    max_lookups: Optional[int] = None
+) -> List[Optional[str]]:
+    """
+    Reverse geocode many points at once
+    Points are snapped to a grid and de-duplicated; cells are served from the
+    memory and disk caches and only the remaining misses are sent to
+    Nominatim, concurrently through the rate-limited request queue
+    Args:
+        points: [lat, lng] points, most important first
+        grid: Grid size in degrees (defaults to GEOCODER_REVERSE_GRID)
+        max_lookups: Maximum number of uncached cells resolved upstream
+                     (defaults to GEOCODER_REVERSE_MAX_LOOKUPS); later ones are left unresolved
+    Returns:
+        Address of each point, or None if not found or not resolved
+    """
+    max_lookups = REVERSE_MAX_LOOKUPS if max_lookups is None else max_lookups
+    cells = [snap_to_grid(point[0], point[1], grid) for point in points]
+    unique = list(dict.fromkeys(cells))
+    values = {}
+
+    missing = []
+    for cell in unique:
+        value = _memory_cache.get(_reverse_key(cell))
+        if value is not None:
+            values[cell] = value
+        else:
+            missing.append(cell)
+
+    if missing and _disk_cache:
+        stored = _disk_cache.get_many([_reverse_key(cell) for cell in missing])
+        for cell in missing:
+            value = stored.get(_reverse_key(cell))
+            if value is not None:
+                values[cell] = value
+                _memory_cache.set(_reverse_key(cell), value)
+        missing = [cell for cell in missing if cell not in values]
+
+    if len(missing) > max_lookups:
+        logger.info(f'Resolving {max_lookups} of {len(missing)} uncached points')
+
+    futures = {cell: _reverse_executor.submit(_reverse_lookup, cell) for cell in missing[:max_lookups]}
+    for cell, future in futures.items():
+        try:
+            values[cell] = future.result()
+        except Exception as e:
+            logger.warning(f'Reverse geocoding error: {str(e)}')
+
+    return [
+        None if values.get(cell) in (None, NOT_FOUND) else values[cell]['address']
+        for cell in cells
+    ]
+
+
+def reverse(lat: float, lng: float) -> Optional[str]:
+    """
+    Reverse geocode a point
+    Args:
+        lat: Latitude
+        lng: Longitude
+    Returns:
+        Address of the point, or None if nothing was found or Nominatim could not be reached
+    """
+    return reverse_many([(lat, lng)])[0]
+
+
+def get_geocoding_stats() -> Dict[str, Any]:
+    """
+    Get cache and request queue counters
+    Returns:
+        dict: Memory cache, disk cache, coalescing and rate limiter statistics
+    """
+    return {
+        'memory_cache': _memory_cache.stats(),
+        'disk_cache': _disk_cache.stats() if _disk_cache else None,
+        'coalesced': _flight.stats(),
+        'rate_limiter': _rate_limiter.stats()
+    }
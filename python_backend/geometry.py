@@ -0,0 +1,426 @@
+"""
+Geometry utilities for SpaceData application
+Vectorized polygon operations on lng/lat rings: geodesic area, perimeter and
+centroid of batches of polygons, and the overlap used to filter and rank
+satellite scenes against the area of interest
+"""
+
+import math
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius (IUGG) in kilometers
+EARTH_RADIUS_KM = 6371.0088
+
+
+def pad_rings(rings: Sequence[Sequence[Sequence[float]]]) -> np.ndarray:
+    """
+    Stack [lng, lat] rings of different lengths into one array
+    Rings are closed and padded by repeating their first vertex, so the
+    padding adds zero-length edges that change no area, length or centroid
+    Args:
+        rings: [lng, lat] rings, closed or open
+    Returns:
+        (f, n, 2) array of closed rings (rings with no points are all zeros)
+    """
+    # Rings of equal length are closed in one step
+    if isinstance(rings, np.ndarray) and rings.ndim == 3 and rings.shape[1]:
+        rings = np.asarray(rings[..., :2], dtype=np.float64)
+        if np.array_equal(rings[:, 0], rings[:, -1]):
+            return rings
+        return np.concatenate([rings, rings[:, :1]], axis=1)
+
+    closed = []
+    for ring in rings:
+        points = np.asarray(ring, dtype=np.float64).reshape(-1, 2) if len(ring) else np.zeros((1, 2))
+        if not np.array_equal(points[0], points[-1]):
+            points = np.vstack([points, points[:1]])
+        closed.append(points)
+
+    width = max((len(points) for points in closed), default=1)
+    padded = np.empty((len(closed), width, 2), dtype=np.float64)
+    for row, points in enumerate(closed):
+        padded[row, :len(points)] = points
+        padded[row, len(points):] = points[0]
+    return padded
+
+
+def _as_rings(polygons) -> np.ndarray:
+    """Accept either an (f, n, 2) array or a sequence of rings, closing them if needed"""
+    return pad_rings(polygons)
+
+
+def geodesic_areas(polygons) -> np.ndarray:
+    """
+    Areas of [lng, lat] polygons on the sphere in square kilometers
+    Uses the spherical excess of each edge's trapezoid to the equator (the
+    formula used by Leaflet.draw and OpenLayers), exact for great-circle edges
+    to within the spherical Earth model
+    Args:
+        polygons: (f, n, 2) closed rings (see pad_rings) or a sequence of rings
+    Returns:
+        (f,) array of areas in km2
+    """
+    rings = _as_rings(polygons)
+    lng = np.radians(rings[..., 0])
+    lat = np.radians(rings[..., 1])
+    sin_lat = np.sin(lat)
+    excess = np.sum((lng[:, 1:] - lng[:, :-1]) * (2 + sin_lat[:, :-1] + sin_lat[:, 1:]), axis=1)
+    return np.abs(excess) * EARTH_RADIUS_KM ** 2 / 2
+
+
+def geodesic_perimeters(polygons) -> np.ndarray:
+    """
+    Great-circle perimeters of [lng, lat] polygons in kilometers (haversine)
+    Args:
+        polygons: (f, n, 2) closed rings (see pad_rings) or a sequence of rings
+    Returns:
+        (f,) array of perimeters in km
+    """
+    rings = _as_rings(polygons)
+    lng = np.radians(rings[..., 0])
+    lat = np.radians(rings[..., 1])
+    cos_lat = np.cos(lat)
+    h = np.square(np.sin(np.diff(lat, axis=1) / 2)) + \
+        cos_lat[:, :-1] * cos_lat[:, 1:] * np.square(np.sin(np.diff(lng, axis=1) / 2))
+    return np.sum(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))), axis=1)
+
+
+def polygon_centroids(polygons) -> np.ndarray:
+    """
+    Area-weighted centroids of [lng, lat] polygons
+    Computed in a local equirectangular projection per polygon, which is
+    accurate for scene- and region-sized polygons; degenerate polygons fall
+    back to the mean of their vertices
+    Args:
+        polygons: (f, n, 2) closed rings (see pad_rings) or a sequence of rings
+    Returns:
+        (f, 2) array of [lng, lat] centroids
+    """
+    rings = _as_rings(polygons)
+    scale = np.cos(np.radians(rings[..., 1].mean(axis=1)))[:, None]
+    x = rings[..., 0] * scale
+    y = rings[..., 1]
+
+    cross = x[:, :-1] * y[:, 1:] - x[:, 1:] * y[:, :-1]
+    area = cross.sum(axis=1) / 2
+    safe = np.where(area == 0, 1.0, area)
+    cx = np.sum((x[:, :-1] + x[:, 1:]) * cross, axis=1) / (6 * safe)
+    cy = np.sum((y[:, :-1] + y[:, 1:]) * cross, axis=1) / (6 * safe)
+
+    centroids = np.stack([cx / scale[:, 0], cy], axis=1)
+    degenerate = area == 0
+    if degenerate.any():
+        centroids[degenerate] = rings[degenerate, :-1].mean(axis=1)
+    return centroids
+
+
+def measure_polygons(polygons) -> Dict[str, np.ndarray]:
+    """
+    Geodesic area, perimeter and centroid of a batch of polygons in one call
+    Args:
+        polygons: (f, n, 2) closed rings (see pad_rings) or a sequence of rings
+    Returns:
+        Dictionary with 'area_km2' (f,), 'perimeter_km' (f,) and 'centroid' (f, 2) arrays
+    """
+    # Pad once; the measures then take the padded rings as they are
+    rings = _as_rings(polygons)
+    return {
+        'area_km2': geodesic_areas(rings),
+        'perimeter_km': geodesic_perimeters(rings),
+        'centroid': polygon_centroids(rings)
+    }
+
+
+def polygon_area_km2(ring: Sequence[Sequence[float]]) -> float:
+    """Geodesic area of a single [lng, lat] ring in square kilometers"""
+    if len(ring) < 3:
+        return 0.0
+    return float(geodesic_areas(pad_rings([ring]))[0])
+
+
+def points_in_polygons(polygons, points: np.ndarray) -> np.ndarray:
+    """
+    Even-odd point-in-polygon test of a batch of points against a batch of polygons
+    Args:
+        polygons: (f, n, 2) array of closed [lng, lat] rings, or a sequence of rings
+        points: (f, p, 2) array of [lng, lat] points, tested against the polygon of the same index
+    Returns:
+        (f, p) boolean array
+    """
+    rings = _as_rings(polygons)
+    points = np.asarray(points, dtype=np.float64)
+    x0, y0 = rings[:, None, :-1, 0], rings[:, None, :-1, 1]
+    x1, y1 = rings[:, None, 1:, 0], rings[:, None, 1:, 1]
+    px, py = points[..., 0, None], points[..., 1, None]
+
+    # Edges crossing the horizontal line through each point, left of the point
+    crosses = (y0 > py) != (y1 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (px < x_cross), axis=2) % 2 == 1
+
+
+def convex_hull(points: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Convex hull of a set of points (Andrew's monotone chain)
+    Args:
+        points: [x, y] points
+    Returns:
+        Counter-clockwise hull vertices as an (n, 2) array, without the closing vertex
+    """
+    unique = sorted(set((float(x), float(y)) for x, y in points))
+    if len(unique) < 3:
+        return np.array(unique, dtype=np.float64).reshape(-1, 2)
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for point in unique:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    for point in reversed(unique):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return np.array(lower[:-1] + upper[:-1], dtype=np.float64)
+
+
+def footprint_points(geometry: Optional[Dict[str, Any]], bbox: Optional[Sequence[float]] = None) -> List[List[float]]:
+    """
+    Outer ring vertices of a GeoJSON footprint, falling back to its bbox
+    Args:
+        geometry: GeoJSON Polygon or MultiPolygon
+        bbox: [west, south, east, north] used when no geometry is available
+    Returns:
+        [lng, lat] points (empty if neither is available)
+    """
+    geometry = geometry or {}
+    if geometry.get('type') == 'Polygon':
+        return [point[:2] for point in geometry['coordinates'][0]]
+    if geometry.get('type') == 'MultiPolygon':
+        return [point[:2] for polygon in geometry['coordinates'] for point in polygon[0]]
+    if bbox and len(bbox) >= 4:
+        west, south, east, north = bbox[:4]
+        return [[west, south], [east, south], [east, north], [west, north]]
+    return []
+
+
+def footprint_parts(geometry: Optional[Dict[str, Any]], bbox: Optional[Sequence[float]] = None) -> List[List[List[float]]]:
+    """
+    Outer ring vertices of each part of a GeoJSON footprint
+    Footprints split at the antimeridian are MultiPolygons whose parts lie on
+    opposite sides of the globe, so each part has to be measured on its own
+    Args:
+        geometry: GeoJSON Polygon or MultiPolygon
+        bbox: [west, south, east, north] used when no geometry is available
+    Returns:
+        List of [lng, lat] point lists, one per part (empty if neither is available)
+    """
+    geometry = geometry or {}
+    if geometry.get('type') == 'MultiPolygon':
+        return [[point[:2] for point in polygon[0]] for polygon in geometry['coordinates'] if polygon]
+    points = footprint_points(geometry, bbox)
+    return [points] if points else []
+
+
+def polygon_areas(polygons: np.ndarray) -> np.ndarray:
+    """
+    Planar areas of a batch of polygons (shoelace formula)
+    Args:
+        polygons: (f, n, 2) array of vertices; repeated vertices are allowed
+    Returns:
+        (f,) array of absolute areas
+    """
+    x, y = polygons[..., 0], polygons[..., 1]
+    return 0.5 * np.abs(np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1))
+
+
+def _compact(points: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """
+    Move the kept vertices of every polygon to the front, in order, and pad
+    each row by repeating its last kept vertex (zero-length edges do not
+    change the clip or the area)
+    """
+    counts = keep.sum(axis=1)
+    width = max(int(counts.max()), 1)
+
+    # A stable sort puts the kept columns first, in order; the padding then
+    # points at the last kept column (at the first column for empty polygons)
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :width]
+    last = np.take_along_axis(order, np.maximum(counts - 1, 0)[:, None], axis=1)
+    order = np.where(np.arange(width)[None, :] < counts[:, None], order, last)
+    compacted = np.take_along_axis(points, order[..., None], axis=1)
+
+    # Empty polygons become all zeros
+    compacted[counts == 0] = 0
+    return compacted
+
+
+def clip_polygons(subject: np.ndarray, clips: np.ndarray) -> np.ndarray:
+    """
+    Clip one polygon against a batch of convex polygons in a single pass
+    (Sutherland-Hodgman, vectorized over the clip polygons)
+    Args:
+        subject: (n, 2) vertices of the polygon to clip, any simple polygon
+        clips: (f, m, 2) counter-clockwise convex polygons, padded by repeating vertices
+    Returns:
+        (f, k, 2) clipped polygons, padded by repeating vertices
+    """
+    count = clips.shape[0]
+    polygons = np.broadcast_to(subject, (count,) + subject.shape).astype(np.float64)
+
+    # The closing edge of closed rings has zero length and keeps everything
+    edges = clips.shape[1] - 1 if np.array_equal(clips[:, 0], clips[:, -1]) else clips.shape[1]
+    for edge in range(edges):
+        a = clips[:, edge][:, None, :]
+        b = clips[:, (edge + 1) % clips.shape[1]][:, None, :]
+        direction = b - a
+
+        current = polygons
+        previous = np.roll(polygons, 1, axis=1)
+
+        # Signed distance of each vertex to the clip edge (>= 0 is inside);
+        # repeated clip vertices give zero-length edges that keep everything
+        side_current = direction[..., 0] * (current[..., 1] - a[..., 1]) - direction[..., 1] * (current[..., 0] - a[..., 0])
+        side_previous = direction[..., 0] * (previous[..., 1] - a[..., 1]) - direction[..., 1] * (previous[..., 0] - a[..., 0])
+        inside_current = side_current >= 0
+        inside_previous = side_previous >= 0
+
+        crossing = inside_current != inside_previous
+        denominator = np.where(crossing, side_previous - side_current, 1.0)
+        t = np.where(crossing, side_previous / denominator, 0.0)
+        intersection = previous + t[..., None] * (current - previous)
+
+        # Each subject edge emits its crossing point, then its end vertex if inside
+        points = np.empty((count, 2 * current.shape[1], 2))
+        points[:, 0::2], points[:, 1::2] = intersection, current
+        keep = np.empty((count, 2 * current.shape[1]), dtype=bool)
+        keep[:, 0::2], keep[:, 1::2] = crossing, inside_current
+        polygons = _compact(points, keep)
+
+    return polygons
+
+
+def convex_footprints(footprints) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Counter-clockwise convex rings for a batch of footprints
+    Orientation and convexity are checked for all footprints at once; only
+    the (rare) non-convex ones are replaced by their convex hull
+    Args:
+        footprints: (f, n, 2) closed rings (see pad_rings) or a sequence of [lng, lat] points
+    Returns:
+        tuple: ((f, n, 2) rings padded by repeating vertices, (f,) mask of non-degenerate footprints)
+    """
+    rings = np.array(_as_rings(footprints), dtype=np.float64)
+    if not len(rings):
+        return rings, np.zeros(0, dtype=bool)
+
+    x, y = rings[..., 0], rings[..., 1]
+    signed = np.sum(x[:, :-1] * y[:, 1:] - x[:, 1:] * y[:, :-1], axis=1) / 2
+    valid = signed != 0
+
+    # Reverse clockwise rings
+    clockwise = signed < 0
+    rings[clockwise] = rings[clockwise, ::-1]
+
+    # A ring is convex if every turn between consecutive non-zero edges is a left turn
+    edges = np.diff(rings, axis=1)
+    edges = _compact(edges, np.any(edges != 0, axis=2))
+    following = np.roll(edges, -1, axis=1)
+    turns = edges[..., 0] * following[..., 1] - edges[..., 1] * following[..., 0]
+    concave = valid & np.any(turns < -1e-12, axis=1)
+
+    for index in np.flatnonzero(concave):
+        hull = convex_hull(rings[index])
+        rings[index, :len(hull)] = hull
+        rings[index, len(hull):] = hull[0]
+
+    return rings, valid
+
+
+def overlap_fractions(
+    aoi: Sequence[Sequence[float]],
+    footprints: Sequence[Sequence[Sequence[float]]]
+) -> np.ndarray:
+    """
+    Fraction of an area of interest covered by each footprint
+    Footprints are taken as their convex hulls, which is exact for the
+    (convex) footprints of Sentinel scenes. Areas are computed in a local
+    equirectangular projection centred on the area of interest
+    Args:
+        aoi: [lng, lat] ring of the area of interest (closed or open)
+        footprints: [lng, lat] points of each footprint, or (f, n, 2) closed rings
+    Returns:
+        (f,) array of fractions in [0, 1]; 0 for footprints without points
+    """
+    ring = np.asarray(aoi, dtype=np.float64)[:, :2]
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+
+    fractions = np.zeros(len(footprints), dtype=np.float64)
+    if len(ring) < 3 or not len(footprints):
+        return fractions
+
+    scale = math.cos(math.radians(float(ring[:, 1].mean())))
+    projection = np.array([scale, 1.0])
+    subject = ring * projection
+    aoi_area = polygon_areas(subject[None])[0]
+    if aoi_area == 0:
+        return fractions
+
+    clips, valid = convex_footprints(footprints)
+
+    # Only footprints whose bbox meets the area of interest need clipping
+    west, south = ring.min(axis=0)
+    east, north = ring.max(axis=0)
+    valid &= (
+        (clips[..., 0].min(axis=1) <= east) & (clips[..., 0].max(axis=1) >= west) &
+        (clips[..., 1].min(axis=1) <= north) & (clips[..., 1].max(axis=1) >= south)
+    )
+    if not valid.any():
+        return fractions
+
+    # A convex footprint with every vertex of the area of interest on the
+    # inner side of all its edges contains the area, so it needs no clipping
+    candidates = np.flatnonzero(valid)
+    clips = clips[candidates] * projection
+    a = clips[:, :, None, :]
+    direction = np.roll(clips, -1, axis=1)[:, :, None, :] - a
+    sides = direction[..., 0] * (subject[None, None, :, 1] - a[..., 1]) - \
+        direction[..., 1] * (subject[None, None, :, 0] - a[..., 0])
+    contains = np.all(sides >= 0, axis=(1, 2))
+    fractions[candidates[contains]] = 1.0
+
+    partial = ~contains
+    if partial.any():
+        clipped = clip_polygons(subject, clips[partial])
+        fractions[candidates[partial]] = np.clip(polygon_areas(clipped) / aoi_area, 0.0, 1.0)
+    return fractions
+
+
+def part_overlap_fractions(
+    aoi: Sequence[Sequence[float]],
+    footprints: Sequence[Sequence[Sequence[Sequence[float]]]]
+) -> np.ndarray:
+    """
+    Fraction of an area of interest covered by each multi-part footprint
+    Every part is clipped on its own and the fractions of a footprint's parts
+    are summed, so the hull of parts split at the antimeridian is never used
+    Args:
+        aoi: [lng, lat] ring of the area of interest (closed or open)
+        footprints: Parts of each footprint, as returned by footprint_parts
+    Returns:
+        (f,) array of fractions in [0, 1]; 0 for footprints without parts
+    """
+    parts = [part for footprint in footprints for part in footprint]
+    owners = np.repeat(np.arange(len(footprints)), [len(footprint) for footprint in footprints])
+    fractions = np.bincount(owners, weights=overlap_fractions(aoi, parts), minlength=len(footprints))
+    return np.minimum(fractions, 1.0)
@@ -0,0 +1,176 @@
+"""
+Land/water mask for SpaceData application
+Global land raster (built with build_landmask.py) loaded as a memory-mapped
+NumPy array, answering vectorized point and polygon land fraction queries
+without any network call. A 0.25 degree raster ships in data/; when no
+raster can be loaded every query returns None and callers fall back to their
+own heuristics
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Optional, Sequence
+import numpy as np
+from dotenv import load_dotenv
+from geometry import pad_rings, points_in_polygons
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Land mask configuration
+LANDMASK_PATH = os.getenv(
+    'LANDMASK_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'landmask.npy')
+)
+LANDMASK_RETRY_INTERVAL = float(os.getenv('LANDMASK_RETRY_INTERVAL', '300'))  # seconds before a failed load is retried
+LANDMASK_SAMPLES = int(os.getenv('LANDMASK_SAMPLES', '32'))  # sample points per side of a polygon's bbox
+WATER_BODY_FRACTION = float(os.getenv('LANDMASK_WATER_BODY_FRACTION', '0.5'))  # water share of a water body
+
+# Raster: uint8 (rows, 2 * rows), 1 = land, row 0 starts at 90N and column 0 at 180W;
+# a (rows, rows / 4) file holds the same raster bit-packed along the rows (most
+# significant bit first) and is read bit by bit from the memory map
+_mask = None
+_retry_at = 0.0  # monotonic time of the next load attempt after a failure
+_lock = threading.Lock()
+
+
+def _is_packed(mask: np.ndarray) -> bool:
+    """Whether a raster holds 8 cells per byte"""
+    return mask.dtype == np.uint8 and mask.shape[1] * 8 == 2 * mask.shape[0]
+
+
+def _read(path: str) -> np.ndarray:
+    """Memory-map a raster file, plain or bit-packed"""
+    mask = np.load(path, mmap_mode='r')
+    if mask.ndim != 2 or not (mask.shape[1] == 2 * mask.shape[0] or _is_packed(mask)):
+        raise ValueError(f'expected a (rows, 2 * rows) global raster or its bit-packed form, got {mask.shape}')
+    return mask
+
+
+def _load() -> Optional[np.ndarray]:
+    """
+    Load the raster on first use
+    Returns:
+        The raster, or None if it is missing or invalid; failed loads are
+        retried every LANDMASK_RETRY_INTERVAL seconds
+    """
+    global _mask, _retry_at
+    if _mask is not None or time.monotonic() < _retry_at:
+        return _mask
+
+    with _lock:
+        if _mask is None and time.monotonic() >= _retry_at:
+            try:
+                _mask = _read(LANDMASK_PATH)
+                logger.info(f'Land mask loaded from {LANDMASK_PATH} ({180 / _mask.shape[0]:g} degree cells)')
+            except FileNotFoundError:
+                logger.warning(f'No land mask at {LANDMASK_PATH}; land/water lookups are disabled')
+            except Exception as e:
+                logger.warning(f'Land mask at {LANDMASK_PATH} could not be loaded: {str(e)}')
+            if _mask is None:
+                _retry_at = time.monotonic() + LANDMASK_RETRY_INTERVAL
+    return _mask
+
+
+def available() -> bool:
+    """Whether a land mask is installed"""
+    return _load() is not None
+
+
+def _lookup(mask: np.ndarray, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Land flags of the raster cells containing the points"""
+    rows = mask.shape[0]
+    cols = 2 * rows
+    row = np.clip(np.floor((90 - lats) * (rows / 180)).astype(np.intp), 0, rows - 1)
+    col = np.clip(np.floor(((lngs + 180) % 360) * (cols / 360)).astype(np.intp), 0, cols - 1)
+    if _is_packed(mask):
+        return (mask[row, col >> 3] >> (7 - (col & 7)).astype(np.uint8)) & 1 > 0
+    return mask[row, col] > 0
+
+
+def land_at(points: Sequence[Sequence[float]]) -> Optional[np.ndarray]:
+    """
+    Whether points are on land
+    Args:
+        points: [lat, lng] points
+    Returns:
+        Boolean array, or None if no land mask is installed
+    """
+    mask = _load()
+    if mask is None:
+        return None
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return _lookup(mask, points[:, 0], points[:, 1])
+
+
+def land_fractions(polygons: Sequence[Sequence[Sequence[float]]], samples: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Fraction of land in a batch of polygons
+    Each polygon is sampled on a regular grid over its bbox (no finer than the
+    raster cells); samples outside the polygon are ignored. Polygons too small
+    to contain a sample use their vertices
+    Args:
+        polygons: Polygons as lists of [lat, lng] points
+        samples: Sample points per side of the bbox (defaults to LANDMASK_SAMPLES)
+    Returns:
+        (f,) array of fractions in [0, 1] (NaN for polygons without points), or
+        None if no land mask is installed
+    """
+    mask = _load()
+    if mask is None:
+        return None
+    if not len(polygons):
+        return np.zeros(0, dtype=np.float64)
+
+    rings = pad_rings([[(point[1], point[0]) for point in polygon] for polygon in polygons])
+    west, south = rings.min(axis=1).T
+    east, north = rings.max(axis=1).T
+
+    # Sampling finer than the raster cells adds no information
+    cell = 180 / mask.shape[0]
+    extent = float(max((east - west).max(), (north - south).max()))
+    samples = int(min(samples or LANDMASK_SAMPLES, max(2, np.ceil(extent / cell) + 1)))
+
+    # Cell centres of a samples x samples grid over each bbox
+    steps = (np.arange(samples) + 0.5) / samples
+    lngs = west[:, None, None] + (east - west)[:, None, None] * steps[None, None, :]
+    lats = south[:, None, None] + (north - south)[:, None, None] * steps[None, :, None]
+    grid = np.stack(np.broadcast_arrays(lngs, lats), axis=-1).reshape(len(rings), -1, 2)
+
+    inside = points_in_polygons(rings, grid)
+    land = _lookup(mask, grid[..., 1], grid[..., 0])
+    counts = inside.sum(axis=1)
+
+    with np.errstate(invalid='ignore'):
+        fractions = (land & inside).sum(axis=1) / counts
+        vertex_fractions = _lookup(mask, rings[..., 1], rings[..., 0]).mean(axis=1)
+    fractions = np.where(counts > 0, fractions, vertex_fractions)
+    fractions[[len(polygon) == 0 for polygon in polygons]] = np.nan
+    return fractions
+
+
+def land_fraction(coordinates: Sequence[Sequence[float]]) -> Optional[float]:
+    """
+    Fraction of land in one polygon
+    Args:
+        coordinates: List of [lat, lng] points
+    Returns:
+        Fraction in [0, 1], or None if no land mask is installed or the polygon is empty
+    """
+    if not coordinates:
+        return None
+    fractions = land_fractions([coordinates])
+    if fractions is None or np.isnan(fractions[0]):
+        return None
+    return float(fractions[0])
+
+
+def describe_land_fraction(fraction: float) -> str:
+    """One-sentence summary of a land fraction for AI prompts"""
+    land = round(fraction * 100)
+    return f'According to the land/water mask, about {land}% of this area is land and {100 - land}% is water.'
@@ -0,0 +1,201 @@
+"""
+Mosaic compositor for SpaceData application
+Composites product thumbnails into one contact sheet or georeferenced mosaic.
+Decoding and blending run in a process pool so they never hold the GIL of
+the web workers
+"""
+
+import io
+import os
+import math
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Mosaic configuration
+MOSAIC_WORKERS = int(os.getenv('MOSAIC_WORKERS', '2'))
+MOSAIC_WIDTH = int(os.getenv('MOSAIC_WIDTH', '1024'))
+MOSAIC_TIMEOUT = float(os.getenv('MOSAIC_TIMEOUT', '30'))  # seconds
+MOSAIC_QUALITY = 85
+
+# Pixels darker than this in every band are treated as no-data borders
+NODATA_THRESHOLD = 8
+
+# A tile is (image bytes, [west, south, east, north] or None)
+Tile = Tuple[bytes, Optional[Sequence[float]]]
+
+
+def _decode(data: bytes) -> np.ndarray:
+    """Decode image bytes to an RGB float array"""
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert('RGB'), dtype=np.float32)
+
+
+def _resize(pixels: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Resize an RGB float array"""
+    image = Image.fromarray(pixels.astype(np.uint8))
+    return np.asarray(image.resize((max(1, width), max(1, height)), Image.BILINEAR), dtype=np.float32)
+
+
+def _encode(pixels: np.ndarray) -> bytes:
+    """Encode an RGB float array as JPEG"""
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format='JPEG', quality=MOSAIC_QUALITY)
+    return buffer.getvalue()
+
+
+def _one_per_footprint(tiles: List[Tile]) -> List[Tile]:
+    """
+    Keep the first tile of each footprint
+    Scenes of the same tile on different dates share a bbox; averaging them
+    would blend acquisitions into an image that never existed
+    """
+    kept, seen = [], set()
+    for data, bbox in tiles:
+        footprint = tuple(round(value, 3) for value in bbox[:4])
+        if footprint not in seen:
+            seen.add(footprint)
+            kept.append((data, bbox))
+    return kept
+
+
+def _georeferenced(tiles: List[Tuple[np.ndarray, Sequence[float]]], width: int) -> bytes:
+    """Place tiles on a canvas covering the union of their bboxes and average overlaps"""
+    bboxes = np.array([bbox for _, bbox in tiles], dtype=np.float64)
+    west, south = bboxes[:, 0].min(), bboxes[:, 1].min()
+    east, north = bboxes[:, 2].max(), bboxes[:, 3].max()
+
+    # Keep the aspect ratio of the ground footprint
+    aspect = (north - south) / ((east - west) * math.cos(math.radians((north + south) / 2)))
+    height = max(1, int(round(width * aspect)))
+    x_scale = width / (east - west)
+    y_scale = height / (north - south)
+
+    total = np.zeros((height, width, 3), dtype=np.float32)
+    weight = np.zeros((height, width, 1), dtype=np.float32)
+
+    for pixels, (tile_west, tile_south, tile_east, tile_north) in tiles:
+        x0 = int(round((tile_west - west) * x_scale))
+        x1 = int(round((tile_east - west) * x_scale))
+        y0 = int(round((north - tile_north) * y_scale))
+        y1 = int(round((north - tile_south) * y_scale))
+        x0, y0 = min(x0, width - 1), min(y0, height - 1)
+        x1, y1 = max(x1, x0 + 1), max(y1, y0 + 1)
+
+        resized = _resize(pixels, x1 - x0, y1 - y0)[:height - y0, :width - x0]
+        mask = (resized.max(axis=2, keepdims=True) > NODATA_THRESHOLD).astype(np.float32)
+        rows, cols = resized.shape[:2]
+        total[y0:y0 + rows, x0:x0 + cols] += resized * mask
+        weight[y0:y0 + rows, x0:x0 + cols] += mask
+
+    return _encode(total / np.maximum(weight, 1.0))
+
+
+def _contact_sheet(tiles: List[np.ndarray], width: int) -> bytes:
+    """Lay tiles out on a square-ish grid"""
+    columns = math.ceil(math.sqrt(len(tiles)))
+    rows = math.ceil(len(tiles) / columns)
+    cell = max(1, width // columns)
+    sheet = np.zeros((rows * cell, columns * cell, 3), dtype=np.float32)
+
+    for index, pixels in enumerate(tiles):
+        row, column = divmod(index, columns)
+        height, tile_width = pixels.shape[:2]
+        scale = cell / max(height, tile_width)
+        resized = _resize(pixels, int(tile_width * scale), int(height * scale))
+        top = row * cell + (cell - resized.shape[0]) // 2
+        left = column * cell + (cell - resized.shape[1]) // 2
+        sheet[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+
+    return _encode(sheet)
+
+
+def compose_mosaic(tiles: List[Tile], mode: str = 'sheet', width: int = MOSAIC_WIDTH) -> bytes:
+    """
+    Composite thumbnails into one JPEG image (runs in a worker process)
+
+    Args:
+        tiles: (image bytes, bbox) pairs, newest first
+        mode: 'sheet' for a contact sheet of every tile, 'geo' to place tiles by
+              bbox, keeping only the first (newest) tile of each footprint;
+              'geo' falls back to a contact sheet when a tile has no usable bbox
+        width: Output width in pixels
+
+    Returns:
+        JPEG bytes
+    """
+    georeferenced = mode == 'geo' and all(
+        bbox and len(bbox) >= 4 and bbox[2] > bbox[0] and bbox[3] > bbox[1]
+        for _, bbox in tiles
+    )
+    if georeferenced:
+        return _georeferenced([(_decode(data), bbox) for data, bbox in _one_per_footprint(tiles)], width)
+
+    return _contact_sheet([_decode(data) for data, _ in tiles], width)
+
+
+class MosaicRenderer:
+    """Runs mosaic composition in a lazily started process pool"""
+
+    def __init__(self, max_workers: int = MOSAIC_WORKERS, timeout: float = MOSAIC_TIMEOUT):
+        """
+        Args:
+            max_workers: Number of worker processes
+            timeout: Seconds to wait for a mosaic
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Start the process pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                # Forking a multithreaded web process can copy held locks into the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next render starts a new one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def render(self, tiles: List[Tile], mode: str = 'sheet', width: int = MOSAIC_WIDTH) -> bytes:
+        """
+        Composite tiles in a worker process
+        A pool broken by a crashed worker is replaced and the mosaic retried once
+
+        Returns:
+            JPEG bytes
+        """
+        for attempt in range(2):
+            executor = self._pool()
+            try:
+                return executor.submit(compose_mosaic, tiles, mode, width).result(timeout=self.timeout)
+            except BrokenProcessPool:
+                logger.warning('Mosaic process pool is broken, starting a new one')
+                self._discard(executor)
+                if attempt:
+                    raise
+
+
+# Shared renderer used by the web workers
+renderer = MosaicRenderer()
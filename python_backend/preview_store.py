@@ -0,0 +1,174 @@
+"""
+Preview store for SpaceData application
+Disk-backed, content-addressed store of product preview images keyed by
+product id and asset type, with size-based least-recently-used eviction
+"""
+
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Store configuration
+PREVIEW_STORE_DIR = os.getenv(
+    'PREVIEW_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'previews')
+)
+PREVIEW_STORE_MAX_BYTES = int(os.getenv('PREVIEW_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS entries (
+    product_id TEXT NOT NULL,
+    asset_type TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (product_id, asset_type)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries (digest);
+"""
+
+
+class PreviewStore:
+    """Content-addressed disk store of preview images"""
+
+    def __init__(self, directory: str = PREVIEW_STORE_DIR, max_bytes: int = PREVIEW_STORE_MAX_BYTES):
+        """
+        Args:
+            directory: Directory holding the blobs and the index database
+            max_bytes: Total blob size above which least recently used blobs are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the index connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _blob_path(self, digest: str) -> str:
+        """Get the file path of a blob"""
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def get(self, product_id: str, asset_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a stored preview
+        Args:
+            product_id: Product ID
+            asset_type: Asset type of the preview (e.g., 'preview', 'thumbnail')
+        Returns:
+            Dictionary with data, content_type and etag, or None if not stored
+        """
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                """
+                SELECT b.digest, b.content_type FROM entries e
+                JOIN blobs b ON b.digest = e.digest
+                WHERE e.product_id = ? AND e.asset_type = ?
+                """,
+                (product_id, asset_type)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            digest, content_type = row
+            with open(self._blob_path(digest), 'rb') as f:
+                data = f.read()
+
+            with connection:
+                connection.execute('UPDATE blobs SET last_access = ? WHERE digest = ?', (time.time(), digest))
+
+            return {
+                'data': data,
+                'content_type': content_type,
+                'etag': digest
+            }
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f'Error reading preview store: {str(e)}')
+            return None
+
+    def put(self, product_id: str, asset_type: str, data: bytes, content_type: str) -> str:
+        """
+        Store a preview
+        Args:
+            product_id: Product ID
+            asset_type: Asset type of the preview
+            data: Image bytes
+            content_type: Image content type
+        Returns:
+            The content digest, usable as an ETag
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write atomically so concurrent readers never see a partial blob
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+            with self._write_lock:
+                connection = self._connection()
+                with connection:
+                    connection.execute(
+                        'INSERT OR REPLACE INTO blobs (digest, size, content_type, last_access) VALUES (?, ?, ?, ?)',
+                        (digest, len(data), content_type, time.time())
+                    )
+                    connection.execute(
+                        'INSERT OR REPLACE INTO entries (product_id, asset_type, digest) VALUES (?, ?, ?)',
+                        (product_id, asset_type, digest)
+                    )
+                    self._evict(connection)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f'Error writing preview store: {str(e)}')
+
+        return digest
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Evict least recently used blobs until the store fits in max_bytes"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for digest, size in connection.execute('SELECT digest, size FROM blobs ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+
+            connection.execute('DELETE FROM entries WHERE digest = ?', (digest,))
+            connection.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            total -= size
+            logger.info(f'Evicted preview blob {digest} ({size} bytes)')
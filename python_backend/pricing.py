@@ -0,0 +1,176 @@
+"""
+Pricing engine for SpaceData application
+Server-side port of static/js/pricing.js that prices many orders in one
+vectorized pass, with deterministic seeds for the random variance
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from geometry import geodesic_areas, pad_rings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Data type base prices (in FLR)
+DATA_TYPE_PRICES = {
+    'Sentinel-2 Level 2A': 10,
+    'Sentinel-1 SAR': 15,
+    'Sentinel-3 OLCI': 5
+}
+
+# Data type codes used by the forms and the Copernicus API
+DATA_TYPE_NAMES = {
+    'S2MSI2A': 'Sentinel-2 Level 2A',
+    'S1GRD': 'Sentinel-1 SAR',
+    'S3OLCI': 'Sentinel-3 OLCI'
+}
+
+# Resolution multipliers
+RESOLUTION_MULTIPLIERS = {
+    'Sentinel-2 Level 2A': 1.5,  # 10m, high resolution
+    'Sentinel-1 SAR': 1.3,  # 5-20m, medium-high resolution
+    'Sentinel-3 OLCI': 0.8  # 300m, lower resolution
+}
+
+DEFAULT_BASE_PRICE = 10  # FLR, for unknown data types
+AI_ANALYSIS_MULTIPLIER = 1.25  # 25% increase for AI analysis
+NETWORK_FEE = 0.1  # FLR
+PRICE_DIVISOR = 50000  # Scales prices down to the displayed range
+PRICE_VARIANCE = 0.1  # Random variance of +/-10%
+
+
+def data_type_name(data_type: str) -> str:
+    """Display name of a data type given either its code or its display name"""
+    return DATA_TYPE_NAMES.get(data_type, data_type)
+
+
+def _round_price(values: np.ndarray) -> np.ndarray:
+    """Round to 2 decimal places, half up like Math.round in the browser"""
+    return np.floor(values * 100 + 0.5) / 100
+
+
+def _flag(value: Any) -> bool:
+    """Parse a boolean order field that may arrive as a form string ('true'/'false')"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() == 'true'
+
+
+def _ring(coordinates: Optional[Sequence[Sequence[float]]]) -> List[List[float]]:
+    """Convert [lat, lng] coordinates to a [lng, lat] ring (empty if not a polygon)"""
+    if not coordinates or len(coordinates) < 3:
+        return []
+    return [[float(point[1]), float(point[0])] for point in coordinates]
+
+
+def area_factors(areas: np.ndarray) -> np.ndarray:
+    """
+    Price factor of areas in square kilometers
+    1 sq km = 0.5 factor (minimum), 100 sq km = 1.0, 1000 sq km = 10.0
+    """
+    return np.maximum(0.5, areas / 100)
+
+
+def date_range_factors(start_dates: Sequence[str], end_dates: Sequence[str]) -> np.ndarray:
+    """
+    Price factor of date ranges
+    1.0 for 7 days, scaling linearly between 0.5 (1 day) and 2.0 (30+ days);
+    1.0 for ranges that cannot be parsed
+    Args:
+        start_dates: Start dates (YYYY-MM-DD)
+        end_dates: End dates (YYYY-MM-DD)
+    Returns:
+        Array of factors
+    """
+    def parse(dates):
+        parsed = np.full(len(dates), np.datetime64('NaT'), dtype='datetime64[D]')
+        for index, date in enumerate(dates):
+            try:
+                parsed[index] = np.datetime64(str(date)[:10], 'D')
+            except ValueError:
+                pass
+        return parsed
+
+    start, end = parse(start_dates), parse(end_dates)
+    days = np.abs((end - start).astype('timedelta64[D]').astype(np.float64)) + 1  # Both days included
+    factors = np.clip(days / 7, 0.5, 2.0)
+    return np.where(np.isnat(start) | np.isnat(end), 1.0, factors)
+
+
+def generate_seed(data_type: str, coordinates: Optional[Sequence[Sequence[float]]], start_date: str, end_date: str) -> str:
+    """
+    Deterministic seed of an order (the browser adds a timestamp; quotes must be reproducible)
+    Args:
+        data_type: Data type code or display name
+        coordinates: Array of [lat, lng] coordinates
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+    Returns:
+        Seed string
+    """
+    coordinates_string = 'no-area'
+    if coordinates:
+        coordinates_string = ';'.join(f'{float(lat):.4f},{float(lng):.4f}' for lat, lng in coordinates)
+    return f'{data_type_name(data_type)}-{coordinates_string}-{start_date}-{end_date}'
+
+
+def seed_randomness(seeds: Sequence[str]) -> np.ndarray:
+    """Normalized random values in [0, 1) derived from seeds (SHA-256, 3 decimal places like the VRF)"""
+    return np.array([
+        int.from_bytes(hashlib.sha256(seed.encode('utf-8')).digest(), 'big') % 1000 / 1000
+        for seed in seeds
+    ], dtype=np.float64)
+
+
+def quote_orders(orders: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Price a batch of orders in one vectorized pass
+    Args:
+        orders: Orders with dataType (code or display name), coordinates ([lat, lng] polygon),
+                startDate, endDate and aiAnalysis
+    Returns:
+        List of quotes in the order of the input, with area, base price, final
+        price, variance percentage and the seed the variance was derived from
+    """
+    if not orders:
+        return []
+
+    names = [data_type_name(order.get('dataType', 'S2MSI2A')) for order in orders]
+    coordinates = [order.get('coordinates') or [] for order in orders]
+    start_dates = [order.get('startDate', '') for order in orders]
+    end_dates = [order.get('endDate', '') for order in orders]
+
+    base_prices = np.array([DATA_TYPE_PRICES.get(name, DEFAULT_BASE_PRICE) for name in names], dtype=np.float64)
+    resolution = np.array([RESOLUTION_MULTIPLIERS.get(name, 1.0) for name in names], dtype=np.float64)
+    ai_multiplier = np.where([_flag(order.get('aiAnalysis')) for order in orders], AI_ANALYSIS_MULTIPLIER, 1.0)
+
+    # Geodesic areas of all polygons at once; orders without a polygon count as 1 sq km
+    rings = [_ring(coords) for coords in coordinates]
+    areas = np.where([len(ring) >= 3 for ring in rings], geodesic_areas(pad_rings(rings)), 1.0)
+    areas = np.maximum(1.0, areas)
+
+    base = (base_prices * resolution * area_factors(areas) * date_range_factors(start_dates, end_dates)
+            * ai_multiplier + NETWORK_FEE) / PRICE_DIVISOR
+    base = _round_price(base)
+
+    seeds = [
+        generate_seed(name, coords, start, end)
+        for name, coords, start, end in zip(names, coordinates, start_dates, end_dates)
+    ]
+    random_factors = 1 - PRICE_VARIANCE + seed_randomness(seeds) * 2 * PRICE_VARIANCE
+    final = _round_price(base * random_factors)
+    variance = np.floor((random_factors - 1) * 100 + 0.5)
+
+    return [
+        {
+            'dataType': name,
+            'areaKm2': round(float(area), 2),
+            'basePrice': float(base_price),
+            'finalPrice': float(final_price),
+            'randomFactor': int(percent),
+            'seed': seed
+        }
+        for name, area, base_price, final_price, percent, seed in zip(names, areas, base, final, variance, seeds)
+    ]
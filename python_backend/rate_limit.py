@@ -0,0 +1,91 @@
+"""
+Rate limiting utilities for SpaceData application
+Token bucket shared by background jobs and clients of rate-limited services
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of stored tokens (defaults to one second of tokens, at least 1)
+        """
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accrued since the last update"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available without waiting"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def charge(self, tokens: float = 1) -> None:
+        """Take tokens for work already done, going into debt if there are not enough"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            self.granted += 1
+
+    def available(self) -> float:
+        """Get the number of stored tokens (negative while in debt)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Take tokens, waiting until they are available
+        Args:
+            tokens: Number of tokens to take
+            timeout: Longest wait in seconds, or None to wait indefinitely
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.granted += 1
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else float('inf')
+                if deadline is not None and now + wait > deadline:
+                    self.denied += 1
+                    return False
+            time.sleep(wait)
+
+    def stats(self) -> Dict[str, float]:
+        """Get available tokens and grant/deny counters"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'available': self._tokens,
+                'rate': self.rate,
+                'capacity': self.capacity,
+                'granted': self.granted,
+                'denied': self.denied
+            }
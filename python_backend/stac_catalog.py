@@ -0,0 +1,312 @@
+"""
+Local STAC catalog for SpaceData application
+Disk-backed SQLite store of the STAC features returned by CDSE searches, with an
+R-tree index on bbox and an index on datetime, used to answer searches that fall
+inside an already-fetched, still-fresh query without calling CDSE. Features
+fetched with a STAC fields projection are stored per projection (one row per
+id and projection) and only answer searches for the same projection
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Catalog configuration
+CATALOG_PATH = os.getenv(
+    'STAC_CATALOG_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'stac_catalog.sqlite3')
+)
+CATALOG_TTL = float(os.getenv('STAC_CATALOG_TTL', '3600'))  # seconds a fetched query stays fresh
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    datetime TEXT,
+    cloud_cover REAL,
+    feature TEXT NOT NULL,
+    fields TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL,
+    UNIQUE (id, fields)
+);
+CREATE INDEX IF NOT EXISTS idx_features_collection_datetime ON features (collection, datetime);
+CREATE INDEX IF NOT EXISTS idx_features_fetched ON features (fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS features_rtree USING rtree (rowid, min_x, max_x, min_y, max_y);
+CREATE TABLE IF NOT EXISTS queries (
+    id INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    west REAL NOT NULL,
+    south REAL NOT NULL,
+    east REAL NOT NULL,
+    north REAL NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    cloud_cover_max REAL NOT NULL,
+    fields TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queries_collection_fetched ON queries (collection, fetched_at);
+"""
+
+
+def fields_key(fields: Optional[Sequence[str]]) -> str:
+    """Stored form of a fields projection ('' for full features)"""
+    return ','.join(sorted(set(fields))) if fields else ''
+
+
+def feature_bbox(feature: Dict[str, Any]) -> Optional[List[float]]:
+    """
+    Get the [west, south, east, north] bbox of a STAC feature
+    Falls back to the extent of its geometry when the feature has no bbox
+    """
+    bbox = feature.get('bbox')
+    if bbox and len(bbox) >= 4:
+        if len(bbox) == 6:  # 3D bbox
+            return [bbox[0], bbox[1], bbox[3], bbox[4]]
+        return list(bbox[:4])
+
+    geometry = feature.get('geometry') or {}
+    points = []
+
+    def collect(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            points.append(coords)
+        else:
+            for child in coords or []:
+                collect(child)
+
+    collect(geometry.get('coordinates'))
+    if not points:
+        return None
+
+    lngs = [point[0] for point in points]
+    lats = [point[1] for point in points]
+    return [min(lngs), min(lats), max(lngs), max(lats)]
+
+
+class STACCatalog:
+    """SQLite-backed local catalog of STAC features"""
+
+    def __init__(self, path: str = CATALOG_PATH, ttl: float = CATALOG_TTL):
+        """
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds a fetched query can be used to answer contained queries
+        """
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+
+        # Catalogs created before features were keyed by projection hold one
+        # row per id; they are only a cache, so they are rebuilt empty
+        row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'features'").fetchone()
+        if row is not None and 'UNIQUE (id, fields)' not in row[0]:
+            logger.info('Rebuilding STAC catalog with features keyed by id and projection')
+            connection.executescript(
+                'DROP TABLE IF EXISTS features; DROP TABLE IF EXISTS features_rtree; DROP TABLE IF EXISTS queries;'
+            )
+
+        connection.executescript(SCHEMA)
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def lookup(
+        self,
+        collection: str,
+        bbox: List[float],
+        start: str,
+        end: str,
+        cloud_cover_max: float,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer a search locally if a fresh fetched query contains it
+        Args:
+            collection: STAC collection name
+            bbox: Bounding box [west, south, east, north]
+            start: Start of the datetime range (ISO 8601)
+            end: End of the datetime range (ISO 8601)
+            cloud_cover_max: Maximum cloud cover percentage
+            limit: Maximum number of features to return
+            fields: STAC fields projection of the search; full-feature queries answer any projection
+        Returns:
+            List of STAC features intersecting the bbox (full, or with at least the
+            requested fields), or None if no containing query is known
+        """
+        west, south, east, north = bbox
+        projection = fields_key(fields)
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                """
+                SELECT fetched_at FROM queries
+                WHERE collection = ? AND fetched_at >= ?
+                  AND west <= ? AND south <= ? AND east >= ? AND north >= ?
+                  AND start <= ? AND end >= ? AND cloud_cover_max >= ?
+                  AND fields IN ('', ?)
+                ORDER BY fetched_at DESC LIMIT 1
+                """,
+                (collection, time.time() - self.ttl, west, south, east, north, start, end, cloud_cover_max,
+                 projection)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            # Only features refreshed by the containing query (or later) are
+            # trusted, so items withdrawn upstream since then are not served.
+            # An item stored both full and projected is returned once, full
+            # (SQLite takes the bare column from the MIN(fields) row)
+            sql = """
+                SELECT f.feature, MIN(f.fields) FROM features f
+                JOIN features_rtree r ON r.rowid = f.rowid
+                WHERE r.min_x <= ? AND r.max_x >= ? AND r.min_y <= ? AND r.max_y >= ?
+                  AND f.collection = ? AND f.datetime >= ? AND f.datetime <= ?
+                  AND COALESCE(f.cloud_cover, 0) <= ? AND f.fetched_at >= ? AND f.fields IN ('', ?)
+                GROUP BY f.id
+                ORDER BY f.datetime DESC
+            """
+            params = [east, west, north, south, collection, start, end, cloud_cover_max, row[0], projection]
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params.append(int(limit))
+
+            features = [json.loads(feature) for feature, _ in connection.execute(sql, params)]
+            logger.info(f'Answered search locally from STAC catalog with {len(features)} features')
+            return features
+        except sqlite3.Error as e:
+            logger.warning(f'Error reading STAC catalog: {str(e)}')
+            return None
+
+    def store(
+        self,
+        collection: str,
+        bbox: List[float],
+        start: str,
+        end: str,
+        cloud_cover_max: float,
+        features: List[Dict[str, Any]],
+        complete: bool,
+        fetched_at: Optional[float] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> None:
+        """
+        Store the features returned by an upstream search
+        Args:
+            collection: STAC collection name
+            bbox: Bounding box [west, south, east, north] of the search
+            start: Start of the datetime range (ISO 8601)
+            end: End of the datetime range (ISO 8601)
+            cloud_cover_max: Maximum cloud cover percentage of the search
+            features: STAC features returned by the search
+            complete: Whether the features are the full result set; truncated
+                results are stored but never used to answer other queries
+            fetched_at: Time the search started, so that all pages of a
+                paginated search share one timestamp (defaults to now)
+            fields: STAC fields projection the features were fetched with, or None for full features
+        """
+        now = time.time() if fetched_at is None else fetched_at
+        projection = fields_key(fields)
+        try:
+            with self._write_lock:
+                connection = self._connection()
+                with connection:
+                    for feature in features:
+                        self._upsert_feature(connection, collection, feature, projection, now)
+
+                    if complete:
+                        west, south, east, north = bbox
+                        connection.execute(
+                            """
+                            INSERT INTO queries (collection, west, south, east, north, start, end, cloud_cover_max, fields, fetched_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            """,
+                            (collection, west, south, east, north, start, end, cloud_cover_max, projection, now)
+                        )
+
+                    self._prune(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f'Error writing STAC catalog: {str(e)}')
+
+    def _upsert_feature(
+        self,
+        connection: sqlite3.Connection,
+        collection: str,
+        feature: Dict[str, Any],
+        projection: str,
+        now: float
+    ) -> None:
+        """Insert or refresh a single feature and its R-tree entry (the rows of other projections are left alone)"""
+        bbox = feature_bbox(feature)
+        if not feature.get('id') or bbox is None:
+            return
+
+        properties = feature.get('properties') or {}
+        connection.execute(
+            """
+            INSERT INTO features (id, collection, datetime, cloud_cover, feature, fields, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id, fields) DO UPDATE SET
+                collection = excluded.collection,
+                datetime = excluded.datetime,
+                cloud_cover = excluded.cloud_cover,
+                feature = excluded.feature,
+                fetched_at = excluded.fetched_at
+            """,
+            (
+                feature['id'],
+                collection,
+                properties.get('datetime'),
+                properties.get('eo:cloud_cover'),
+                json.dumps(feature),
+                projection,
+                now
+            )
+        )
+        rowid = connection.execute(
+            'SELECT rowid FROM features WHERE id = ? AND fields = ?', (feature['id'], projection)
+        ).fetchone()[0]
+        west, south, east, north = bbox
+        connection.execute(
+            'INSERT OR REPLACE INTO features_rtree (rowid, min_x, max_x, min_y, max_y) VALUES (?, ?, ?, ?, ?)',
+            (rowid, west, east, south, north)
+        )
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop queries and features that can no longer answer searches"""
+        cutoff = now - self.ttl
+        connection.execute('DELETE FROM queries WHERE fetched_at < ?', (cutoff,))
+        connection.execute(
+            'DELETE FROM features_rtree WHERE rowid IN (SELECT rowid FROM features WHERE fetched_at < ?)',
+            (cutoff,)
+        )
+        connection.execute('DELETE FROM features WHERE fetched_at < ?', (cutoff,))
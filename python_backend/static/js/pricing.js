@@ -23,8 +23,13 @@ const AI_ANALYSIS_MULTIPLIER = 1.25; // 25% increase for AI analysis
 // Network fee in FLR
 const NETWORK_FEE = 0.1;
 
+// Mean Earth radius (IUGG) in kilometers
+const EARTH_RADIUS_KM = 6371.0088;
+
 /**
  * Calculate area in square kilometers from polygon coordinates
+ * Geodesic area on the sphere, the same formula as geometry.geodesic_areas
+ * used by the server's /api/pricing/quote, so both price the same area
  * @param {L.Polygon} polygon - Leaflet polygon object
  * @returns {number} - Area in square kilometers
  */
@@ -34,31 +39,18 @@ function calculateAreaInSqKm(polygon) {
     }
     
     try {
-        // Calculate a simple area based on the bounding box
-        // This is more reliable than geodesicArea which can be unpredictable
         const latlngs = polygon.getLatLngs()[0];
         
-        // Find min/max lat/lng to create a bounding box
-        let minLat = 90, maxLat = -90, minLng = 180, maxLng = -180;
-        
-        for (const point of latlngs) {
-            minLat = Math.min(minLat, point.lat);
-            maxLat = Math.max(maxLat, point.lat);
-            minLng = Math.min(minLng, point.lng);
-            maxLng = Math.max(maxLng, point.lng);
+        // Spherical excess of each edge's trapezoid to the equator
+        let excess = 0;
+        for (let i = 0; i < latlngs.length; i++) {
+            const p1 = latlngs[i];
+            const p2 = latlngs[(i + 1) % latlngs.length];
+            const dLng = (p2.lng - p1.lng) * Math.PI / 180;
+            excess += dLng * (2 + Math.sin(p1.lat * Math.PI / 180) + Math.sin(p2.lat * Math.PI / 180));
         }
+        const area = Math.abs(excess) * EARTH_RADIUS_KM * EARTH_RADIUS_KM / 2;
         
-        // Calculate width and height in kilometers
-        // Approximate conversion: 1 degree latitude = 111 km
-        // 1 degree longitude = 111 km * cos(latitude)
-        const avgLat = (minLat + maxLat) / 2;
-        const heightKm = (maxLat - minLat) * 111;
-        const widthKm = (maxLng - minLng) * 111 * Math.cos(avgLat * Math.PI / 180);
-        
-        // Calculate area and apply a factor to account for non-rectangular shapes
-        const area = heightKm * widthKm * 0.8; // 0.8 factor to account for non-rectangular shapes
-        
-        console.log('Bounding box dimensions:', heightKm.toFixed(2), 'km x', widthKm.toFixed(2), 'km');
         console.log('Calculated area:', area.toFixed(2), 'sq km');
         
         return Math.max(1, area);
@@ -0,0 +1,49 @@
+"""
+Tests for the analysis cache key of the AI service
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_service  # noqa: E402
+
+MALFORMED = [
+    '',
+    'not json',
+    '{"lat": 1}',
+    '[1, 2, 3]',
+    '[[1], [2], [3]]',
+    '[[1, 2], [3, 4], ["a", "b"]]',
+    '[[1, 2], [3, 4], [null, 5]]',
+    '[[1, 2], [1, 2], [1, 2]]',
+]
+
+
+class AnalysisCacheKeyTest(unittest.TestCase):
+
+    def key(self, coordinates, image_urls=None):
+        return ai_service.analysis_cache_key('S2MSI2A', '2023-04-15', '2023-04-22', image_urls, coordinates)
+
+    def test_malformed_coordinates_are_not_cached(self):
+        for coordinates in MALFORMED:
+            with self.subTest(coordinates=coordinates):
+                self.assertIsNone(ai_service.parse_polygon(coordinates))
+                self.assertIsNone(self.key(coordinates))
+
+    def test_same_area_drawn_differently_shares_a_key(self):
+        ring = '[[41.3, 2.1], [41.3, 2.3], [41.5, 2.3], [41.5, 2.1]]'
+        closed_reversed = '[[41.5, 2.1], [41.5, 2.3], [41.3, 2.3], [41.3, 2.1], [41.5, 2.1]]'
+        self.assertIsNotNone(self.key(ring))
+        self.assertEqual(self.key(ring), self.key(closed_reversed))
+
+    def test_images_are_part_of_the_key(self):
+        ring = '[[41.3, 2.1], [41.3, 2.3], [41.5, 2.3], [41.5, 2.1]]'
+        self.assertNotEqual(self.key(ring, ['/preview/A']), self.key(ring, ['/preview/B']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests for the analysis job queue
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import json
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis_jobs  # noqa: E402
+
+
+def order(coordinates, **params):
+    """Job parameters of an order over a [lat, lng] polygon"""
+    return {
+        'data_type': 'S2MSI2A',
+        'location_name': 'Selected Area',
+        'start_date': '2023-04-15',
+        'end_date': '2023-04-22',
+        'coordinates': json.dumps(coordinates),
+        **params
+    }
+
+
+BARCELONA = [[41.3, 2.1], [41.3, 2.3], [41.5, 2.3], [41.5, 2.1]]
+LISBON = [[38.6, -9.3], [38.6, -9.0], [38.8, -9.0], [38.8, -9.3]]
+
+
+def wait_until_finished(queue, job_id, timeout=5.0):
+    """Wait for a job to be done or failed and return its snapshot"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (analysis_jobs.DONE, analysis_jobs.FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+class JobIdTest(unittest.TestCase):
+
+    def test_different_areas_get_different_ids(self):
+        self.assertNotEqual(analysis_jobs.job_id(order(BARCELONA)), analysis_jobs.job_id(order(LISBON)))
+
+    def test_same_order_shares_an_id(self):
+        redrawn = BARCELONA[2:] + BARCELONA[:2]
+        self.assertEqual(analysis_jobs.job_id(order(BARCELONA)), analysis_jobs.job_id(order(redrawn)))
+
+    def test_dates_and_data_type_are_part_of_the_id(self):
+        base = analysis_jobs.job_id(order(BARCELONA))
+        self.assertNotEqual(base, analysis_jobs.job_id(order(BARCELONA, end_date='2023-04-30')))
+        self.assertNotEqual(base, analysis_jobs.job_id(order(BARCELONA, data_type='S1GRD')))
+
+    def test_orders_without_area_share_an_id_per_data_type_and_dates(self):
+        no_area = dict(order(BARCELONA), coordinates='')
+        self.assertEqual(analysis_jobs.job_id(no_area), analysis_jobs.job_id(dict(no_area, location_name='Elsewhere')))
+        self.assertNotEqual(analysis_jobs.job_id(no_area), analysis_jobs.job_id(dict(no_area, end_date='2023-04-30')))
+
+    def test_malformed_coordinates_get_no_job(self):
+        for coordinates in ('[1,2,3]', '[[1,2],[3,4],["a","b"]]', '[[41.3, 2.1]]', 'not json'):
+            with self.subTest(coordinates=coordinates):
+                params = dict(order(BARCELONA), coordinates=coordinates)
+                self.assertIsNone(analysis_jobs.job_id(params))
+                self.assertIsNone(analysis_jobs.submit(params))
+
+
+class AnalysisJobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(analysis_jobs, '_preview_ids', return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.analyze = mock.Mock(side_effect=lambda **params: {'area': params['coordinates']})
+        patcher = mock.patch.object(analysis_jobs.AIService, 'run_analysis', self.analyze)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.queue = analysis_jobs.AnalysisJobQueue(max_workers=1, retry_delay=60, retry_max_delay=600)
+
+    def submit(self, params):
+        return self.queue.submit(analysis_jobs.job_id(params), params)
+
+    def test_two_areas_without_tx_hash_get_different_jobs(self):
+        barcelona = self.submit(order(BARCELONA))
+        lisbon = self.submit(order(LISBON))
+        self.assertNotEqual(barcelona['id'], lisbon['id'])
+
+        barcelona = wait_until_finished(self.queue, barcelona['id'])
+        lisbon = wait_until_finished(self.queue, lisbon['id'])
+        self.assertEqual(barcelona['result'], {'area': json.dumps(BARCELONA)})
+        self.assertEqual(lisbon['result'], {'area': json.dumps(LISBON)})
+        self.assertEqual(self.analyze.call_count, 2)
+
+    def test_analysis_without_result_fails(self):
+        self.analyze.side_effect = None
+        self.analyze.return_value = None
+
+        job = wait_until_finished(self.queue, self.submit(order(BARCELONA))['id'])
+        self.assertEqual(job['status'], analysis_jobs.FAILED)
+        self.assertIsNone(job['result'])
+        self.assertIsNotNone(job['retry_at'])
+
+    def test_failed_job_is_not_retried_on_every_request(self):
+        self.analyze.side_effect = RuntimeError('completion failed')
+        params = order(BARCELONA)
+
+        job = wait_until_finished(self.queue, self.submit(params)['id'])
+        self.assertEqual(job['status'], analysis_jobs.FAILED)
+        self.assertGreater(job['retry_at'], job['finished_at'])
+
+        for _ in range(5):
+            self.assertEqual(self.submit(params)['status'], analysis_jobs.FAILED)
+        self.assertEqual(self.analyze.call_count, 1)
+
+    def test_failed_job_is_retried_after_its_delay_doubling_per_attempt(self):
+        self.analyze.side_effect = RuntimeError('completion failed')
+        params = order(BARCELONA)
+        first = wait_until_finished(self.queue, self.submit(params)['id'])
+
+        with mock.patch.object(analysis_jobs.time, 'time', return_value=first['retry_at'] + 1):
+            self.assertEqual(self.submit(params)['attempts'], 1)
+        second = wait_until_finished(self.queue, first['id'])
+
+        self.assertEqual(self.analyze.call_count, 2)
+        self.assertEqual(second['attempts'], 2)
+        self.assertAlmostEqual(second['retry_at'] - second['finished_at'], 120, places=3)
+        self.assertEqual(self.queue.stats()['retried'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
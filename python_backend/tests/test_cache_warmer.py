@@ -0,0 +1,83 @@
+"""
+Tests for the request budget of the cache warmer
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copernicus_api  # noqa: E402
+from cache_warmer import CacheWarmer  # noqa: E402
+from cdse_transport import ContextThreadPoolExecutor, transport  # noqa: E402
+
+SEARCH = dict(data_type='S2MSI2A', coordinates=[[41.3, 2.1], [41.3, 2.3], [41.5, 2.3]],
+              start_date='2023-04-15', end_date='2023-04-22', limit=5)
+
+
+def upstream_search(pages):
+    """Fake search sending `pages` requests, half of them from a background thread"""
+    executor = ContextThreadPoolExecutor(max_workers=1)
+
+    def search(**args):
+        for page in range(pages):
+            if page % 2:
+                executor.submit(transport.get, 'https://stac.example/search').result()
+            else:
+                transport.get('https://stac.example/search')
+        return []
+    return search
+
+
+class CacheWarmerBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.session.request.return_value = mock.Mock(status_code=200)
+        patcher = mock.patch.object(transport, 'session', self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(copernicus_api, 'get_search_cache_ttl', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def warmer(self, budget_per_minute):
+        warmer = CacheWarmer(min_score=0.5, budget_per_minute=budget_per_minute)
+        warmer.budget.rate = 0  # no refill while the test runs
+        return warmer
+
+    def test_every_upstream_request_is_charged(self):
+        warmer = self.warmer(10)
+        warmer.record('barcelona', SEARCH)
+
+        with mock.patch.object(copernicus_api, 'search_satellite_data', side_effect=upstream_search(4)):
+            self.assertEqual(warmer.warm_once(), 1)
+
+        self.assertEqual(self.session.request.call_count, 4)
+        self.assertAlmostEqual(warmer.budget.available(), 6)
+
+    def test_overdrawn_budget_stops_refreshes(self):
+        warmer = self.warmer(3)
+        warmer.record('barcelona', SEARCH)
+        warmer.record('lisbon', dict(SEARCH, coordinates=[[38.6, -9.3], [38.6, -9.0], [38.8, -9.0]]))
+
+        with mock.patch.object(copernicus_api, 'search_satellite_data', side_effect=upstream_search(4)) as search:
+            self.assertEqual(warmer.warm_once(), 1)
+            self.assertEqual(warmer.warm_once(), 0)
+
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual(warmer.over_budget, 2)
+        self.assertAlmostEqual(warmer.budget.available(), -1)
+
+    def test_requests_outside_the_warmer_are_not_charged(self):
+        warmer = self.warmer(10)
+        transport.get('https://stac.example/search')
+        self.assertAlmostEqual(warmer.budget.available(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
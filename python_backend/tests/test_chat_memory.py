@@ -0,0 +1,48 @@
+"""
+Tests for the token budget of the chat memory
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import ConversationStore, estimate_tokens, truncate_to_tokens  # noqa: E402
+
+
+def history_tokens(history):
+    return sum(estimate_tokens(message['content']) for message in history)
+
+
+class HistoryBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        # keep_messages high enough that recording never starts a summary
+        self.store = ConversationStore(token_budget=100, keep_messages=100)
+
+    def test_history_fits_the_budget(self):
+        for turn in range(10):
+            self.store.record('order', f'question {turn} ' * 10, f'answer {turn} ' * 10)
+        history = self.store.history('order')
+        self.assertLessEqual(history_tokens(history), 100)
+        self.assertEqual(history[-1]['content'], 'answer 9 ' * 10)
+
+    def test_oversize_newest_message_is_cut_to_the_budget(self):
+        self.store.record('order', 'short question', 'x' * 2000)
+        history = self.store.history('order')
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]['role'], 'assistant')
+        self.assertLessEqual(history_tokens(history), 100)
+        self.assertTrue(history[0]['content'].endswith('…'))
+
+    def test_truncate_to_tokens(self):
+        for tokens in range(1, 20):
+            self.assertLessEqual(estimate_tokens(truncate_to_tokens('y' * 500, tokens)), tokens)
+        self.assertEqual(truncate_to_tokens('short', 10), 'short')
+        self.assertEqual(truncate_to_tokens('long text', 0), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests for the search route of the Copernicus bridge
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copernicus_api  # noqa: E402
+import copernicus_bridge  # noqa: E402
+
+SEARCH = {'startDate': '2023-04-15', 'endDate': '2023-04-22',
+          'coordinates': [[41.3, 2.1], [41.3, 2.3], [41.5, 2.3], [41.5, 2.1]]}
+
+
+class SearchLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(copernicus_bridge.copernicus_bp)
+        self.client = app.test_client()
+
+        patcher = mock.patch.object(copernicus_api, 'search_satellite_data', return_value=[])
+        self.search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def limit_sent(self, **body):
+        response = self.client.post('/api/copernicus/search', json=dict(SEARCH, **body))
+        self.assertEqual(response.status_code, 200)
+        return self.search.call_args.kwargs['limit']
+
+    def test_missing_or_null_limit_gets_the_default(self):
+        self.assertEqual(self.limit_sent(), copernicus_bridge.SEARCH_DEFAULT_LIMIT)
+        self.assertEqual(self.limit_sent(limit=None), copernicus_bridge.SEARCH_DEFAULT_LIMIT)
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.limit_sent(limit=10 ** 6), copernicus_bridge.SEARCH_MAX_LIMIT)
+        self.assertEqual(self.limit_sent(limit=0), 1)
+        self.assertEqual(self.limit_sent(limit=7), 7)
+
+    def test_non_integer_limit_is_rejected(self):
+        for limit in ('all', 2.5, True):
+            with self.subTest(limit=limit):
+                response = self.client.post('/api/copernicus/search', json=dict(SEARCH, limit=limit))
+                self.assertEqual(response.status_code, 400)
+        self.search.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
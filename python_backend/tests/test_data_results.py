@@ -0,0 +1,75 @@
+"""
+Tests for the data results page
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as spacedata  # noqa: E402
+import analysis_jobs  # noqa: E402
+import copernicus_api  # noqa: E402
+
+
+class DataResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(copernicus_api, 'search_satellite_data', return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Jobs submitted by the page must not reach CDSE or the completion API
+        for target, attribute in ((analysis_jobs, '_preview_ids'), (analysis_jobs.AIService, 'run_analysis')):
+            patcher = mock.patch.object(target, attribute, return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.submit = mock.Mock(wraps=analysis_jobs.jobs.submit)
+        patcher = mock.patch.object(analysis_jobs.jobs, 'submit', self.submit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = spacedata.app.test_client()
+
+    def test_malformed_coordinates_render_the_page_without_analysis(self):
+        for coordinates in ('[1,2,3]', '[[1,2],[3,4],["a","b"]]', '[[1],[2],[3]]', '{"lat": 1}'):
+            with self.subTest(coordinates=coordinates):
+                response = self.client.get('/data-results', query_string={'coordinates': coordinates})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(b'analysis-pending', response.data)
+        self.submit.assert_not_called()
+
+    def test_mosaic_is_the_only_image_loaded_up_front(self):
+        scenes = [{'id': f'S2A_{index}', 'thumbnail_url': f'https://example.com/{index}.png', 'cloud_cover': 5}
+                  for index in range(3)]
+        with spacedata.app.test_request_context():
+            mosaic_url = spacedata.url_for('copernicus.products_mosaic', ids='S2A_0,S2A_1,S2A_2')
+            preview_url = spacedata.url_for('copernicus.product_preview', product_id='S2A_0')
+
+        with mock.patch.object(copernicus_api, 'search_satellite_data', return_value=scenes):
+            page = self.client.get('/data-results').get_data(as_text=True)
+
+        self.assertIn(f'src="{mosaic_url}"', page)
+        self.assertIn(f'data-src="{preview_url}"', page)
+        self.assertNotIn(f'src="{preview_url}"', page.replace(f'data-src="{preview_url}"', ''))
+
+
+    def test_chat_is_kept_per_order_not_per_placeholder_tx_hash(self):
+        def chat_key(coordinates):
+            page = self.client.get('/data-results', query_string={'coordinates': coordinates}).get_data(as_text=True)
+            return page.split("'spacedata-chat-", 1)[1].split("'", 1)[0]
+
+        barcelona = chat_key('[[41.3, 2.1], [41.3, 2.3], [41.5, 2.3], [41.5, 2.1]]')
+        lisbon = chat_key('[[38.6, -9.3], [38.6, -9.0], [38.8, -9.0], [38.8, -9.3]]')
+        self.assertNotEqual(barcelona, lisbon)
+        self.assertEqual(barcelona, chat_key('[[41.5, 2.1], [41.5, 2.3], [41.3, 2.3], [41.3, 2.1]]'))
+        self.assertNotIn('0x', barcelona)
+        self.assertNotEqual(chat_key('[1,2,3]'), chat_key('[4,5,6]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Tests for the overlap of scene footprints with the area of interest
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry import footprint_parts, part_overlap_fractions  # noqa: E402
+
+# Area of interest just west of the antimeridian, [lng, lat]
+AOI = [[179.2, -17.0], [179.8, -17.0], [179.8, -16.4], [179.2, -16.4]]
+
+# A scene split at the antimeridian into a western and an eastern part
+SPLIT_SCENE = {
+    'type': 'MultiPolygon',
+    'coordinates': [
+        [[[179.0, -17.5], [180.0, -17.5], [180.0, -16.0], [179.0, -16.0], [179.0, -17.5]]],
+        [[[-180.0, -17.5], [-179.0, -17.5], [-179.0, -16.0], [-180.0, -16.0], [-180.0, -17.5]]]
+    ]
+}
+
+
+class PartOverlapTest(unittest.TestCase):
+
+    def test_split_footprint_is_measured_per_part(self):
+        parts = footprint_parts(SPLIT_SCENE)
+        self.assertEqual(len(parts), 2)
+        self.assertAlmostEqual(part_overlap_fractions(AOI, [parts])[0], 1.0, places=6)
+
+    def test_far_side_of_a_split_footprint_does_not_cover(self):
+        western, eastern = footprint_parts(SPLIT_SCENE)
+        fractions = part_overlap_fractions(AOI, [[eastern], [western]])
+        self.assertEqual(fractions[0], 0.0)
+        self.assertAlmostEqual(fractions[1], 1.0, places=6)
+
+    def test_footprints_without_parts(self):
+        self.assertEqual(len(part_overlap_fractions(AOI, [])), 0)
+        self.assertEqual(list(part_overlap_fractions(AOI, [[], footprint_parts(None, [179.5, -16.7, 179.6, -16.6])]))[0], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Tests for bit-packed land mask rasters
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import landmask  # noqa: E402
+
+
+class PackedRasterTest(unittest.TestCase):
+
+    def test_packed_raster_is_read_from_the_memory_map(self):
+        raster = np.random.default_rng(0).integers(0, 2, (36, 72), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'landmask.npy')
+            np.save(path, np.packbits(raster, axis=1))
+            mask = landmask._read(path)
+
+            self.assertIsInstance(mask, np.memmap)
+            self.assertEqual(mask.shape, (36, 9))
+
+            rng = np.random.default_rng(1)
+            lats, lngs = rng.uniform(-90, 90, 5000), rng.uniform(-180, 180, 5000)
+            np.testing.assert_array_equal(landmask._lookup(mask, lats, lngs), landmask._lookup(raster, lats, lngs))
+            del mask
+
+    def test_raster_of_the_wrong_shape_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'landmask.npy')
+            np.save(path, np.zeros((36, 36), dtype=np.uint8))
+            with self.assertRaises(ValueError):
+                landmask._read(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
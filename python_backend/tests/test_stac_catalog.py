@@ -0,0 +1,72 @@
+"""
+Tests for the projections stored in the local STAC catalog
+Run from python_backend with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stac_catalog import STACCatalog  # noqa: E402
+
+COLLECTION = 'sentinel-2-l2a'
+BBOX = [2.0, 41.0, 3.0, 42.0]
+DATES = ('2023-04-15T00:00:00Z', '2023-04-22T23:59:59Z')
+DATES_ONLY = ['properties.datetime']
+WITH_CLOUD = ['properties.datetime', 'properties.eo:cloud_cover']
+
+
+def feature(fields=None):
+    """A scene inside BBOX, projected to `fields` if given"""
+    properties = {'datetime': '2023-04-16T10:00:00Z', 'eo:cloud_cover': 5.0}
+    if fields:
+        properties = {path.split('.', 1)[1]: properties[path.split('.', 1)[1]] for path in fields}
+    return {'id': 'S2A_SCENE', 'bbox': [2.2, 41.2, 2.8, 41.8], 'properties': properties}
+
+
+class CatalogProjectionTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.sqlite3')
+        self.catalog = STACCatalog(self.path, ttl=3600)
+
+    def store(self, fields):
+        self.catalog.store(COLLECTION, BBOX, *DATES, 100, [feature(fields)], complete=True, fields=fields)
+
+    def lookup(self, fields):
+        return self.catalog.lookup(COLLECTION, BBOX, *DATES, 100, fields=fields)
+
+    def test_another_projection_does_not_replace_a_stored_one(self):
+        self.store(DATES_ONLY)
+        self.store(WITH_CLOUD)
+        self.assertEqual(self.lookup(DATES_ONLY), [feature(DATES_ONLY)])
+        self.assertEqual(self.lookup(WITH_CLOUD), [feature(WITH_CLOUD)])
+
+    def test_feature_stored_full_and_projected_is_returned_once_full(self):
+        self.store(DATES_ONLY)
+        self.store(None)
+        self.assertEqual(self.lookup(DATES_ONLY), [feature()])
+        self.assertEqual(self.lookup(None), [feature()])
+
+    def test_catalog_with_one_row_per_id_is_rebuilt(self):
+        connection = sqlite3.connect(os.path.join(os.path.dirname(self.path), 'legacy.sqlite3'))
+        connection.executescript(
+            "CREATE TABLE features (rowid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, collection TEXT NOT NULL,"
+            " datetime TEXT, cloud_cover REAL, feature TEXT NOT NULL, fetched_at REAL NOT NULL);"
+        )
+        connection.close()
+
+        catalog = STACCatalog(os.path.join(os.path.dirname(self.path), 'legacy.sqlite3'))
+        catalog.store(COLLECTION, BBOX, *DATES, 100, [feature(DATES_ONLY)], complete=True, fields=DATES_ONLY)
+        catalog.store(COLLECTION, BBOX, *DATES, 100, [feature(WITH_CLOUD)], complete=True, fields=WITH_CLOUD)
+        self.assertEqual(catalog.lookup(COLLECTION, BBOX, *DATES, 100, fields=DATES_ONLY), [feature(DATES_ONLY)])
+
+
+if __name__ == '__main__':
+    unittest.main()